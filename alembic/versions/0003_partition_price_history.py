@@ -0,0 +1,129 @@
+"""partition price history by month
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 03:05:41.208113
+
+Rebuilds price_history as a table range-partitioned by month on scraped_at
+(primary key becomes (id, scraped_at)), with a default partition as a safety
+net, monthly partitions covering existing data plus three months ahead, and
+the price_history_daily rollup table used once old partitions are compacted.
+Existing rows are copied across and keep their IDs.
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LEGACY_INDEXES = (
+    "price_history_pkey",
+    "ix_price_history_id",
+    "ix_price_history_product_id",
+    "ix_price_history_scraped_at",
+    "idx_product_id_scraped_at",
+)
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_indexes() -> None:
+    op.create_index('idx_product_id_scraped_at', 'price_history', ['product_id', 'scraped_at'], unique=False)
+    op.create_index(op.f('ix_price_history_id'), 'price_history', ['id'], unique=False)
+    op.create_index(op.f('ix_price_history_product_id'), 'price_history', ['product_id'], unique=False)
+    op.create_index(op.f('ix_price_history_scraped_at'), 'price_history', ['scraped_at'], unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE price_history RENAME TO price_history_legacy")
+    for index in LEGACY_INDEXES:
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_legacy")
+    op.execute(
+        "ALTER TABLE price_history_legacy "
+        "RENAME CONSTRAINT price_history_product_id_fkey TO price_history_legacy_product_id_fkey"
+    )
+
+    op.create_table('price_history',
+    sa.Column('id', sa.BigInteger(), server_default=sa.text("nextval('price_history_id_seq'::regclass)"), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.Column('currency', sa.String(length=10), nullable=True),
+    sa.Column('in_stock', sa.Boolean(), nullable=True),
+    sa.Column('scraped_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('observation_count', sa.Integer(), server_default='1', nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id', 'scraped_at'),
+    postgresql_partition_by='RANGE (scraped_at)'
+    )
+    _create_indexes()
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id")
+    op.execute("CREATE TABLE price_history_default PARTITION OF price_history DEFAULT")
+
+    oldest = op.get_bind().execute(
+        sa.text("SELECT min(scraped_at) FROM price_history_legacy")
+    ).scalar()
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    month = oldest.astimezone(timezone.utc).date().replace(day=1) if oldest else this_month
+    while month <= _add_months(this_month, MONTHS_AHEAD):
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE price_history_y{month.year:04d}m{month.month:02d} "
+            f"PARTITION OF price_history "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+        month = upper
+
+    op.execute("""
+        INSERT INTO price_history (
+            id, product_id, price, currency, in_stock, scraped_at,
+            last_seen_at, observation_count
+        )
+        SELECT id, product_id, price, currency, in_stock, coalesce(scraped_at, now()),
+               last_seen_at, observation_count
+        FROM price_history_legacy
+    """)
+    op.drop_table('price_history_legacy')
+
+    op.create_table('price_history_daily',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('currency', sa.String(length=10), nullable=True),
+    sa.Column('min_price', sa.Float(), nullable=True),
+    sa.Column('max_price', sa.Float(), nullable=True),
+    sa.Column('avg_price', sa.Float(), nullable=True),
+    sa.Column('close_price', sa.Float(), nullable=True),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('in_stock_samples', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('price_history_daily')
+
+    op.execute("CREATE TABLE price_history_flat (LIKE price_history INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO price_history_flat SELECT * FROM price_history")
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY price_history_flat.id")
+    op.drop_table('price_history')  # Drops every partition with it
+    op.execute("ALTER TABLE price_history_flat RENAME TO price_history")
+    op.execute("ALTER TABLE price_history ALTER COLUMN scraped_at DROP NOT NULL")
+    op.create_primary_key('price_history_pkey', 'price_history', ['id'])
+    op.create_foreign_key(
+        'price_history_product_id_fkey', 'price_history', 'products', ['product_id'], ['id']
+    )
+    _create_indexes()
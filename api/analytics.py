@@ -0,0 +1,313 @@
+"""
+Vectorised price analytics over a slice of price_history.
+
+A slice is the snapshots of the last `days` days, optionally for a single
+category or product, each product opened by its state when the window
+starts. It is loaded with one query that groups each product's
+snapshots into arrays (array_agg). Those arrays are flattened into NumPy
+columns, sorted by product and then by time. Metrics for every product in
+the slice are computed together, with segment reductions (np.bincount,
+np.*.reduceat) rather than a Python loop per product:
+
+  - first/last price, delta and percent change
+  - min / max / mean / standard deviation and coefficient of variation,
+    weighted by observation_count so a "delta"-mode row counts once per crawl
+  - price changes, and stock-outs (in stock -> out of stock transitions)
+
+and, per snapshot, the rolling min/max/stddev over the last `window` priced
+snapshots of the same product.
+
+Computed summaries are kept for API_ANALYTICS_CACHE_TTL seconds (default 60)
+and dropped when the response cache generation moves. The ranking endpoints
+over the same slice therefore share one load.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+
+import numpy as np
+import orjson
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import Boolean, DateTime, Float, cast, func, literal, select, true, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+
+from core.models import PriceHistory, Product
+
+CACHE_TTL = int(os.getenv("API_ANALYTICS_CACHE_TTL", "60"))  # seconds
+CACHE_MAX_ENTRIES = int(os.getenv("API_ANALYTICS_CACHE_MAX_ENTRIES", "32"))
+
+PRICE_METRICS = (
+    "first_price", "last_price", "delta", "pct_change",
+    "min_price", "max_price", "mean_price", "std", "cv",
+)
+COUNT_METRICS = ("price_changes", "stockouts", "observations")
+
+
+@dataclass(slots=True)
+class PriceSlice:
+    ids: np.ndarray         # (P,) product ids, ascending
+    names: list
+    skus: list
+    categories: list
+    offsets: np.ndarray     # (P + 1,) product i's snapshots are rows offsets[i]:offsets[i + 1]
+    t: np.ndarray           # (N,) scraped_at as epoch seconds
+    price: np.ndarray       # (N,) NaN where no price was scraped
+    in_stock: np.ndarray    # (N,) bool
+    samples: np.ndarray     # (N,) observation_count
+
+    def product_index(self) -> np.ndarray:
+        """(N,) index into `ids` of each snapshot's product."""
+        return np.repeat(np.arange(len(self.ids)), np.diff(self.offsets))
+
+    def category_codes(self) -> np.ndarray:
+        codes = {}
+        return np.array([codes.setdefault(c, len(codes)) for c in self.categories], dtype=np.int64)
+
+
+# --- loading ---
+
+def slice_query(since: datetime, category: str | None = None, product_id: int | None = None):
+    """
+    Each product's snapshots since `since`, opened by its state at `since`:
+    its latest earlier snapshot, as one observation stamped `since`. In
+    "delta" mode that row may be weeks old and still be the current state,
+    so without it a long-flat price that just dropped would look unchanged.
+    """
+    scraped_at = PriceHistory.scraped_at
+    products = select(Product.id)
+    if category:
+        products = products.where(Product.category == category)
+    if product_id is not None:
+        products = products.where(Product.id == product_id)
+
+    in_window = select(
+        PriceHistory.product_id,
+        scraped_at.label("at"),
+        literal(1).label("seq"),
+        PriceHistory.price,
+        PriceHistory.in_stock,
+        PriceHistory.observation_count.label("samples"),
+    ).where(scraped_at >= since, PriceHistory.product_id.in_(products))
+    latest_before = (
+        select(PriceHistory.price, PriceHistory.in_stock)
+        .where(PriceHistory.product_id == Product.id, scraped_at < since)
+        .order_by(scraped_at.desc())
+        .limit(1)
+        .lateral("latest_before")
+    )
+    opening = select(
+        Product.id,
+        cast(literal(since), DateTime(timezone=True)),
+        literal(0),   # sorts ahead of a snapshot taken exactly at `since`
+        latest_before.c.price,
+        latest_before.c.in_stock,
+        literal(1),
+    ).join(latest_before, true()).where(Product.id.in_(products))
+    points = union_all(in_window, opening).subquery("points")
+
+    def column(value):
+        return array_agg(aggregate_order_by(value, points.c.at, points.c.seq))
+
+    return (
+        select(
+            Product.id, Product.name, Product.sku, Product.category,
+            column(cast(func.extract("epoch", points.c.at), Float)).label("epoch"),
+            # NaN rather than NULL, so the arrays load straight into float64
+            column(func.coalesce(points.c.price, cast(literal("NaN"), Float))).label("price"),
+            column(func.coalesce(points.c.in_stock, cast(literal(True), Boolean))).label("in_stock"),
+            column(points.c.samples).label("samples"),
+        )
+        .join(points, points.c.product_id == Product.id)
+        .group_by(Product.id)
+        .order_by(Product.id)
+    )
+
+
+def to_slice(rows) -> PriceSlice:
+    lengths = np.fromiter((len(row.epoch) for row in rows), np.int64, len(rows))
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    total = int(offsets[-1])
+
+    def flat(name, dtype):
+        return np.fromiter(chain.from_iterable(row._mapping[name] for row in rows), dtype, total)
+
+    return PriceSlice(
+        ids=np.fromiter((row.id for row in rows), np.int64, len(rows)),
+        names=[row.name for row in rows],
+        skus=[row.sku for row in rows],
+        categories=[row.category for row in rows],
+        offsets=offsets,
+        t=flat("epoch", np.float64),
+        price=flat("price", np.float64),
+        in_stock=flat("in_stock", np.bool_),
+        samples=flat("samples", np.int64),
+    )
+
+
+async def load_slice(db, days: int, category: str | None = None, product_id: int | None = None) -> PriceSlice:
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = (await db.execute(slice_query(since, category, product_id))).all()
+    return to_slice(rows)
+
+
+# --- metrics ---
+
+def summarise(s: PriceSlice) -> dict:
+    """Per-product metrics, as {name: (P,) array}; NaN where a product has no price."""
+    count = len(s.ids)
+    product = s.product_index()
+    priced = ~np.isnan(s.price)
+    p, g = s.price[priced], product[priced]
+    w = s.samples[priced].astype(np.float64)
+
+    out = {name: np.full(count, np.nan) for name in PRICE_METRICS}
+    has = np.bincount(g, minlength=count) > 0
+    starts = np.searchsorted(g, np.arange(count))[has]
+    ends = np.searchsorted(g, np.arange(count), side="right")[has]
+    first, last = p[starts], p[ends - 1]
+    out["first_price"][has] = first
+    out["last_price"][has] = last
+    out["delta"][has] = last - first
+    out["min_price"][has] = np.minimum.reduceat(p, starts)
+    out["max_price"][has] = np.maximum.reduceat(p, starts)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["pct_change"][has] = np.where(first > 0, (last - first) / first * 100, np.nan)
+        weight = np.bincount(g, w, minlength=count)
+        mean = np.bincount(g, w * p, minlength=count) / weight
+        # Two-pass variance: no cancellation error on large, flat prices
+        std = np.sqrt(np.bincount(g, w * (p - mean[g]) ** 2, minlength=count) / weight)
+        out["mean_price"], out["std"] = mean, std
+        out["cv"] = np.where(mean > 0, std / mean, np.nan)
+
+    moved = (g[1:] == g[:-1]) & (p[1:] != p[:-1])
+    out["price_changes"] = np.bincount(g[1:][moved], minlength=count)
+    went_out = (product[1:] == product[:-1]) & s.in_stock[:-1] & ~s.in_stock[1:]
+    out["stockouts"] = np.bincount(product[1:][went_out], minlength=count)
+    out["observations"] = np.bincount(product, s.samples, minlength=count).astype(np.int64)
+    return out
+
+
+def rolling(s: PriceSlice, window: int) -> dict:
+    """
+    Rolling min/max/stddev at each priced snapshot over the `window` priced
+    snapshots ending there. NaN until the product has `window` of them.
+    """
+    priced = ~np.isnan(s.price)
+    p, g = s.price[priced], s.product_index()[priced]
+    out = {
+        "product_index": g,
+        "t": (s.t[priced] * 1000).astype(np.int64),   # epoch ms
+        "price": p,
+        **{name: np.full(len(p), np.nan) for name in ("rolling_min", "rolling_max", "rolling_std")},
+    }
+    if len(p) < window:
+        return out
+    windows = sliding_window_view(p, window)    # windows[j] = p[j:j + window]
+    end = np.arange(window - 1, len(p))
+    # Rows are sorted by product, so a window is within one product iff both ends are
+    full = g[end] == g[end - window + 1]
+    inside = windows[full]
+    out["rolling_min"][end[full]] = inside.min(axis=1)
+    out["rolling_max"][end[full]] = inside.max(axis=1)
+    out["rolling_std"][end[full]] = inside.std(axis=1)
+    return out
+
+
+def rank(key: np.ndarray, limit: int, descending: bool = False, groups: np.ndarray | None = None) -> np.ndarray:
+    """
+    Indices of the `limit` products with the smallest (largest) `key`,
+    skipping NaN; with `groups`, the top `limit` of each group, by group.
+    """
+    candidates = np.flatnonzero(~np.isnan(key))
+    order = candidates[np.argsort(-key[candidates] if descending else key[candidates], kind="stable")]
+    if groups is None:
+        return order[:limit]
+    # Stable sort by group keeps the key order within each group
+    order = order[np.argsort(groups[order], kind="stable")]
+    grouped = groups[order]
+    position = np.arange(len(order))
+    group_start = np.maximum.accumulate(np.where(np.r_[True, grouped[1:] != grouped[:-1]], position, 0))
+    return order[position - group_start < limit]
+
+
+def top_changes(summary: dict, direction: str, limit: int) -> np.ndarray:
+    """Biggest percent drops (or rises) first; products that didn't move in that direction are left out."""
+    pct = summary["pct_change"]
+    with np.errstate(invalid="ignore"):
+        moved = pct < 0 if direction == "drops" else pct > 0
+    return rank(np.where(moved, pct, np.nan), limit, descending=direction != "drops")
+
+
+def top_volatile(summary: dict, limit: int, min_observations: int = 2, groups: np.ndarray | None = None) -> np.ndarray:
+    key = np.where(summary["observations"] >= min_observations, summary["cv"], np.nan)
+    return rank(key, limit, descending=True, groups=groups)
+
+
+def top_stockouts(summary: dict, limit: int) -> np.ndarray:
+    stockouts = summary["stockouts"]
+    return rank(np.where(stockouts > 0, stockouts, np.nan), limit, descending=True)
+
+
+def product_rows(s: PriceSlice, summary: dict, indices: np.ndarray) -> list:
+    columns = {name: summary[name][indices].tolist() for name in PRICE_METRICS + COUNT_METRICS}
+    return [
+        {
+            "id": int(s.ids[i]),
+            "name": s.names[i],
+            "sku": s.skus[i],
+            "category": s.categories[i],
+            **{name: values[n] for name, values in columns.items()},
+        }
+        for n, i in enumerate(indices.tolist())
+    ]
+
+
+# --- result cache ---
+
+class ResultCache:
+    """In-process TTL/LRU store of computed results."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.entries.pop(key, None)
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+result_cache = ResultCache(CACHE_MAX_ENTRIES, CACHE_TTL)
+
+
+async def cached_summary(db, days: int, category: str | None, generation: int):
+    """(slice, summary) for the last `days` days, computed at most once per TTL and generation."""
+    key = (generation, days, category)
+    hit = result_cache.get(key)
+    if hit is None:
+        price_slice = await load_slice(db, days, category)
+        # NumPy releases the GIL for most of this; keep it off the event loop
+        hit = (price_slice, await asyncio.to_thread(summarise, price_slice))
+        result_cache.set(key, hit)
+    return hit
+
+
+def encode(payload) -> bytes:
+    # NumPy arrays serialise directly, and NaN becomes null
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
@@ -0,0 +1,189 @@
+"""
+Price history for many products at once, as a compact column-oriented payload.
+
+POST /api/v1/prices:batch reads every requested product in one query.
+Postgres groups the rows per product and builds the arrays (array_agg), so
+the API only reshapes one row per product and encodes the result with
+orjson. Each series is a set of parallel arrays instead of a list of objects
+repeating the same keys:
+
+    {
+      "resolution": "day",
+      "series": {
+        "12": {"currency": "USD", "t": [1709251200000, ...], "last": [...],
+               "min": [...], "max": [...], "in_stock": [...], "samples": [...]}
+      },
+      "missing": [99]
+    }
+
+Timestamps are epoch milliseconds, UTC. With resolution="raw" there is one
+point per stored snapshot (`t`, `last_seen`, `price`, `in_stock`, `samples`),
+as in /api/v1/products/{id}/prices. "day" and "week" downsample to the last,
+minimum and maximum price per bucket, with `in_stock` from the bucket's last
+snapshot. Only the downsampled resolutions reach back into days whose raw
+partitions were compacted into price_history_daily. In "delta" mode a bucket
+exists only where a state was first recorded; carry the last value forward
+between buckets.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Literal
+
+import orjson
+from pydantic import BaseModel, Field, field_validator
+from sqlalchemy import BigInteger, DateTime, cast, func, literal_column, select, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+
+from core.models import PriceHistory, PriceHistoryDaily, Product
+
+MAX_PRODUCTS = int(os.getenv("API_BATCH_MAX_PRODUCTS", "1000"))
+
+# Response array name -> points column, per resolution
+RAW_COLUMNS = {"last_seen": "last_seen", "price": "close", "in_stock": "in_stock", "samples": "samples"}
+BUCKET_COLUMNS = {"last": "close", "min": "low", "max": "high", "in_stock": "in_stock", "samples": "samples"}
+
+
+class BatchPricesRequest(BaseModel):
+    product_ids: list[int] = Field(min_length=1, max_length=MAX_PRODUCTS)
+    since: datetime | None = None   # inclusive, on scraped_at
+    until: datetime | None = None   # exclusive
+    resolution: Literal["raw", "day", "week"] = "raw"
+
+    @field_validator("product_ids")
+    @classmethod
+    def unique_ids(cls, v):
+        return sorted(set(v))
+
+    @field_validator("since", "until")
+    @classmethod
+    def assume_utc(cls, v):
+        if v is not None and v.tzinfo is None:
+            return v.replace(tzinfo=timezone.utc)
+        return v
+
+    def cache_key(self) -> str:
+        # Stands in for the query string in the response cache key
+        return hashlib.blake2b(self.model_dump_json().encode(), digest_size=16).hexdigest()
+
+
+def _epoch_ms(column):
+    return cast(func.extract("epoch", column) * 1000, BigInteger)
+
+
+def _raw_points(body: BatchPricesRequest):
+    query = select(
+        PriceHistory.product_id,
+        PriceHistory.scraped_at.label("t"),
+        func.coalesce(PriceHistory.last_seen_at, PriceHistory.scraped_at).label("last_seen"),
+        PriceHistory.price.label("close"),
+        PriceHistory.price.label("low"),
+        PriceHistory.price.label("high"),
+        PriceHistory.in_stock,
+        PriceHistory.currency,
+        PriceHistory.observation_count.label("samples"),
+    ).where(PriceHistory.product_id.in_(body.product_ids))
+    if body.since:
+        query = query.where(PriceHistory.scraped_at >= body.since)
+    if body.until:
+        query = query.where(PriceHistory.scraped_at < body.until)
+    return query
+
+
+def _rollup_points(body: BatchPricesRequest):
+    # A rollup day is one point at its UTC midnight; raw rows and rollups
+    # never cover the same day, since rollups are made from dropped partitions
+    day_start = func.timezone("UTC", cast(PriceHistoryDaily.day, DateTime))
+    query = select(
+        PriceHistoryDaily.product_id,
+        day_start.label("t"),
+        day_start.label("last_seen"),
+        PriceHistoryDaily.close_price.label("close"),
+        PriceHistoryDaily.min_price.label("low"),
+        PriceHistoryDaily.max_price.label("high"),
+        (PriceHistoryDaily.in_stock_samples * 2 >= PriceHistoryDaily.samples).label("in_stock"),
+        PriceHistoryDaily.currency,
+        PriceHistoryDaily.samples.label("samples"),
+    ).where(PriceHistoryDaily.product_id.in_(body.product_ids))
+    if body.since:
+        query = query.where(PriceHistoryDaily.day >= body.since.astimezone(timezone.utc).date())
+    if body.until:
+        query = query.where(PriceHistoryDaily.day < body.until.astimezone(timezone.utc).date())
+    return query
+
+
+def _bucketed(points, unit: str):
+    """One row per product and `unit` bucket: last/min/max price, last stock state."""
+    # Inlined rather than bound, so the GROUP BY expression matches the
+    # selected one; `unit` is one of the Literal resolutions
+    bucket = func.date_trunc(literal_column(f"'{unit}'"), func.timezone("UTC", points.c.t))
+    newest_first = points.c.t.desc()
+    return select(
+        points.c.product_id,
+        func.timezone("UTC", bucket).label("t"),
+        array_agg(aggregate_order_by(points.c.close, newest_first))[1].label("close"),
+        func.min(points.c.low).label("low"),
+        func.max(points.c.high).label("high"),
+        array_agg(aggregate_order_by(points.c.in_stock, newest_first))[1].label("in_stock"),
+        array_agg(aggregate_order_by(points.c.currency, newest_first))[1].label("currency"),
+        func.sum(points.c.samples).label("samples"),
+    ).group_by(points.c.product_id, bucket)
+
+
+def batch_query(body: BatchPricesRequest):
+    """
+    One row per requested product that exists: its currency and one array per
+    response column, NULL when it has no points in range.
+    """
+    if body.resolution == "raw":
+        points = _raw_points(body).subquery("points")
+        columns = RAW_COLUMNS
+    else:
+        points = _bucketed(
+            union_all(_raw_points(body), _rollup_points(body)).subquery("points"),
+            body.resolution,
+        ).subquery("buckets")
+        columns = BUCKET_COLUMNS
+
+    has_point = points.c.product_id.isnot(None)
+
+    def series(value):
+        return array_agg(aggregate_order_by(value, points.c.t)).filter(has_point)
+
+    return (
+        select(
+            Product.id,
+            func.coalesce(
+                array_agg(aggregate_order_by(points.c.currency, points.c.t.desc())).filter(has_point)[1],
+                Product.latest_currency,
+            ).label("currency"),
+            series(_epoch_ms(points.c.t)).label("t"),
+            *(
+                series(_epoch_ms(points.c[source]) if name == "last_seen" else points.c[source]).label(name)
+                for name, source in columns.items()
+            ),
+        )
+        .select_from(Product)
+        .outerjoin(points, points.c.product_id == Product.id)
+        .where(Product.id.in_(body.product_ids))
+        .group_by(Product.id)
+    )
+
+
+def build_payload(body: BatchPricesRequest, rows) -> dict:
+    names = ["t", *(RAW_COLUMNS if body.resolution == "raw" else BUCKET_COLUMNS)]
+    series = {}
+    for row in rows:
+        entry = {"currency": row.currency}
+        for name in names:
+            entry[name] = row._mapping[name] or []
+        series[str(row.id)] = entry
+    return {
+        "resolution": body.resolution,
+        "series": series,
+        "missing": [pid for pid in body.product_ids if str(pid) not in series],
+    }
+
+
+def encode(payload) -> bytes:
+    return orjson.dumps(payload)
@@ -0,0 +1,207 @@
+"""
+Response cache for the read endpoints.
+
+Responses are cached as encoded JSON bodies keyed on the route path, the
+sorted query string (or a key derived from the request body, for POST
+reads) and the current invalidation generation (see core/cache.py).
+Every response carries a strong ETag computed from its body, so clients
+sending If-None-Match on a GET get a bodiless 304 whether the body came
+from the cache or was freshly built.
+
+Backends (API_CACHE_BACKEND):
+  - memory: per-process TTL/LRU dict, the default
+  - redis:  shared between API workers, entries expire with SETEX
+  - none:   disabled; ETag/304 handling still applies
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+import redis.asyncio as aioredis
+
+from core.cache import GENERATION_KEY, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("API_CACHE_BACKEND", "memory").lower()
+CACHE_TTL = int(os.getenv("API_CACHE_TTL", "300"))  # seconds
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "1024"))
+GENERATION_POLL = float(os.getenv("API_CACHE_GENERATION_POLL", "1.0"))  # seconds
+REDIS_RETRY_AFTER = 30.0  # seconds to wait after Redis was unreachable
+
+
+class MemoryBackend:
+    """In-process TTL/LRU store of {key: (expires_at, etag, body, headers)}."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    async def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, *cached = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return tuple(cached)
+
+    async def set(self, key, etag, body, headers):
+        self.entries[key] = (time.monotonic() + self.ttl, etag, body, headers)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RedisBackend:
+    """Entries shared across API workers, stored as `{etag, headers}\\n<body>`."""
+
+    name = "redis"
+
+    def __init__(self, client, ttl: int, prefix: str = "api_cache:entry:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key):
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        meta, body = raw.split(b"\n", 1)
+        meta = json.loads(meta)
+        return meta["etag"], body, meta["headers"]
+
+    async def set(self, key, etag, body, headers):
+        meta = json.dumps({"etag": etag, "headers": headers}).encode()
+        await self.client.set(self.prefix + key, meta + b"\n" + body, ex=self.ttl)
+
+    def __len__(self):
+        return 0  # not tracked; entries live in Redis
+
+
+class ResponseCache:
+    def __init__(self, backend=None, redis_client=None):
+        self.backend = backend
+        self.redis = redis_client
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.errors = 0
+        self._generation = 0
+        self._generation_checked = float("-inf")
+
+    async def generation(self) -> int:
+        """The invalidation generation, re-read from Redis at most every GENERATION_POLL seconds."""
+        now = time.monotonic()
+        if self.redis is None or now - self._generation_checked < GENERATION_POLL:
+            return self._generation
+        self._generation_checked = now
+        try:
+            self._generation = int(await self.redis.get(GENERATION_KEY) or 0)
+        except Exception as e:
+            # Keep serving on the last known generation; TTL still bounds staleness
+            self._generation_checked = now + REDIS_RETRY_AFTER
+            logger.warning(f"[CACHE] Could not read cache generation: {e}")
+        return self._generation
+
+    async def respond(self, request: Request, build, key: str | None = None, encode=None) -> Response:
+        """
+        Serve `request` from the cache, or call `build(headers)` to produce the
+        payload. `build` receives a dict it may add response headers to; those
+        are cached along with the body.
+
+        `key` replaces the query string in the cache key, for requests whose
+        parameters travel in the body; `encode` turns the payload into the
+        body bytes (default: json.dumps through jsonable_encoder).
+        """
+        cache_key = None
+        cached = None
+        if self.backend is not None:
+            query = key if key is not None else sorted(request.query_params.multi_items())
+            cache_key = f"{await self.generation()}:{request.url.path}?{query}"
+            try:
+                cached = await self.backend.get(cache_key)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"[CACHE] Lookup failed: {e}")
+
+        if cached is not None:
+            self.hits += 1
+            etag, body, headers = cached
+            status = "HIT"
+        else:
+            if self.backend is not None:
+                self.misses += 1
+            headers = {}
+            payload = await build(headers)
+            body = (encode or _encode_json)(payload)
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            if self.backend is not None:
+                try:
+                    await self.backend.set(cache_key, etag, body, headers)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"[CACHE] Store failed: {e}")
+            status = "MISS"
+
+        response_headers = {**headers, "ETag": etag, "X-Cache": status}
+        # If-None-Match only means "send 304" on safe methods (RFC 9110 13.1.2)
+        if request.method in ("GET", "HEAD") and _etag_matches(etag, request.headers.get("if-none-match")):
+            self.not_modified += 1
+            return Response(status_code=304, headers=response_headers)
+        return Response(content=body, media_type="application/json", headers=response_headers)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name if self.backend is not None else "none",
+            "ttl": CACHE_TTL,
+            "generation": self._generation,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+        }
+
+
+def _encode_json(payload) -> bytes:
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+
+
+def _etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison, as If-None-Match requires (RFC 9110 13.1.2)
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def build_cache() -> ResponseCache:
+    if CACHE_BACKEND == "none":
+        return ResponseCache()
+
+    redis_client = aioredis.from_url(REDIS_URL, socket_connect_timeout=0.5, socket_timeout=0.5)
+    if CACHE_BACKEND == "redis":
+        return ResponseCache(RedisBackend(redis_client, CACHE_TTL), redis_client)
+    if CACHE_BACKEND != "memory":
+        raise ValueError(f"Unknown API_CACHE_BACKEND '{CACHE_BACKEND}'")
+    return ResponseCache(MemoryBackend(CACHE_MAX_ENTRIES, CACHE_TTL), redis_client)
+
+
+response_cache = build_cache()
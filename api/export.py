@@ -0,0 +1,169 @@
+"""
+Streaming bulk export of price_history.
+
+Rows are read through a server-side cursor in fixed-size batches
+(`yield_per`) and each batch is encoded and flushed to the client before
+the next one is fetched, so memory stays flat however many rows match.
+Arrow IPC and Parquet output need pyarrow; NDJSON and CSV don't.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from core.database import SessionLocal
+from core.models import PriceHistory
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional
+    pa = None
+    pq = None
+
+YIELD_PER = 5_000
+
+EXPORT_COLUMNS = (
+    PriceHistory.product_id,
+    PriceHistory.price,
+    PriceHistory.currency,
+    PriceHistory.in_stock,
+    PriceHistory.scraped_at,
+    PriceHistory.last_seen_at,
+    PriceHistory.observation_count,
+)
+COLUMN_NAMES = [column.key for column in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+PYARROW_FORMATS = ("arrow", "parquet")
+
+
+def export_query(product_ids=None, since=None, until=None):
+    query = select(*EXPORT_COLUMNS)
+    if product_ids:
+        query = query.where(PriceHistory.product_id.in_(product_ids))
+    if since:
+        query = query.where(PriceHistory.scraped_at >= since)
+    if until:
+        query = query.where(PriceHistory.scraped_at < until)
+    return query.order_by(PriceHistory.product_id, PriceHistory.scraped_at)
+
+
+def _batches(query):
+    """
+    Yield lists of rows from a server-side cursor.
+
+    The session is owned here rather than injected with Depends(get_db),
+    because the response body is produced after the route has returned.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=YIELD_PER))
+        for rows in result.partitions():
+            yield rows
+    finally:
+        db.close()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+
+def stream_ndjson(query):
+    for rows in _batches(query):
+        yield "".join(
+            json.dumps(dict(zip(COLUMN_NAMES, row)), default=_json_default) + "\n"
+            for row in rows
+        ).encode()
+
+
+def stream_csv(query):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for rows in _batches(query):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file object that hands back whatever was written since the
+    last drain(). tell() keeps counting across drains, because the Parquet
+    writer records absolute offsets in the file footer.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("product_id", pa.int32()),
+        ("price", pa.float64()),
+        ("currency", pa.string()),
+        ("in_stock", pa.bool_()),
+        ("scraped_at", pa.timestamp("us", tz="UTC")),
+        ("last_seen_at", pa.timestamp("us", tz="UTC")),
+        ("observation_count", pa.int32()),
+    ])
+
+
+def stream_arrow(query, file_format: str):
+    """Stream Arrow IPC (one record batch per fetch) or Parquet (one row group per fetch)."""
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    for rows in _batches(query):
+        columns = list(zip(*rows))
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+        writer.write_batch(batch)
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(file_format: str, query):
+    if file_format == "ndjson":
+        return stream_ndjson(query)
+    if file_format == "csv":
+        return stream_csv(query)
+    return stream_arrow(query, file_format)
@@ -1,9 +1,17 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+import base64
+import json
+from datetime import datetime, time, timezone
+from typing import Literal
 
-from core.database import get_db
-from core.models import Product, PriceHistory, Retailer
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, func, or_, select
+
+from api import analytics, batch, export
+from api.cache import response_cache
+from core.database import get_async_db
+from core.models import Product, PriceHistory, PriceHistoryDaily, Retailer
 from worker.tasks import trigger_ecommerce_scrape, trigger_books_scrape, trigger_full_scrape
 
 
@@ -38,80 +46,354 @@ def trigger_books():
 
 @app.post("/scrape/trigger/all", tags=["scraping"])
 def trigger_all():
-    """Dispatch an async Celery task to run ALL spiders for maximum data volume."""
+    """Dispatch an async Celery task to run ALL spiders in parallel for maximum data volume."""
     task = trigger_full_scrape.delay()
     return {"message": "Full pipeline scrape queued.", "task_id": str(task.id)}
 
 
+# Columns the product listing can return, in response order
+PRODUCT_FIELDS = {
+    "id": Product.id,
+    "name": Product.name,
+    "sku": Product.sku,
+    "category": Product.category,
+    "brand": Product.brand,
+    "description": Product.description,
+    "image_url": Product.image_url,
+    "rating": Product.rating,
+    "review_count": Product.review_count,
+    "url": Product.url,
+    "retailer": Retailer.name,
+    # Denormalised from price_history at ingest; no history scan needed
+    "price": Product.latest_price,
+    "currency": Product.latest_currency,
+    "in_stock": Product.latest_in_stock,
+    "previous_price": Product.previous_price,
+    "last_changed_at": Product.last_changed_at,
+}
+
+# Listing orders; products without a price sort last either way
+PRODUCT_SORTS = {
+    "id": (Product.id,),
+    "price": (Product.latest_price.asc().nulls_last(), Product.id),
+    "-price": (Product.latest_price.desc().nulls_last(), Product.id),
+}
+
+
+def _encode_cursor(sort: str, last_id: int, last_price: float | None = None) -> str:
+    position = {"id": last_id} if sort == "id" else {"sort": sort, "id": last_id, "price": last_price}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def _decode_cursor(cursor: str, sort: str) -> dict:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        position["id"] = int(position["id"])
+        if position.get("sort", "id") != sort:
+            raise ValueError("cursor from a different sort order")
+        if sort != "id" and position["price"] is not None:
+            position["price"] = float(position["price"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return position
+
+
+def _after_cursor(position: dict, sort: str):
+    """Keyset condition: rows that follow `position` in the PRODUCT_SORTS order."""
+    after_id = Product.id > position["id"]
+    if sort == "id":
+        return after_id
+    price = Product.latest_price
+    if position["price"] is None:
+        return and_(price.is_(None), after_id)
+    beyond = price > position["price"] if sort == "price" else price < position["price"]
+    return or_(beyond, and_(price == position["price"], after_id), price.is_(None))
+
+
 @app.get("/api/v1/products", tags=["products"])
-def get_products(
+async def get_products(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     category: str | None = None,
-    db: Session = Depends(get_db)
+    min_price: float | None = None,
+    max_price: float | None = None,
+    in_stock: bool | None = None,
+    sort: Literal["id", "price", "-price"] = "id",
+    cursor: str | None = None,
+    fields: str | None = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    List all tracked products with enriched metadata.
-    Filter by category (e.g. laptops, tablets, phones).
+    List all tracked products with enriched metadata and current price.
+    Filter by category (e.g. laptops, tablets, phones), price range and
+    stock status; sort by `price` / `-price` (unpriced products last).
+
+    Paginate with `cursor`: when more rows may follow, the response carries an
+    opaque `X-Next-Cursor` header to pass back as `?cursor=` (with the same
+    `sort`). `skip` still works but gets slower deep into the catalogue.
+    `fields` is a comma separated subset of columns to return (e.g.
+    `fields=id,name,price`).
     """
-    query = db.query(Product)
+    if fields:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = sorted(set(names) - PRODUCT_FIELDS.keys())
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        names = list(PRODUCT_FIELDS)
+
+    # id (and the price, when sorting by it) is always selected because the
+    # cursor is built from it
+    columns = [PRODUCT_FIELDS[name].label(name) for name in names if name != "id"]
+    query = select(Product.id, Product.latest_price.label("_cursor_price"), *columns)
+    if "retailer" in names:
+        query = query.outerjoin(Retailer, Retailer.id == Product.retailer_id)
     if category:
-        query = query.filter(Product.category == category)
-    products = query.order_by(Product.id).offset(skip).limit(limit).all()
-
-    return [
-        {
-            "id": p.id,
-            "name": p.name,
-            "sku": p.sku,
-            "category": p.category,
-            "brand": p.brand,
-            "description": p.description,
-            "image_url": p.image_url,
-            "rating": p.rating,
-            "review_count": p.review_count,
-            "url": p.url,
-            "retailer": p.retailer.name if p.retailer else None,
-        }
-        for p in products
-    ]
+        query = query.where(Product.category == category)
+    if min_price is not None:
+        query = query.where(Product.latest_price >= min_price)
+    if max_price is not None:
+        query = query.where(Product.latest_price <= max_price)
+    if in_stock is not None:
+        query = query.where(Product.latest_in_stock.is_(in_stock))
+    if cursor:
+        query = query.where(_after_cursor(_decode_cursor(cursor, sort), sort))
+    elif skip:
+        query = query.offset(skip)
+
+    async def build(headers):
+        rows = (await db.execute(query.order_by(*PRODUCT_SORTS[sort]).limit(limit))).all()
+        if rows and len(rows) == limit:
+            headers["X-Next-Cursor"] = _encode_cursor(sort, rows[-1].id, rows[-1]._cursor_price)
+        return [{name: row._mapping[name] for name in names} for row in rows]
+
+    return await response_cache.respond(request, build)
 
 
 @app.get("/api/v1/products/{product_id}/prices", tags=["prices"])
-def get_product_prices(product_id: int, db: Session = Depends(get_db)):
-    """Return full time-series price history for a product, newest first."""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found.")
-
-    prices = (
-        db.query(PriceHistory)
-        .filter(PriceHistory.product_id == product_id)
-        .order_by(desc(PriceHistory.scraped_at))
-        .all()
-    )
+async def get_product_prices(product_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Return full time-series price history for a product, newest first.
 
-    return {
-        "product": {"id": product.id, "name": product.name, "sku": product.sku},
-        "price_history": [
-            {
-                "price": p.price,
-                "currency": p.currency,
-                "in_stock": p.in_stock,
-                "scraped_at": p.scraped_at,
-            }
-            for p in prices
-        ],
-    }
+    Each entry covers `observation_count` crawls that saw the same state,
+    from `scraped_at` to `last_seen_at` (equal for a single observation),
+    so the full series can be rebuilt even when snapshots are stored in
+    "delta" mode. Days whose raw partitions were compacted past retention
+    are served from the daily rollups (`resolution: "daily"`) after the
+    raw entries.
+    """
+    async def build(headers):
+        product = (await db.execute(
+            select(Product.id, Product.name, Product.sku).where(Product.id == product_id)
+        )).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found.")
+
+        prices = (await db.execute(
+            select(PriceHistory)
+            .where(PriceHistory.product_id == product_id)
+            .order_by(desc(PriceHistory.scraped_at))
+        )).scalars().all()
+        rollups = (await db.execute(
+            select(PriceHistoryDaily)
+            .where(PriceHistoryDaily.product_id == product_id)
+            .order_by(desc(PriceHistoryDaily.day))
+        )).scalars().all()
+
+        return {
+            "product": {"id": product.id, "name": product.name, "sku": product.sku},
+            "price_history": [
+                {
+                    "price": p.price,
+                    "currency": p.currency,
+                    "in_stock": p.in_stock,
+                    "scraped_at": p.scraped_at,
+                    "last_seen_at": p.last_seen_at or p.scraped_at,
+                    "observation_count": p.observation_count,
+                    "resolution": "raw",
+                }
+                for p in prices
+            ] + [
+                {
+                    "price": r.close_price,
+                    "currency": r.currency,
+                    "in_stock": r.in_stock_samples * 2 >= r.samples,
+                    "scraped_at": datetime.combine(r.day, time.min, tzinfo=timezone.utc),
+                    "last_seen_at": datetime.combine(r.day, time.max, tzinfo=timezone.utc),
+                    "observation_count": r.samples,
+                    "resolution": "daily",
+                    "min_price": r.min_price,
+                    "max_price": r.max_price,
+                    "avg_price": r.avg_price,
+                }
+                for r in rollups
+            ],
+        }
+
+    return await response_cache.respond(request, build)
+
+
+@app.post("/api/v1/prices:batch", tags=["prices"])
+async def get_prices_batch(
+    body: batch.BatchPricesRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Price histories for up to API_BATCH_MAX_PRODUCTS products in one call,
+    fetched with a single query and returned column-oriented: per product,
+    parallel arrays of epoch-millisecond timestamps, prices and stock flags.
+
+    `since`/`until` bound scraped_at. `resolution` is `raw` (every stored
+    snapshot) or `day`/`week`, which downsample to the last/min/max price per
+    bucket and include compacted daily rollups. Unknown ids are listed under
+    `missing`. See api/batch.py for the payload layout.
+    """
+    async def build(headers):
+        rows = (await db.execute(batch.batch_query(body))).all()
+        return batch.build_payload(body, rows)
+
+    return await response_cache.respond(request, build, key=body.cache_key(), encode=batch.encode)
+
+
+@app.get("/api/v1/analytics/price-changes", tags=["analytics"])
+async def get_price_changes(
+    request: Request,
+    days: int = Query(7, ge=1, le=3650),
+    direction: Literal["drops", "rises"] = "drops",
+    category: str | None = None,
+    limit: int = Query(20, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Products whose price fell (or rose) the most over the last `days` days,
+    by percent change from their first to their last priced snapshot.
+    """
+    generation = await response_cache.generation()
+
+    async def build(headers):
+        price_slice, summary = await analytics.cached_summary(db, days, category, generation)
+        indices = analytics.top_changes(summary, direction, limit)
+        return {"days": days, "direction": direction,
+                "products": analytics.product_rows(price_slice, summary, indices)}
+
+    return await response_cache.respond(request, build, encode=analytics.encode)
+
+
+@app.get("/api/v1/analytics/volatility", tags=["analytics"])
+async def get_volatility(
+    request: Request,
+    days: int = Query(30, ge=1, le=3650),
+    category: str | None = None,
+    per_category: bool = False,
+    limit: int = Query(20, ge=1, le=1000),
+    min_observations: int = Query(2, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Most volatile products over the last `days` days, by coefficient of
+    variation (price stddev / mean, weighted by observation). With
+    `per_category`, the top `limit` of every category.
+    """
+    generation = await response_cache.generation()
+
+    async def build(headers):
+        price_slice, summary = await analytics.cached_summary(db, days, category, generation)
+        groups = price_slice.category_codes() if per_category else None
+        indices = analytics.top_volatile(summary, limit, min_observations, groups)
+        return {"days": days, "products": analytics.product_rows(price_slice, summary, indices)}
+
+    return await response_cache.respond(request, build, encode=analytics.encode)
+
+
+@app.get("/api/v1/analytics/stock-outs", tags=["analytics"])
+async def get_stock_outs(
+    request: Request,
+    days: int = Query(30, ge=1, le=3650),
+    category: str | None = None,
+    limit: int = Query(20, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Products that went out of stock most often over the last `days` days."""
+    generation = await response_cache.generation()
+
+    async def build(headers):
+        price_slice, summary = await analytics.cached_summary(db, days, category, generation)
+        indices = analytics.top_stockouts(summary, limit)
+        return {"days": days, "products": analytics.product_rows(price_slice, summary, indices)}
+
+    return await response_cache.respond(request, build, encode=analytics.encode)
+
+
+@app.get("/api/v1/analytics/products/{product_id}/rolling", tags=["analytics"])
+async def get_rolling_stats(
+    product_id: int,
+    request: Request,
+    days: int = Query(90, ge=1, le=3650),
+    window: int = Query(7, ge=2, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Rolling min/max/stddev of one product's price over its last `window`
+    priced snapshots, as parallel arrays (epoch-millisecond timestamps).
+    """
+    async def build(headers):
+        price_slice = await analytics.load_slice(db, days, product_id=product_id)
+        if not len(price_slice.ids):
+            exists = (await db.execute(select(Product.id).where(Product.id == product_id))).first()
+            if not exists:
+                raise HTTPException(status_code=404, detail="Product not found.")
+        stats = analytics.rolling(price_slice, window)
+        del stats["product_index"]
+        return {"product_id": product_id, "days": days, "window": window, **stats}
+
+    return await response_cache.respond(request, build, encode=analytics.encode)
 
 
 @app.get("/api/v1/categories", tags=["products"])
-def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Return a summary of product counts per category."""
-    from sqlalchemy import func
-    results = (
-        db.query(Product.category, func.count(Product.id).label("count"))
-        .group_by(Product.category)
-        .all()
+    async def build(headers):
+        results = (await db.execute(
+            select(Product.category, func.count(Product.id).label("count"))
+            .group_by(Product.category)
+        )).all()
+        return [{"category": r.category, "product_count": r.count} for r in results]
+
+    return await response_cache.respond(request, build)
+
+
+@app.get("/api/v1/cache/stats", tags=["ops"])
+def get_cache_stats():
+    """
+    Response cache counters for this API process: hit ratio, 304s served and
+    the invalidation generation (bumped whenever a crawl finishes writing).
+    """
+    return response_cache.stats()
+
+
+@app.get("/api/v1/export/prices", tags=["prices"])
+def export_prices(
+    format: Literal["ndjson", "csv", "arrow", "parquet"] = "ndjson",
+    product_id: list[int] | None = Query(None),
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    """
+    Stream the whole price_history table, or a slice of it, as NDJSON, CSV,
+    Arrow IPC or Parquet (the last two need pyarrow installed).
+
+    Filter with repeated `product_id` params and a `since`/`until` range on
+    scraped_at. Rows are fetched with a server-side cursor, so memory use
+    does not grow with the size of the export.
+    """
+    if format in export.PYARROW_FORMATS and export.pa is None:
+        raise HTTPException(status_code=400, detail=f"Format '{format}' requires pyarrow.")
+
+    query = export.export_query(product_ids=product_id, since=since, until=until)
+    return StreamingResponse(
+        export.stream_export(format, query),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="price_history.{format}"'},
     )
-    return [{"category": r.category, "product_count": r.count} for r in results]
@@ -0,0 +1 @@
+# Offline benchmark scripts, run with `python -m benchmarks.<name>`
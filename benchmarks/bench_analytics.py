@@ -0,0 +1,141 @@
+"""
+Snapshots/sec through the price analytics in api/analytics.py, on a
+synthetic price_history slice (default 20,000 products x 60 snapshots =
+1.2M rows):
+
+  - loop:       per-product Python loop over the snapshot lists, the way
+                callers computed these metrics before the analytics API
+  - vectorised: analytics.summarise over the NumPy slice
+  - rolling:    analytics.rolling (min/max/stddev over --window snapshots),
+                which the loop path doesn't attempt
+
+The loop and vectorised results are compared before any rate is printed.
+Only the computation is timed, not loading from Postgres. The loop path
+runs on the first --loop-products products and its rate is extrapolated.
+
+    python -m benchmarks.bench_analytics --products 20000 --snapshots 60 --repeat 3
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from api import analytics
+
+
+def synthetic_slice(products: int, snapshots: int, seed: int = 1) -> analytics.PriceSlice:
+    """Random-walk prices, with some missing prices and stock-outs."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(max(1, snapshots // 2), snapshots * 3 // 2 + 1, products)
+    offsets = np.zeros(products + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    total = int(offsets[-1])
+
+    start = np.repeat(rng.uniform(5, 500, products), lengths)
+    steps = rng.choice([0.0, 0.0, 0.0, -0.05, 0.05], total) * start
+    price = np.round(start + _segment_cumsum(steps, offsets), 2)
+    price[rng.random(total) < 0.01] = np.nan
+    t = np.repeat(1.7e9 + rng.uniform(0, 86400, products), lengths) + _segment_cumsum(
+        np.full(total, 21600.0), offsets)
+
+    return analytics.PriceSlice(
+        ids=np.arange(1, products + 1, dtype=np.int64),
+        names=[f"Product {i}" for i in range(1, products + 1)],
+        skus=[f"sku-{i}" for i in range(1, products + 1)],
+        categories=[f"category-{i % 25}" for i in range(products)],
+        offsets=offsets,
+        t=t,
+        price=price,
+        in_stock=rng.random(total) > 0.05,
+        samples=rng.integers(1, 4, total),
+    )
+
+
+def _segment_cumsum(values, offsets):
+    totals = np.cumsum(values)
+    before = np.r_[0.0, totals][offsets[:-1]]
+    return totals - np.repeat(before, np.diff(offsets))
+
+
+def head(s: analytics.PriceSlice, products: int) -> analytics.PriceSlice:
+    end = int(s.offsets[products])
+    return analytics.PriceSlice(
+        ids=s.ids[:products], names=s.names[:products], skus=s.skus[:products],
+        categories=s.categories[:products], offsets=s.offsets[:products + 1],
+        t=s.t[:end], price=s.price[:end], in_stock=s.in_stock[:end], samples=s.samples[:end],
+    )
+
+
+def loop_summary(s: analytics.PriceSlice) -> dict:
+    """The same metrics as analytics.summarise, one product at a time in Python."""
+    prices, stock, samples = s.price.tolist(), s.in_stock.tolist(), s.samples.tolist()
+    out = {name: [] for name in analytics.PRICE_METRICS + analytics.COUNT_METRICS}
+    for i in range(len(s.ids)):
+        lo, hi = int(s.offsets[i]), int(s.offsets[i + 1])
+        points = [(p, w) for p, w in zip(prices[lo:hi], samples[lo:hi]) if not math.isnan(p)]
+        values = [p for p, _ in points]
+        if values:
+            first, last = values[0], values[-1]
+            weight = sum(w for _, w in points)
+            mean = sum(p * w for p, w in points) / weight
+            std = math.sqrt(sum(w * (p - mean) ** 2 for p, w in points) / weight)
+            row = {
+                "first_price": first, "last_price": last, "delta": last - first,
+                "pct_change": (last - first) / first * 100 if first > 0 else math.nan,
+                "min_price": min(values), "max_price": max(values),
+                "mean_price": mean, "std": std, "cv": std / mean if mean > 0 else math.nan,
+            }
+        else:
+            row = dict.fromkeys(analytics.PRICE_METRICS, math.nan)
+        row["price_changes"] = sum(a != b for a, b in zip(values, values[1:]))
+        row["stockouts"] = sum(a and not b for a, b in zip(stock[lo:hi], stock[lo + 1:hi]))
+        row["observations"] = sum(samples[lo:hi])
+        for name, value in row.items():
+            out[name].append(value)
+    return out
+
+
+def check(vectorised: dict, loop: dict, products: int):
+    for name, expected in loop.items():
+        if not np.allclose(vectorised[name][:products], expected, rtol=1e-9, equal_nan=True):
+            raise SystemExit(f"{name}: vectorised result differs from the loop")
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark price analytics")
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--snapshots", type=int, default=60, help="Mean snapshots per product")
+    parser.add_argument("--loop-products", type=int, default=2_000,
+                        help="Products the loop path runs on (extrapolated)")
+    parser.add_argument("--window", type=int, default=7, help="Rolling window, in snapshots")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    args = parser.parse_args()
+
+    price_slice = synthetic_slice(args.products, args.snapshots)
+    rows = len(price_slice.price)
+    sample = head(price_slice, min(args.loop_products, args.products))
+    print(f"{args.products:,} products, {rows:,} snapshots")
+
+    loop_seconds = min(timed(loop_summary, sample)[0] for _ in range(args.repeat))
+    loop_rate = len(sample.price) / loop_seconds
+    vector_seconds, summary = min(
+        (timed(analytics.summarise, price_slice) for _ in range(args.repeat)), key=lambda r: r[0])
+    check(summary, loop_summary(sample), len(sample.ids))
+    rolling_seconds = min(timed(analytics.rolling, price_slice, args.window)[0] for _ in range(args.repeat))
+
+    print(f"{'path':<11} {'seconds':>8} {'snapshots/s':>13} {'speedup':>8}")
+    print(f"{'loop':<11} {rows / loop_rate:>8.3f} {loop_rate:>13,.0f} {1:>7.2f}x  (extrapolated)")
+    rate = rows / vector_seconds
+    print(f"{'vectorised':<11} {vector_seconds:>8.3f} {rate:>13,.0f} {rate / loop_rate:>7.2f}x")
+    print(f"{'rolling':<11} {rolling_seconds:>8.3f} {rows / rolling_seconds:>13,.0f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Cards/sec through listing-page extraction, on saved fixture HTML
+(benchmarks/fixtures.py) for both spiders:
+
+  - css:      the original per-card extraction, one `card.css(...)` call per
+              field and fallback, the breadcrumb re-read for every card
+  - compiled: the spiders' parse callbacks, i.e. the precompiled ListingSpecs
+              (scraper/extraction.py)
+
+Both paths build the same ProductItems. Pages are parsed into lxml trees
+before timing unless --include-parse is given. No network involved.
+
+    python -m benchmarks.bench_extraction --pages 200 --repeat 5
+"""
+import argparse
+import logging
+import re
+import time
+
+from scrapy import Request
+from scrapy.http import HtmlResponse
+
+from benchmarks.fixtures import books_listing_page, ecommerce_listing_page
+from scraper.items import ProductItem
+from scraper.spiders.books_spider import STAR_RATING, BooksSpider
+from scraper.spiders.ecommerce_spider import EcommerceSpider
+
+
+def legacy_book(book, response, spider):
+    """BooksSpider._extract_book before ListingSpec."""
+    name = book.css("h3 a::attr(title)").get()
+    if not name:
+        return None
+    link = book.css("h3 a::attr(href)").get()
+    if not link:
+        return None
+    url = response.urljoin(link)
+    sku = url.rstrip("/").split("/")[-2]
+
+    raw_price = book.css(".price_color::text").get("").strip()
+    price = None
+    if raw_price:
+        try:
+            price = float(re.sub(r"[^\d.]", "", raw_price))
+        except ValueError:
+            pass
+
+    rating_class = book.css("p.star-rating::attr(class)").get("")
+    rating = STAR_RATING.get(rating_class.replace("star-rating", "").strip())
+
+    availability_text = book.css(".availability::text").getall()
+    in_stock = "in stock" in " ".join(availability_text).lower()
+
+    image_url = book.css("img.thumbnail::attr(src)").get()
+    if image_url:
+        image_url = response.urljoin(image_url)
+
+    breadcrumb = response.css("ul.breadcrumb li a::text").getall()
+    category = breadcrumb[-1].strip().lower() if len(breadcrumb) >= 2 else "books"
+
+    return ProductItem(
+        name=name.strip(), url=url, sku=sku, price=price, currency="GBP",
+        in_stock=in_stock, category=category, description=None,
+        image_url=image_url, rating=rating, review_count=None,
+        retailer_name=spider.retailer_name, retailer_domain=spider.retailer_domain,
+    )
+
+
+def legacy_product(product, response, spider, category):
+    """EcommerceSpider._extract_product before ListingSpec."""
+    name = (
+        product.css("a.title::attr(title)").get()
+        or product.css("a.title::text").get()
+        or ""
+    ).strip()
+    link = product.css("a.title::attr(href)").get()
+    if not name or not link:
+        return None
+    url = response.urljoin(link)
+    sku = url.rstrip("/").split("/")[-1]
+
+    raw_price = (
+        product.css("h4.pull-right.price::text").get()
+        or product.css(".price::text").get()
+        or product.css("h4.price::text").get()
+        or ""
+    ).strip()
+    price = None
+    if raw_price:
+        try:
+            price = float(raw_price.replace("$", "").replace(",", "").strip())
+        except ValueError:
+            pass
+
+    description = (
+        product.css("p.description::text").get()
+        or product.css(".description::text").get()
+        or ""
+    ).strip() or None
+
+    image_url = product.css("img.img-responsive::attr(src)").get()
+    if image_url:
+        image_url = response.urljoin(image_url)
+
+    rating_stars = product.css("span.ws-icon.ws-icon-star")
+    rating = float(len(rating_stars)) if rating_stars else None
+
+    review_text = (
+        product.css("div.ratings p::text").get()
+        or product.css(".ratings::text").get()
+        or ""
+    ).strip()
+    review_count = None
+    if review_text:
+        try:
+            review_count = int("".join(filter(str.isdigit, review_text)))
+        except ValueError:
+            pass
+
+    return ProductItem(
+        name=name, url=url, sku=sku, price=price, currency="USD", in_stock=True,
+        category=category, description=description, image_url=image_url,
+        rating=rating, review_count=review_count,
+        retailer_name=spider.retailer_name, retailer_domain=spider.retailer_domain,
+    )
+
+
+def css_books(responses, spider):
+    items = []
+    for response in responses:
+        for book in response.css("article.product_pod"):
+            items.append(legacy_book(book, response, spider))
+    return items
+
+
+def css_ecommerce(responses, spider):
+    items = []
+    for response in responses:
+        for product in response.css(".thumbnail"):
+            items.append(legacy_product(product, response, spider, response.meta["category"]))
+    return items
+
+
+def compiled(responses, spider):
+    items = []
+    for response in responses:
+        items.extend(out for out in spider.parse(response) if isinstance(out, ProductItem))
+    return items
+
+
+SITES = {
+    "books": {
+        "spider": BooksSpider,
+        "page": lambda n, count: books_listing_page(n, count),
+        "url": "https://books.toscrape.com/catalogue/page-{n}.html",
+        "css": css_books,
+    },
+    "ecommerce": {
+        "spider": EcommerceSpider,
+        "page": lambda n, count: ecommerce_listing_page(n, count),
+        "url": "https://webscraper.io/test-sites/e-commerce/allinone/computers/laptops?page={n}",
+        "css": css_ecommerce,
+    },
+}
+PATHS = ("css", "compiled")
+
+
+def make_responses(site: dict, pages: list, parse: bool) -> list:
+    responses = []
+    for n, html in enumerate(pages, start=1):
+        url = site["url"].format(n=n)
+        response = HtmlResponse(
+            url=url, body=html.encode(), encoding="utf-8",
+            request=Request(url, meta={"category": "laptops"}),
+        )
+        if parse:
+            response.selector  # noqa: B018 — parse now so only extraction is timed
+        responses.append(response)
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark listing-page extraction")
+    parser.add_argument("--pages", type=int, default=200, help="Fixture pages per site")
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+    parser.add_argument("--sites", nargs="+", choices=SITES, default=list(SITES))
+    parser.add_argument("--include-parse", action="store_true", help="Time HTML parsing too")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'site':<10} {'path':<9} {'cards':>6} {'cards/s':>10} {'speedup':>8}")
+    for name in args.sites:
+        site = SITES[name]
+        spider = site["spider"]()
+        pages = [site["page"](n, args.pages) for n in range(1, args.pages + 1)]
+        runs = {"css": site["css"], "compiled": compiled}
+
+        baseline, reference = None, None
+        for path in PATHS:
+            best = float("inf")
+            for _ in range(args.repeat):
+                responses = make_responses(site, pages, parse=not args.include_parse)
+                start = time.perf_counter()
+                items = runs[path](responses, spider)
+                best = min(best, time.perf_counter() - start)
+            # Both paths have to agree before their speed means anything
+            if reference is None:
+                reference = items
+            elif items != reference:
+                raise SystemExit(f"{name}: {path} extraction differs from css")
+            rate = len(items) / best
+            baseline = baseline or rate
+            print(f"{name:<10} {path:<9} {len(items):>6} {rate:>10,.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
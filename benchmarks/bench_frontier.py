@@ -0,0 +1,128 @@
+"""
+Crawl a local books fixture site with 1..N workers sharing one Redis
+frontier (scraper/frontier.py) and report wall time, plus a check that
+every page was fetched exactly once across workers.
+
+Only the first --seeds listing pages are seeded (split round-robin across
+workers); the rest have to be discovered through "next" links that one
+worker enqueues and any worker may pull. Uses an in-memory fake Redis
+(needs `fakeredis`) unless --redis-url is given, and runs the workers as
+concurrent in-process crawls (worker/crawl.py) on one reactor.
+
+    python -m benchmarks.bench_frontier --pages 80 --seeds 76 --workers 1 2 4
+"""
+import argparse
+import socket
+import threading
+import time
+import uuid
+
+from benchmarks.fixtures import FixtureServer, books_site
+from scraper.spiders.books_spider import BooksSpider
+from worker.crawl import run_spider
+
+
+class FixtureBooksSpider(BooksSpider):
+    name = "books_fixture"
+    allowed_domains = []
+
+    def __init__(self, page_count=BooksSpider.page_count, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_count = int(page_count)
+
+
+def fake_redis_url() -> str:
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    server.daemon_threads = True  # don't hold up interpreter exit on open client connections
+
+    class NoDelayHandler(server.RequestHandlerClass):
+        # fakeredis writes replies in pieces; avoid Nagle + delayed ACK stalls
+        def setup(self):
+            super().setup()
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    server.RequestHandlerClass = NoDelayHandler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return f"redis://{host}:{port}/0"
+
+
+def crawl(workers: int, site: FixtureServer, seeds: int, redis_url: str, concurrency: int) -> dict:
+    settings = {
+        "SPIDER_MODULES": ["benchmarks.bench_frontier"],
+        "SCHEDULER": "scraper.frontier.RedisScheduler",
+        "DUPEFILTER_CLASS": "scraper.frontier.RedisDupeFilter",
+        "FRONTIER_REDIS_URL": redis_url,
+        "FRONTIER_CRAWL_ID": f"bench:{uuid.uuid4().hex}",
+        "FRONTIER_EXPECTED_WORKERS": workers,
+        "FRONTIER_IDLE_WAIT": 1,
+        "ITEM_PIPELINES": {},
+        "DOWNLOAD_HANDLERS": {},
+        "HTTPCACHE_ENABLED": False,
+        "DOWNLOAD_DELAY": 0,
+        "CONCURRENT_REQUESTS": concurrency,
+        "LOG_LEVEL": "WARNING",
+    }
+    results = [None] * workers
+
+    def worker(index):
+        results[index] = run_spider(
+            FixtureBooksSpider.name,
+            settings=settings,
+            mode="inprocess",
+            spider_args={
+                "catalogue_url": f"{site.base_url}/catalogue",
+                "page_count": seeds,
+                "shard_index": index,
+                "shard_count": workers,
+            },
+        )
+
+    site.hits.clear()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    failed = [r["error"] for r in results if not r["ok"]]
+    if failed:
+        raise RuntimeError(f"Worker crawl failed: {failed[0]}")
+    return {
+        "elapsed": elapsed,
+        "items": sum(r["stats"].get("item_scraped_count", 0) for r in results),
+        "per_worker": [r["stats"].get("response_received_count", 0) for r in results],
+        "pages_fetched": len(site.hits),
+        "duplicate_fetches": sum(count - 1 for count in site.hits.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed crawl over a shared Redis frontier")
+    parser.add_argument("--pages", type=int, default=80, help="Listing pages on the fixture site")
+    parser.add_argument("--seeds", type=int, default=76, help="Listing pages seeded up front")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.2, help="Fixture response delay (seconds)")
+    parser.add_argument("--concurrency", type=int, default=2, help="CONCURRENT_REQUESTS per worker")
+    parser.add_argument("--redis-url", help="Use a real Redis instead of fakeredis")
+    args = parser.parse_args()
+
+    redis_url = args.redis_url or fake_redis_url()
+    print(f"{'workers':>7} {'seconds':>8} {'pages':>6} {'dupes':>6} {'items':>7}  responses per worker")
+    with FixtureServer(books_site(args.pages), latency=args.latency) as site:
+        for workers in args.workers:
+            result = crawl(workers, site, args.seeds, redis_url, args.concurrency)
+            print(
+                f"{workers:>7} {result['elapsed']:>8.2f} {result['pages_fetched']:>6} "
+                f"{result['duplicate_fetches']:>6} {result['items']:>7}  {result['per_worker']}"
+            )
+            if result["pages_fetched"] != args.pages or result["duplicate_fetches"]:
+                raise SystemExit(f"Frontier check failed: expected {args.pages} pages fetched once each")
+
+
+if __name__ == "__main__":
+    main()
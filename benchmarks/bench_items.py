@@ -0,0 +1,108 @@
+"""
+Memory and throughput of the item representation on a synthetic stream.
+
+  - legacy:  dict-backed scrapy.Item filled field by field, dict(item) into a
+             throwaway BaseModel, then key lookups to build the DB rows
+  - slotted: ProductItem (slotted dataclass) built in one call, validated
+             by the precompiled TypeAdapter, then attribute access to build
+             the DB rows (scraper.persistence.product_values/snapshot_values)
+
+Memory is the tracemalloc growth of holding --memory-items items at once
+(what a pipeline buffer or a feed batch holds); throughput is items/sec
+for spider -> validation -> row mapping over --items items, one at a time.
+
+    python -m benchmarks.bench_items --items 1000000 --memory-items 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.bench_validation import LegacyProductValidator, legacy_item, synthetic_fields
+from scraper.items import ProductItem, product_validator
+from scraper.persistence import product_values, snapshot_values
+
+
+def legacy_rows(item):
+    """product_values/snapshot_values as they read dict-style items."""
+    product = {
+        "retailer_id": 1,
+        "name": item["name"],
+        "url": str(item["url"]),
+        "sku": item["sku"],
+        "category": item.get("category") or None,
+        "description": item.get("description") or None,
+        "image_url": item.get("image_url") or None,
+        "rating": item.get("rating"),
+        "review_count": item.get("review_count"),
+    }
+    snapshot = {
+        "product_id": 1,
+        "price": item.get("price"),
+        "currency": item.get("currency", "USD"),
+        "in_stock": item.get("in_stock", True),
+    }
+    return product, snapshot
+
+
+def run_legacy(rows):
+    for fields in rows:
+        item = legacy_item(fields)
+        LegacyProductValidator(**dict(item))
+        legacy_rows(item)
+
+
+def run_slotted(rows):
+    for fields in rows:
+        item = product_validator.validate_python(ProductItem(**fields))
+        product_values(item, 1)
+        snapshot_values(item, 1)
+
+
+def memory_per_item(build, rows) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [build(fields) for fields in rows]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list itself is the same for both; count it anyway, it's 8 bytes an item
+    per_item = (after - before) / len(held)
+    del held
+    return per_item
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare item representations")
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--memory-items", type=int, default=100_000)
+    args = parser.parse_args()
+
+    # Field values are built up front and shared, so only the item
+    # containers themselves show up in the memory numbers
+    sample = list(synthetic_fields(args.memory_items))
+    memory = {
+        "legacy": memory_per_item(legacy_item, sample),
+        "slotted": memory_per_item(lambda fields: ProductItem(**fields), sample),
+    }
+    del sample
+
+    stream = list(synthetic_fields(args.items))
+    rates = {}
+    for name, run in (("legacy", run_legacy), ("slotted", run_slotted)):
+        start = time.perf_counter()
+        run(stream)
+        rates[name] = args.items / (time.perf_counter() - start)
+
+    print(f"{'item':<8} {'bytes/item':>10} {'items/s':>10}")
+    for name in ("legacy", "slotted"):
+        print(f"{name:<8} {memory[name]:>10,.0f} {rates[name]:>10,.0f}")
+    print(
+        f"slotted: {memory['legacy'] / memory['slotted']:.1f}x less memory per item, "
+        f"{rates['slotted'] / rates['legacy']:.2f}x throughput "
+        f"({args.items:,} items through spider -> validation -> row mapping)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Offline parse benchmark: replay recorded listing pages through the spiders'
+parse callbacks and the item pipelines, and report items/sec, time per
+stage and peak RSS. Nothing goes over the network.
+
+Stages, each run over every page/item before the next starts:
+
+  - load:     fixture files read into HtmlResponses
+  - parse:    HTML parsed into lxml trees (response.selector)
+  - extract:  BooksSpider.parse / EcommerceSpider.parse
+  - validate: ValidationPipeline
+  - persist:  PostgresPipeline in POSTGRES_BATCH_SIZE batches, against the
+              database configured in core/database.py, inside a transaction
+              that is rolled back after each run (skip with --no-db)
+
+Fixtures live in a directory with an index.json listing each page's spider,
+URL, file and request meta. `generate` writes pages built from
+benchmarks/fixtures.py; `capture` records live pages once, so they can be
+replayed later. The default directory, benchmarks/html/, is git-ignored;
+pass --fixtures to keep captured pages somewhere else.
+
+    python -m benchmarks.bench_parse generate --pages 50
+    python -m benchmarks.bench_parse capture --spider books \\
+        https://books.toscrape.com/catalogue/page-1.html
+    python -m benchmarks.bench_parse run --repeat 3 --json bench_parse.json
+    python -m benchmarks.bench_parse run --no-db --baseline bench_parse.json --max-regression 0.2
+
+`run` generates the default fixtures if the directory has none, and with
+--baseline exits non-zero when items/sec drops by more than
+--max-regression against the saved result, so it can gate CI.
+"""
+import argparse
+import json
+import logging
+import resource
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.utils.project import get_project_settings
+
+from benchmarks.fixtures import books_listing_page, ecommerce_listing_page
+from scraper.items import ProductItem
+from scraper.pipelines import PostgresPipeline, ValidationPipeline
+from scraper.spiders.books_spider import BooksSpider
+from scraper.spiders.ecommerce_spider import BASE_URL, EcommerceSpider
+
+DEFAULT_DIR = Path(__file__).parent / "html"
+SPIDERS = {"books": BooksSpider, "ecommerce": EcommerceSpider}
+STAGES = ("load", "parse", "extract", "validate", "persist")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux (bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+# --- fixtures ---
+
+def read_index(directory: Path) -> list:
+    path = directory / "index.json"
+    return json.loads(path.read_text()) if path.exists() else []
+
+
+def add_fixture(directory: Path, index: list, spider: str, url: str, html: bytes, meta: dict):
+    file = f"{spider}/{len([e for e in index if e['spider'] == spider]) + 1:04d}.html"
+    (directory / file).parent.mkdir(parents=True, exist_ok=True)
+    (directory / file).write_bytes(html)
+    index.append({"spider": spider, "url": url, "file": file, "meta": meta})
+
+
+def write_index(directory: Path, index: list):
+    (directory / "index.json").write_text(json.dumps(index, indent=2))
+
+
+def generate(directory: Path, pages: int):
+    """Write `pages` books and ecommerce listing pages (replacing any fixtures)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    index = []
+    for n in range(1, pages + 1):
+        add_fixture(
+            directory, index, "books",
+            f"{BooksSpider.catalogue_url}/page-{n}.html",
+            books_listing_page(n, pages).encode(), {},
+        )
+        add_fixture(
+            directory, index, "ecommerce",
+            f"{BASE_URL}/computers/laptops?page={n}",
+            ecommerce_listing_page(n, pages).encode(), {"category": "laptops"},
+        )
+    write_index(directory, index)
+    return index
+
+
+def capture(directory: Path, spider: str, urls: list, meta: dict):
+    """Fetch `urls` once and add them to the fixtures for `spider`."""
+    directory.mkdir(parents=True, exist_ok=True)
+    index = read_index(directory)
+    for url in urls:
+        request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (bench_parse)"})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            add_fixture(directory, index, spider, response.geturl(), response.read(), meta)
+        print(f"captured {url}")
+    write_index(directory, index)
+
+
+# --- run ---
+
+class Run:
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.rss_mb = {}
+        self.items = 0
+
+    def stage(self, name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.seconds[name] += time.perf_counter() - start
+        self.rss_mb[name] = peak_rss_mb()
+        return result
+
+
+def load(directory: Path, entries: list) -> list:
+    responses = []
+    for entry in entries:
+        url = entry["url"]
+        responses.append(HtmlResponse(
+            url=url,
+            body=(directory / entry["file"]).read_bytes(),
+            request=Request(url, meta=dict(entry["meta"])),
+        ))
+    return responses
+
+
+def parse(responses):
+    for response in responses:
+        response.selector  # noqa: B018 — builds and caches the lxml tree
+
+
+def extract(spider, responses) -> list:
+    items = []
+    for response in responses:
+        items.extend(out for out in spider.parse(response) if isinstance(out, ProductItem))
+    return items
+
+
+def validate(spider, items) -> list:
+    pipeline = ValidationPipeline()
+    return [pipeline.process_item(item, spider) for item in items]
+
+
+def persist(spider, items, batch_size: int):
+    # Imported here so --no-db runs don't need a database driver configured
+    from sqlalchemy.orm import Session
+    from core.database import engine
+    from scraper.persistence import ProductWriter
+
+    with engine.connect() as connection:
+        outer = connection.begin()
+        # The pipeline's commits become savepoint releases inside `outer`
+        db = Session(bind=connection, join_transaction_mode="create_savepoint")
+        pipeline = PostgresPipeline(batch_size=batch_size)
+        pipeline.db = db
+        pipeline.writer = ProductWriter(db)
+        try:
+            for item in items:
+                pipeline.process_item(item, spider)
+            pipeline._flush(spider)
+        finally:
+            db.close()
+            outer.rollback()
+
+
+def run_once(directory: Path, entries: list, batch_size: int, use_db: bool) -> Run:
+    run = Run()
+    by_spider = {}
+    for entry in entries:
+        by_spider.setdefault(entry["spider"], []).append(entry)
+
+    for name, spider_entries in by_spider.items():
+        spider = SPIDERS[name]()
+        responses = run.stage("load", load, directory, spider_entries)
+        run.stage("parse", parse, responses)
+        items = run.stage("extract", extract, spider, responses)
+        items = run.stage("validate", validate, spider, items)
+        if use_db:
+            run.stage("persist", persist, spider, items, batch_size)
+        run.items += len(items)
+    return run
+
+
+def summarise(run: Run, pages: int) -> dict:
+    total = sum(run.seconds.values())
+    return {
+        "pages": pages,
+        "items": run.items,
+        "persist": "persist" in run.rss_mb,
+        "seconds": round(total, 4),
+        "items_per_sec": round(run.items / total, 1),
+        "stages": {
+            name: {
+                "seconds": round(seconds, 4),
+                "items_per_sec": round(run.items / seconds, 1) if seconds else None,
+                "peak_rss_mb": round(run.rss_mb[name], 1),
+            }
+            for name, seconds in run.seconds.items() if name in run.rss_mb
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def report(result: dict):
+    print(f"{result['pages']} pages, {result['items']} items")
+    print(f"{'stage':<9} {'seconds':>8} {'items/s':>10} {'peak RSS':>9}")
+    for name, stage in result["stages"].items():
+        rate = f"{stage['items_per_sec']:,.0f}" if stage["items_per_sec"] else "-"
+        print(f"{name:<9} {stage['seconds']:>8.3f} {rate:>10} {stage['peak_rss_mb']:>7.1f}MB")
+    print(f"{'total':<9} {result['seconds']:>8.3f} {result['items_per_sec']:>10,.0f} {result['peak_rss_mb']:>7.1f}MB")
+
+
+def run(args):
+    directory = args.fixtures
+    entries = read_index(directory)
+    if not entries:
+        print(f"No fixtures in {directory}, generating {args.pages} pages per spider")
+        entries = generate(directory, args.pages)
+    if args.spiders:
+        entries = [e for e in entries if e["spider"] in args.spiders]
+
+    logging.disable(logging.INFO)
+    batch_size = args.batch_size or get_project_settings().getint("POSTGRES_BATCH_SIZE", 1)
+    runs = [run_once(directory, entries, batch_size, not args.no_db) for _ in range(args.repeat)]
+    best = min(runs, key=lambda r: sum(r.seconds.values()))
+    result = summarise(best, len(entries))
+    report(result)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline["persist"] != result["persist"]:
+            raise SystemExit("Baseline and this run differ in --no-db; their rates don't compare")
+        floor = baseline["items_per_sec"] * (1 - args.max_regression)
+        if result["items_per_sec"] < floor:
+            raise SystemExit(
+                f"Regression: {result['items_per_sec']:,.0f} items/s, "
+                f"baseline {baseline['items_per_sec']:,.0f} (floor {floor:,.0f})"
+            )
+        print(f"OK against baseline {baseline['items_per_sec']:,.0f} items/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline spider parse + pipeline benchmark")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_DIR, help="Fixture directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Write generated listing pages")
+    gen.add_argument("--pages", type=int, default=50, help="Pages per spider")
+
+    cap = commands.add_parser("capture", help="Record live pages (needs network)")
+    cap.add_argument("--spider", choices=SPIDERS, required=True)
+    cap.add_argument("--meta", nargs="*", default=[], metavar="KEY=VALUE",
+                     help="Request meta to replay with, e.g. category=laptops")
+    cap.add_argument("urls", nargs="+")
+
+    bench = commands.add_parser("run", help="Replay the fixtures and report")
+    bench.add_argument("--pages", type=int, default=50, help="Pages per spider if generating")
+    bench.add_argument("--spiders", nargs="+", choices=SPIDERS)
+    bench.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    bench.add_argument("--batch-size", type=int, help="Default: POSTGRES_BATCH_SIZE")
+    bench.add_argument("--no-db", action="store_true", help="Skip the persist stage")
+    bench.add_argument("--json", help="Write the result to this file")
+    bench.add_argument("--baseline", help="Result file from an earlier --json run")
+    bench.add_argument("--max-regression", type=float, default=0.2,
+                       help="Allowed items/sec drop against --baseline (fraction)")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        index = generate(args.fixtures, args.pages)
+        print(f"Wrote {len(index)} pages to {args.fixtures}")
+    elif args.command == "capture":
+        capture(args.fixtures, args.spider, args.urls, dict(kv.split("=", 1) for kv in args.meta))
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compare price_history ingest paths on synthetic snapshots:
+
+  - orm:    Session.add_all() of PriceHistory objects + flush
+  - insert: ProductWriter "insert" backend (multi-row INSERT per batch)
+  - copy:   ProductWriter "copy" backend (COPY FROM STDIN per batch)
+
+Runs against the database configured in core/database.py. Everything is
+written inside a transaction that is rolled back, so no data is kept.
+
+    python -m benchmarks.bench_price_history_ingest --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from core.database import SessionLocal
+from core.models import Retailer, Product, PriceHistory
+from scraper.persistence import ProductWriter
+
+
+def synthetic_snapshots(n: int, product_ids: list) -> list:
+    rng = random.Random(n)
+    return [
+        {
+            "product_id": rng.choice(product_ids),
+            "price": round(rng.uniform(1, 2000), 2),
+            "currency": "USD",
+            "in_stock": rng.random() > 0.1,
+        }
+        for _ in range(n)
+    ]
+
+
+def chunks(rows: list, size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def run_orm(db, rows, batch_size):
+    for batch in chunks(rows, batch_size):
+        db.add_all([PriceHistory(**row) for row in batch])
+        db.flush()
+
+
+def run_writer(backend):
+    def run(db, rows, batch_size):
+        writer = ProductWriter(db, snapshot_backend=backend)
+        for batch in chunks(rows, batch_size):
+            writer.write_snapshots(batch)
+    return run
+
+
+BACKENDS = {
+    "orm": run_orm,
+    "insert": run_writer("insert"),
+    "copy": run_writer("copy"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="Rows per write call (mirrors POSTGRES_BATCH_SIZE)")
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        retailer = Retailer(name="bench-retailer", domain="bench.invalid")
+        db.add(retailer)
+        db.flush()
+        products = [
+            Product(retailer_id=retailer.id, name=f"bench-{i}",
+                    url=f"https://bench.invalid/{i}", sku=f"bench-{i}")
+            for i in range(args.products)
+        ]
+        db.add_all(products)
+        db.flush()
+        product_ids = [p.id for p in products]
+
+        print(f"{'rows':>10}  {'backend':<8}  {'seconds':>9}  {'rows/sec':>12}")
+        for size in args.sizes:
+            rows = synthetic_snapshots(size, product_ids)
+            for name in args.backends:
+                savepoint = db.begin_nested()
+                start = time.perf_counter()
+                BACKENDS[name](db, rows, args.batch_size)
+                elapsed = time.perf_counter() - start
+                savepoint.rollback()
+                db.expunge_all()
+                print(f"{size:>10}  {name:<8}  {elapsed:>9.2f}  {size / elapsed:>12,.0f}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure per-task crawl overhead for both worker execution modes
+(see worker/crawl.py):
+
+  - subprocess: fresh `python -m scrapy crawl` per task
+  - inprocess:  CrawlerRunner on a long-lived reactor thread; the first
+                run includes starting the reactor, later runs are warm
+
+Each run crawls a probe spider that schedules no requests, so the timings
+are pure startup/shutdown cost: interpreter and imports, settings and
+middleware/pipeline construction. Item pipelines are disabled unless
+--pipelines is given (which also opens a DB session per crawl), and plain
+HTTP download handlers are used unless --playwright is given; the
+Playwright handler adds several seconds per crawl in either mode, because
+it starts the Playwright driver on engine start.
+
+    python -m benchmarks.bench_task_startup --runs 10
+"""
+import argparse
+import statistics
+import time
+
+import scrapy
+
+from worker.crawl import run_spider
+
+
+class StartupProbeSpider(scrapy.Spider):
+    name = "startup_probe"
+
+    def start_requests(self):
+        return []
+
+
+def time_runs(mode: str, runs: int, settings: dict) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run_spider(StartupProbeSpider.name, settings=settings, mode=mode)
+        timings.append(time.perf_counter() - start)
+        if not result["ok"]:
+            raise RuntimeError(f"{mode} probe crawl failed: {result['error']}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl task startup latency per execution mode")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--pipelines", action="store_true", help="Keep ITEM_PIPELINES enabled")
+    parser.add_argument("--playwright", action="store_true", help="Keep the Playwright download handler")
+    args = parser.parse_args()
+
+    settings = {"SPIDER_MODULES": ["benchmarks.bench_task_startup"], "LOG_LEVEL": "WARNING"}
+    if not args.pipelines:
+        settings["ITEM_PIPELINES"] = {}
+    if not args.playwright:
+        settings["DOWNLOAD_HANDLERS"] = {}
+
+    print(f"{'mode':<22} {'runs':>5} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    rows = {
+        "subprocess": time_runs("subprocess", args.runs, settings),
+    }
+    inprocess = time_runs("inprocess", args.runs + 1, settings)
+    rows["inprocess (cold)"] = inprocess[:1]
+    rows["inprocess (warm)"] = inprocess[1:]
+
+    for mode, timings in rows.items():
+        print(
+            f"{mode:<22} {len(timings):>5} {statistics.mean(timings) * 1000:>9.1f} "
+            f"{statistics.median(timings) * 1000:>9.1f} {max(timings) * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Items/sec through the item validation stage:
+
+  - model:    the original path, a dict-backed scrapy.Item copied with
+              dict(item) into a pydantic BaseModel that is then thrown away
+  - pipeline: ValidationPipeline.process_item on slotted ProductItems, i.e.
+              the precompiled TypeAdapter returning a normalised ProductItem
+  - batch:    one TypeAdapter(list[ProductItem]) call over all items
+
+No database or network involved.
+
+    python -m benchmarks.bench_validation --items 100000 --repeat 3
+"""
+import argparse
+import random
+import time
+from typing import Optional
+
+import scrapy
+from pydantic import BaseModel, Field, HttpUrl, TypeAdapter, field_validator
+
+from scraper.items import ProductItem
+from scraper.pipelines import ValidationPipeline
+
+
+class LegacyProductItem(scrapy.Item):
+    """The dict-backed item the spiders emitted before ProductItem."""
+    name = scrapy.Field()
+    url = scrapy.Field()
+    sku = scrapy.Field()
+    price = scrapy.Field()
+    currency = scrapy.Field()
+    in_stock = scrapy.Field()
+    category = scrapy.Field()
+    description = scrapy.Field()
+    image_url = scrapy.Field()
+    rating = scrapy.Field()
+    review_count = scrapy.Field()
+    retailer_name = scrapy.Field()
+    retailer_domain = scrapy.Field()
+
+
+class LegacyProductValidator(BaseModel):
+    """The BaseModel schema ValidationPipeline used before ProductItem."""
+    name: str = Field(min_length=1)
+    url: HttpUrl
+    sku: str = Field(min_length=1)
+    price: Optional[float] = None
+    currency: str = "USD"
+    in_stock: bool
+    category: Optional[str] = None
+    description: Optional[str] = None
+    image_url: Optional[str] = None
+    rating: Optional[float] = None
+    review_count: Optional[int] = None
+    retailer_name: str
+    retailer_domain: str
+
+    @field_validator("price")
+    @classmethod
+    def price_must_be_positive(cls, v):
+        if v is not None and v < 0:
+            raise ValueError("Price cannot be negative")
+        return v
+
+    @field_validator("rating")
+    @classmethod
+    def rating_range(cls, v):
+        if v is not None and not (0.0 <= v <= 5.0):
+            raise ValueError("Rating must be between 0 and 5")
+        return v
+
+
+class QuietSpider:
+    name = "bench"
+
+
+def synthetic_fields(n: int):
+    """Field values for n books-style products, as dicts."""
+    rng = random.Random(n)
+    for i in range(n):
+        yield {
+            "name": f"Book number {i}",
+            "url": f"https://books.toscrape.com/catalogue/book-{i}_{i}/index.html",
+            "sku": f"book-{i}_{i}",
+            "price": round(rng.uniform(10, 60), 2),
+            "currency": "GBP",
+            "in_stock": rng.random() > 0.1,
+            "category": "mystery",
+            "description": None,
+            "image_url": f"https://books.toscrape.com/media/cache/{i:04x}.jpg",
+            "rating": float(rng.randint(1, 5)),
+            "review_count": None,
+            "retailer_name": "Books to Scrape",
+            "retailer_domain": "books.toscrape.com",
+        }
+
+
+def legacy_item(fields: dict) -> LegacyProductItem:
+    # Field by field, the way the spiders used to fill it in
+    item = LegacyProductItem()
+    for key, value in fields.items():
+        item[key] = value
+    return item
+
+
+def run_model(items):
+    for item in items:
+        LegacyProductValidator(**dict(item))
+
+
+def run_pipeline(items):
+    pipeline, spider = ValidationPipeline(), QuietSpider()
+    for item in items:
+        pipeline.process_item(item, spider)
+
+
+def run_batch(items, adapter=TypeAdapter(list[ProductItem])):
+    adapter.validate_python(items)
+
+
+PATHS = {"model": run_model, "pipeline": run_pipeline, "batch": run_batch}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark item validation paths")
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs")
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS))
+    args = parser.parse_args()
+
+    rows = list(synthetic_fields(args.items))
+    inputs = {
+        "model": [legacy_item(row) for row in rows],
+        "pipeline": [ProductItem(**row) for row in rows],
+    }
+    inputs["batch"] = inputs["pipeline"]
+
+    baseline = None
+    print(f"{'path':<10} {'items/s':>10} {'speedup':>8}")
+    for name in args.paths:
+        best = min(_timed(PATHS[name], inputs[name]) for _ in range(args.repeat))
+        rate = args.items / best
+        baseline = baseline or rate
+        print(f"{name:<10} {rate:>10,.0f} {rate / baseline:>7.2f}x")
+
+
+def _timed(fn, items) -> float:
+    start = time.perf_counter()
+    fn(items)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Static HTML fixtures shaped like the target sites, and a local server for them.
+
+The markup mirrors what the spiders' selectors expect, so the spiders can
+crawl it unmodified (apart from the start URL and allowed domains).
+"""
+import hashlib
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAR_WORDS = ["One", "Two", "Three", "Four", "Five"]
+
+
+def books_listing_page(page: int, page_count: int, per_page: int = 20, genre: str = "Mystery") -> str:
+    """One books.toscrape.com catalogue listing page."""
+    rng = random.Random(page)
+    books = []
+    for i in range(per_page):
+        n = (page - 1) * per_page + i + 1
+        slug = f"book-{n}_{n}"
+        books.append(f"""
+        <li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+          <article class="product_pod">
+            <div class="image_container">
+              <a href="{slug}/index.html"><img src="../media/cache/{n:04x}.jpg" alt="Book {n}" class="thumbnail"></a>
+            </div>
+            <p class="star-rating {rng.choice(STAR_WORDS)}"><i class="icon-star"></i></p>
+            <h3><a href="{slug}/index.html" title="Book number {n}">Book number {n}</a></h3>
+            <div class="product_price">
+              <p class="price_color">£{rng.uniform(10, 60):.2f}</p>
+              <p class="instock availability"><i class="icon-ok"></i>
+                {"In stock" if rng.random() > 0.1 else "Out of stock"}
+              </p>
+            </div>
+          </article>
+        </li>""")
+    next_link = f'<li class="next"><a href="page-{page + 1}.html">next</a></li>' if page < page_count else ""
+    return f"""<!DOCTYPE html>
+<html lang="en-us"><head><title>All products | Books to Scrape - Sandbox</title></head>
+<body>
+  <ul class="breadcrumb"><li><a href="../index.html">Home</a></li><li><a href="#">{genre}</a></li><li class="active">All products</li></ul>
+  <section>
+    <ol class="row">{"".join(books)}
+    </ol>
+    <div><ul class="pager"><li class="current">Page {page} of {page_count}</li>{next_link}</ul></div>
+  </section>
+</body></html>"""
+
+
+def ecommerce_listing_page(page: int, page_count: int, per_page: int = 6, category: str = "laptops") -> str:
+    """One webscraper.io e-commerce test site listing page, as rendered."""
+    rng = random.Random(page)
+    products = []
+    for i in range(per_page):
+        n = (page - 1) * per_page + i + 1
+        stars = rng.randint(1, 5)
+        name = f"{category.title()} model {n}"
+        products.append(f"""
+        <div class="col-md-4 col-xl-4 col-lg-4">
+          <div class="card thumbnail">
+            <div class="product-wrapper card-body">
+              <img class="img-fluid card-img-top image img-responsive" alt="item" src="/images/test-sites/e-commerce/items/cart{n % 3}.png">
+              <div class="caption">
+                <h4 class="price float-end card-title pull-right">${rng.uniform(100, 1500):,.2f}</h4>
+                <h4><a href="/test-sites/e-commerce/allinone/product/{n}" class="title" title="{name}">{name}</a></h4>
+                <p class="description card-text">{name}, 15.6", Core i5, 8GB, 256GB SSD, Windows 11</p>
+              </div>
+              <div class="ratings">
+                <p class="review-count float-end">{rng.randint(0, 15)} reviews</p>
+                <p data-rating="{stars}">{'<span class="ws-icon ws-icon-star"></span>' * stars}</p>
+              </div>
+            </div>
+          </div>
+        </div>""")
+    next_link = (
+        f'<li class="page-item"><a class="page-link" href="?page={page + 1}" rel="next">›</a></li>'
+        if page < page_count else ""
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><title>Web Scraper Test Sites</title></head>
+<body>
+  <div class="container test-site">
+    <div class="row">
+      <div class="col-lg-9">
+        <h1 class="page-header">Computers / {category.title()}</h1>
+        <div class="row">{"".join(products)}
+        </div>
+        <nav><ul class="pagination"><li class="page-item active"><span class="page-link">{page}</span></li>{next_link}</ul></nav>
+      </div>
+    </div>
+  </div>
+</body></html>"""
+
+
+class FixtureServer:
+    """
+    Serve {path: html} from a background thread, with an optional per-request
+    delay to stand in for network latency. Counts hits per path. Responses
+    carry an ETag, and a matching If-None-Match gets a 304, like a static
+    file server; edit `pages` between crawls to change a page.
+    """
+
+    def __init__(self, pages: dict, latency: float = 0.0):
+        self.pages = pages
+        self.latency = latency
+        self.hits = {}
+        self._lock = threading.Lock()
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this,
+                # Nagle + delayed ACK adds ~40 ms to every response
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                if fixture.latency:
+                    time.sleep(fixture.latency)
+                body = fixture.pages.get(self.path)
+                with fixture._lock:
+                    fixture.hits[self.path] = fixture.hits.get(self.path, 0) + 1
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                etag = f'"{hashlib.md5(data).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def books_site(page_count: int, per_page: int = 20) -> dict:
+    return {
+        f"/catalogue/page-{page}.html": books_listing_page(page, page_count, per_page)
+        for page in range(1, page_count + 1)
+    }
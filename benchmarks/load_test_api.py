@@ -0,0 +1,93 @@
+"""
+Concurrent load test for the read API.
+
+Fires requests at a running API from `--concurrency` parallel clients for
+`--duration` seconds and reports requests/sec and latency percentiles per
+endpoint. Run it against two deployments (or the same one before and after
+a change) with the same flags to compare:
+
+    uvicorn api.main:app --port 8000 &
+    python -m benchmarks.load_test_api --base-url http://localhost:8000 --concurrency 64
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/v1/products?limit=100",
+    "/api/v1/categories",
+    "/api/v1/products/1/prices",
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def worker(client, paths, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        elapsed = time.perf_counter() - start
+        if ok:
+            latencies.setdefault(path, []).append(elapsed)
+        else:
+            errors[path] = errors.get(path, 0) + 1
+
+
+async def run(args):
+    latencies, errors = {}, {}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(
+            worker(client, args.paths, deadline, latencies, errors)
+            for _ in range(args.concurrency)
+        ))
+
+    print(f"{'endpoint':<40} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    total = 0
+    for path in args.paths:
+        samples = latencies.get(path, [])
+        total += len(samples)
+        if not samples:
+            print(f"{path:<40} {'-':>9} {'-':>9} {'-':>9} {errors.get(path, 0):>7}")
+            continue
+        print(
+            f"{path:<40} {len(samples) / args.duration:>9.1f} "
+            f"{statistics.median(samples) * 1000:>9.1f} "
+            f"{percentile(samples, 99) * 1000:>9.1f} {errors.get(path, 0):>7}"
+        )
+    all_samples = [s for samples in latencies.values() for s in samples]
+    if all_samples:
+        print(
+            f"{'TOTAL':<40} {total / args.duration:>9.1f} "
+            f"{statistics.median(all_samples) * 1000:>9.1f} "
+            f"{percentile(all_samples, 99) * 1000:>9.1f} {sum(errors.values()):>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout")
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
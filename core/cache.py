@@ -0,0 +1,30 @@
+"""
+Shared invalidation signal for the API response cache.
+
+Cached responses are keyed on a "generation" number kept in Redis. Anything
+that changes the data the API serves (a crawl finishing its writes,
+partition compaction) bumps the generation, which orphans every cached
+entry at once; stale entries then age out through their TTL.
+"""
+import logging
+import os
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+GENERATION_KEY = "api_cache:generation"
+
+
+def bump_generation() -> int | None:
+    """
+    Invalidate all cached API responses. Returns the new generation, or None
+    if Redis is unreachable (cached responses then expire by TTL instead).
+    """
+    try:
+        client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+        return client.incr(GENERATION_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"[CACHE] Could not invalidate API cache: {e}")
+        return None
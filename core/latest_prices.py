@@ -0,0 +1,71 @@
+"""
+Backfill the denormalised latest-price columns on products from price_history.
+
+ProductWriter keeps latest_price / latest_currency / latest_in_stock /
+previous_price / last_changed_at current as snapshots are written; this
+fills them in for history recorded before those columns existed (or repairs
+them). Products are processed in id ranges of BACKFILL_CHUNK, one
+transaction each, so a large table isn't locked in one go.
+
+    python -m core.latest_prices
+"""
+import logging
+import os
+
+from sqlalchemy import text
+
+from core.database import engine
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK = int(os.getenv("LATEST_PRICE_BACKFILL_CHUNK", "10000"))  # products per transaction
+
+# last_changed_at/previous_price come from the newest row whose price differs
+# from the row before it; a product whose price never changed gets its first
+# snapshot's time and no previous price
+BACKFILL_SQL = text("""
+    WITH ordered AS (
+        SELECT id, product_id, price, currency, in_stock, scraped_at,
+               lag(price) OVER by_time AS prior_price,
+               lag(id) OVER by_time AS prior_id,
+               row_number() OVER (PARTITION BY product_id ORDER BY scraped_at DESC, id DESC) AS newest
+        FROM price_history
+        WHERE product_id BETWEEN :first_id AND :last_id
+        WINDOW by_time AS (PARTITION BY product_id ORDER BY scraped_at, id)
+    ),
+    last_change AS (
+        SELECT DISTINCT ON (product_id) product_id, prior_price, scraped_at
+        FROM ordered
+        WHERE prior_id IS NULL OR price IS DISTINCT FROM prior_price
+        ORDER BY product_id, scraped_at DESC, id DESC
+    )
+    UPDATE products SET
+        latest_price = latest.price,
+        latest_currency = latest.currency,
+        latest_in_stock = latest.in_stock,
+        previous_price = last_change.prior_price,
+        last_changed_at = last_change.scraped_at
+    FROM ordered AS latest
+    LEFT JOIN last_change ON last_change.product_id = latest.product_id
+    WHERE latest.newest = 1 AND products.id = latest.product_id
+""")
+
+
+def backfill(chunk: int = BACKFILL_CHUNK) -> int:
+    """Recompute the latest-price columns for every product with history; returns rows updated."""
+    with engine.connect() as conn:
+        max_id = conn.execute(text("SELECT max(id) FROM products")).scalar() or 0
+
+    updated = 0
+    for first_id in range(1, max_id + 1, chunk):
+        with engine.begin() as conn:
+            updated += conn.execute(
+                BACKFILL_SQL, {"first_id": first_id, "last_id": first_id + chunk - 1}
+            ).rowcount
+        logger.info(f"[LATEST PRICES] Backfilled products up to id {first_id + chunk - 1}")
+    return updated
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print({"updated": backfill()})
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean,
-    DateTime, ForeignKey, Index, BigInteger, Text
+    Date, DateTime, ForeignKey, Index, BigInteger, Text
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -37,27 +37,80 @@ class Product(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Latest price_history state, kept current by ProductWriter in the same
+    # transaction as each snapshot (backfill: python -m core.latest_prices)
+    latest_price = Column(Float, nullable=True)
+    latest_currency = Column(String(10), nullable=True)
+    latest_in_stock = Column(Boolean, nullable=True)
+    previous_price = Column(Float, nullable=True)                   # price before the last change
+    last_changed_at = Column(DateTime(timezone=True), nullable=True) # when the price last changed
+
     retailer = relationship("Retailer", back_populates="products")
     price_history = relationship("PriceHistory", back_populates="product", cascade="all, delete")
 
     __table_args__ = (
         Index('idx_product_retailer_sku', 'retailer_id', 'sku', unique=True),
+        Index('idx_product_latest_price', 'latest_price', 'id'),
     )
 
 
 class PriceHistory(Base):
-    """Time-series price tracking data per product."""
+    """
+    Time-series price tracking data per product.
+
+    In "delta" storage mode a row is only appended when price, currency or
+    in_stock change; later identical observations bump observation_count and
+    last_seen_at on the latest row instead, so each row covers the interval
+    scraped_at..last_seen_at.
+
+    The table is range-partitioned by month on scraped_at (see
+    core/partitions.py), which is why scraped_at is part of the primary key.
+    """
     __tablename__ = "price_history"
 
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     price = Column(Float, nullable=True)
     currency = Column(String(10), default="USD")
     in_stock = Column(Boolean, default=True)
-    scraped_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    scraped_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)            # delta mode: latest unchanged observation
+    observation_count = Column(Integer, nullable=False, server_default="1")  # delta mode: crawls that saw this state
 
     product = relationship("Product", back_populates="price_history")
 
     __table_args__ = (
         Index('idx_product_id_scraped_at', 'product_id', 'scraped_at'),
+        {"postgresql_partition_by": "RANGE (scraped_at)"},
     )
+
+
+class PriceHistoryDaily(Base):
+    """Daily min/max/avg rollup of price_history partitions past retention."""
+    __tablename__ = "price_history_daily"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    currency = Column(String(10))
+    min_price = Column(Float)
+    max_price = Column(Float)
+    avg_price = Column(Float)                      # weighted by observation_count
+    close_price = Column(Float)                    # last price seen that day
+    samples = Column(Integer, nullable=False)      # observations rolled into this row
+    in_stock_samples = Column(Integer, nullable=False)
+
+
+class SpoolSegment(Base):
+    """
+    Load progress for one item spool segment (scraper/spool.py). Updated in
+    the same transaction as the rows it covers, so a segment is never
+    loaded twice or skipped past, whatever fails in between.
+    """
+    __tablename__ = "spool_segments"
+
+    name = Column(String(255), primary_key=True)
+    offset = Column(BigInteger, nullable=False, server_default="0")   # bytes loaded so far
+    records = Column(Integer, nullable=False, server_default="0")     # records loaded so far
+    rejected = Column(Integer, nullable=False, server_default="0")    # records set aside as unloadable
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,181 @@
+"""
+Monthly range partitions and retention for price_history.
+
+  - ensure_partitions:  create partitions from the current month up to
+                        PRICE_HISTORY_PARTITIONS_AHEAD months ahead
+  - compact_partitions: roll partitions older than
+                        PRICE_HISTORY_RETENTION_MONTHS up into daily
+                        min/max/avg rows (price_history_daily), then
+                        detach and drop them
+
+Both run daily from the `maintain_price_history` Celery beat task, or by
+hand with `python -m core.partitions`.
+"""
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+
+from core.database import engine
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_AHEAD = int(os.getenv("PRICE_HISTORY_PARTITIONS_AHEAD", "3"))
+RETENTION_MONTHS = int(os.getenv("PRICE_HISTORY_RETENTION_MONTHS", "0"))  # 0 = keep raw rows forever
+ROLLUP_EXPIRED = os.getenv("PRICE_HISTORY_ROLLUP", "true").lower() == "true"
+
+PARENT = "price_history"
+DEFAULT_PARTITION = "price_history_default"
+_PARTITION_NAME = re.compile(r"^price_history_y(\d{4})m(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def current_month() -> date:
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partition(table_name: str) -> bool:
+    return table_name == DEFAULT_PARTITION or bool(_PARTITION_NAME.match(table_name))
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+def existing_partitions(conn) -> dict:
+    """Return {first day of month: partition name} for attached monthly partitions."""
+    names = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+    """), {"parent": PARENT}).scalars()
+
+    partitions = {}
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_partition(conn, month: date) -> str:
+    """
+    Create the partition for one month.
+
+    Rows that already fell into the default partition for that month (e.g.
+    maintenance didn't run in time) are moved into the new partition first,
+    since Postgres refuses to attach a range the default partition overlaps.
+    """
+    name = partition_name(month)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    bounds = f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+
+    stray = conn.execute(text(f"""
+        SELECT EXISTS (
+            SELECT 1 FROM {DEFAULT_PARTITION}
+            WHERE scraped_at >= :lower AND scraped_at < :upper
+        )
+    """), {"lower": lower, "upper": upper}).scalar()
+
+    if not stray:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT} {bounds}"))
+        return name
+
+    conn.execute(text(
+        f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE scraped_at >= :lower AND scraped_at < :upper
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"lower": lower, "upper": upper})
+    conn.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} {bounds}"))
+    return name
+
+
+def ensure_partitions(conn, months_ahead: int = PARTITIONS_AHEAD) -> list:
+    """Create any missing partitions from this month to `months_ahead` months out."""
+    existing = existing_partitions(conn)
+    start = current_month()
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(start, offset)
+        if month not in existing:
+            created.append(create_partition(conn, month))
+    return created
+
+
+def rollup_partition(conn, name: str) -> int:
+    """Aggregate one partition into price_history_daily. Returns rows written."""
+    result = conn.execute(text(f"""
+        INSERT INTO price_history_daily (
+            product_id, day, currency, min_price, max_price, avg_price,
+            close_price, samples, in_stock_samples
+        )
+        SELECT
+            product_id,
+            (scraped_at AT TIME ZONE 'UTC')::date AS day,
+            (array_agg(currency ORDER BY scraped_at DESC))[1],
+            min(price),
+            max(price),
+            sum(price * observation_count)
+                / nullif(sum(observation_count) FILTER (WHERE price IS NOT NULL), 0),
+            (array_agg(price ORDER BY scraped_at DESC))[1],
+            sum(observation_count),
+            coalesce(sum(observation_count) FILTER (WHERE in_stock), 0)
+        FROM {name}
+        GROUP BY product_id, day
+        ON CONFLICT (product_id, day) DO NOTHING
+    """))
+    return result.rowcount
+
+
+def compact_partitions(conn, retention_months: int = RETENTION_MONTHS,
+                       rollup: bool = ROLLUP_EXPIRED) -> list:
+    """Roll up (optionally), detach and drop partitions past the retention window."""
+    if retention_months <= 0:
+        return []
+
+    cutoff = add_months(current_month(), -retention_months)
+    dropped = []
+    for month, name in sorted(existing_partitions(conn).items()):
+        if add_months(month, 1) > cutoff:
+            continue
+        if rollup:
+            rows = rollup_partition(conn, name)
+            logger.info(f"[PARTITIONS] Rolled {name} up into {rows} daily rows")
+        conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
+
+
+def run_maintenance() -> dict:
+    """Create upcoming partitions and compact expired ones, each in its own transaction."""
+    with engine.begin() as conn:
+        created = ensure_partitions(conn)
+    with engine.begin() as conn:
+        dropped = compact_partitions(conn)
+    if created or dropped:
+        logger.info(f"[PARTITIONS] Created {created}, compacted {dropped}")
+    return {"created": created, "compacted": dropped}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(run_maintenance())
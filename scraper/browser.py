@@ -0,0 +1,190 @@
+"""
+Playwright download handler with page pooling and resource blocking.
+
+Extends scrapy-playwright's handler:
+
+  - Page pool: when a spider doesn't keep the page (no playwright_include_page),
+    it is reset to about:blank and kept for the next request in the same
+    context instead of being closed. Up to PLAYWRIGHT_PAGE_POOL_SIZE idle pages
+    are kept per context; contexts themselves are already reused by name and
+    capped by PLAYWRIGHT_MAX_CONTEXTS / PLAYWRIGHT_MAX_PAGES_PER_CONTEXT.
+    An idle page still counts towards that cap, so while a request waits for
+    a page slot, released pages are closed rather than pooled.
+  - Resource blocking: sub-requests whose resource type is listed for the
+    spider in PLAYWRIGHT_BLOCKED_RESOURCE_TYPES, or whose URL contains one of
+    PLAYWRIGHT_BLOCKED_URL_PATTERNS, are aborted before they leave the browser.
+  - Render stats: playwright/render/* (count, time and bytes, totals and per
+    page) and playwright/blocked/* so the savings show up in crawl stats.
+
+Enable with:
+
+    DOWNLOAD_HANDLERS = {
+        "http": "scraper.browser.PooledPlaywrightDownloadHandler",
+        "https": "scraper.browser.PooledPlaywrightDownloadHandler",
+    }
+"""
+import logging
+import time
+from collections import deque
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from scrapy_playwright.handler import DEFAULT_CONTEXT_NAME, ScrapyPlaywrightDownloadHandler
+
+logger = logging.getLogger(__name__)
+
+
+class PooledPlaywrightDownloadHandler(ScrapyPlaywrightDownloadHandler):
+    def __init__(self, crawler):
+        super().__init__(crawler)
+        settings = crawler.settings
+        self.page_pool_size = settings.getint("PLAYWRIGHT_PAGE_POOL_SIZE")
+        self.blocked_types_by_spider = settings.getdict("PLAYWRIGHT_BLOCKED_RESOURCE_TYPES")
+        self.blocked_url_patterns = tuple(settings.getlist("PLAYWRIGHT_BLOCKED_URL_PATTERNS"))
+        self.idle_pages = {}   # context name -> deque of open, idle pages
+        self.page_waiters = {}  # context name -> requests waiting to create a page
+        self.page_bytes = {}   # page -> bytes received since its last render
+
+    def _blocked_types(self, spider) -> frozenset:
+        policy = self.blocked_types_by_spider
+        return frozenset(policy.get(spider.name, policy.get("default", ())))
+
+    # --- pool ---
+
+    async def _create_page(self, request, spider):
+        context_name = request.meta.setdefault("playwright_context", DEFAULT_CONTEXT_NAME)
+        pool = self.idle_pages.get(context_name)
+        while pool:
+            page = pool.popleft()
+            if not page.is_closed():
+                self.stats.inc_value("playwright/page_pool/reused")
+                return page
+
+        # Creating a page waits on the context's page semaphore, which only a
+        # closing page releases; _release_page checks for waiters here
+        self.page_waiters[context_name] = self.page_waiters.get(context_name, 0) + 1
+        try:
+            page = await super()._create_page(request, spider)
+        finally:
+            self.page_waiters[context_name] -= 1
+        self.stats.inc_value("playwright/page_pool/created")
+        self.page_bytes[page] = 0
+        page.on("requestfinished", self._make_bytes_counter(page))
+        page.on("close", lambda closed: self.page_bytes.pop(closed, None))
+        return page
+
+    async def _release_page(self, request, page):
+        context_name = request.meta.get("playwright_context", DEFAULT_CONTEXT_NAME)
+        pool = self.idle_pages.setdefault(context_name, deque())
+        if (
+            context_name in self.context_wrappers
+            and len(pool) < self.page_pool_size
+            and not self.page_waiters.get(context_name)
+        ):
+            try:
+                # Stop the previous document's scripts and free its memory
+                await page.goto("about:blank")
+            except Exception:
+                pass
+            else:
+                pool.append(page)
+                return
+        if not page.is_closed():
+            await page.close()
+            self.stats.inc_value("playwright/page_count/closed")
+            if self.page_waiters.get(context_name):
+                self.stats.inc_value("playwright/page_pool/closed_for_waiter")
+
+    async def _download_request_with_page(self, request, page, spider):
+        start = time.perf_counter()
+        if request.meta.get("playwright_include_page") or not self.page_pool_size:
+            # The spider owns the page (and closes it), or pooling is off
+            response = await super()._download_request_with_page(request, page, spider)
+            self._record_render(page, start)
+            return response
+
+        # Have the base handler leave the page open, then pool it ourselves
+        request.meta["playwright_include_page"] = True
+        try:
+            response = await super()._download_request_with_page(request, page, spider)
+        except Exception:
+            if not page.is_closed():
+                await page.close()
+                self.stats.inc_value("playwright/page_count/closed")
+            raise
+        finally:
+            del request.meta["playwright_include_page"]
+            request.meta.pop("playwright_page", None)
+        self._record_render(page, start)
+        await self._release_page(request, page)
+        return response
+
+    async def _apply_page_methods(self, page, request, spider):
+        # A wait that times out (e.g. wait_for_selector) still leaves a page
+        # worth parsing, so log it and carry on rather than fail the request
+        try:
+            await super()._apply_page_methods(page, request, spider)
+        except PlaywrightTimeoutError as e:
+            self.stats.inc_value("playwright/page_methods/timeout")
+            logger.warning(f"Timeout in page method on {request.url}: {e.message.splitlines()[0]}")
+
+    # --- blocking ---
+
+    def _make_request_handler(self, context_name, method, url, headers, body, encoding, spider):
+        handler = super()._make_request_handler(
+            context_name=context_name, method=method, url=url, headers=headers,
+            body=body, encoding=encoding, spider=spider,
+        )
+        blocked_types = self._blocked_types(spider)
+        blocked_patterns = self.blocked_url_patterns
+
+        async def _request_handler(route, playwright_request):
+            resource_type = playwright_request.resource_type
+            if not playwright_request.is_navigation_request() and (
+                resource_type in blocked_types
+                or any(pattern in playwright_request.url for pattern in blocked_patterns)
+            ):
+                self.stats.inc_value("playwright/blocked")
+                self.stats.inc_value(f"playwright/blocked/resource_type/{resource_type}")
+                await route.abort("blockedbyclient")
+                return
+            await handler(route, playwright_request)
+
+        return _request_handler
+
+    # --- stats ---
+
+    def _make_bytes_counter(self, page):
+        async def count_bytes(playwright_request):
+            try:
+                sizes = await playwright_request.sizes()
+            except Exception:
+                return
+            if page in self.page_bytes:
+                self.page_bytes[page] += (
+                    sizes["responseBodySize"] + sizes["responseHeadersSize"]
+                )
+
+        return count_bytes
+
+    def _record_render(self, page, start):
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+        # Sub-resources that finish after the content was captured count
+        # towards the page's next render, which is close enough for totals
+        received = self.page_bytes.get(page, 0)
+        if page in self.page_bytes:
+            self.page_bytes[page] = 0
+
+        stats = self.stats
+        stats.inc_value("playwright/render/count")
+        stats.inc_value("playwright/render/time_ms", elapsed_ms)
+        stats.inc_value("playwright/render/bytes", received)
+        stats.max_value("playwright/render/time_ms/max", elapsed_ms)
+        count = stats.get_value("playwright/render/count")
+        stats.set_value(
+            "playwright/render/time_ms_per_page",
+            round(stats.get_value("playwright/render/time_ms") / count),
+        )
+        stats.set_value(
+            "playwright/render/bytes_per_page",
+            round(stats.get_value("playwright/render/bytes") / count),
+        )
@@ -0,0 +1,98 @@
+import json
+import time
+from datetime import datetime
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+
+def serialisable_stats(stats: dict) -> dict:
+    """Crawl stats with datetimes as ISO strings, safe to JSON-encode or return from a task."""
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in stats.items()
+    }
+
+
+class StatsFileExtension:
+    """
+    Write the final crawl stats as JSON to the STATS_FILE path.
+
+    Lets a parent process (the "subprocess" execution mode in
+    worker/crawl.py) read a crawl's stats without parsing its log output.
+    Disabled unless STATS_FILE is set.
+    """
+
+    def __init__(self, path, stats):
+        self.path = path
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get("STATS_FILE")
+        if not path:
+            raise NotConfigured
+        ext = cls(path, crawler.stats)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_closed(self, spider, reason):
+        stats = serialisable_stats(self.stats.get_stats())
+        stats.setdefault("finish_reason", reason)
+        with open(self.path, "w") as f:
+            json.dump(stats, f)
+
+
+class ReactorStallMonitor:
+    """
+    Measure how long the reactor thread is blocked during a crawl.
+
+    A timer is scheduled every REACTOR_STALL_INTERVAL seconds; when it fires
+    late by more than REACTOR_STALL_THRESHOLD seconds, the reactor was busy
+    (a blocking DB call, a slow callback, ...) and every in-flight download
+    waited with it. Reported as reactor/stall_count, reactor/stall_time_ms
+    (total lateness) and reactor/stall_max_ms.
+    """
+
+    def __init__(self, stats, interval, threshold):
+        self.stats = stats
+        self.interval = interval
+        self.threshold = threshold
+        self.loop = None
+        self.expected = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("REACTOR_STALL_MONITOR_ENABLED"):
+            raise NotConfigured
+        ext = cls(
+            crawler.stats,
+            interval=settings.getfloat("REACTOR_STALL_INTERVAL", 0.1),
+            threshold=settings.getfloat("REACTOR_STALL_THRESHOLD", 0.05),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        self.stats.set_value("reactor/stall_count", 0)
+        self.stats.set_value("reactor/stall_time_ms", 0)
+        self.expected = time.monotonic() + self.interval
+        self.loop = task.LoopingCall(self.tick)
+        self.loop.start(self.interval, now=False)
+
+    def tick(self):
+        now = time.monotonic()
+        late = now - self.expected
+        self.expected = now + self.interval
+        if late > self.threshold:
+            late_ms = round(late * 1000)
+            self.stats.inc_value("reactor/stall_count")
+            self.stats.inc_value("reactor/stall_time_ms", late_ms)
+            self.stats.max_value("reactor/stall_max_ms", late_ms)
+
+    def spider_closed(self, spider, reason):
+        if self.loop and self.loop.running:
+            self.loop.stop()
@@ -0,0 +1,128 @@
+"""
+Declarative extraction for listing pages.
+
+A ListingSpec maps field names to Fields (CSS selectors with fallbacks and a
+converter) and is compiled once, when the spider module is imported, to lxml
+XPath objects. Extracting a page then runs the compiled expressions directly
+on the response's already-parsed lxml tree:
+
+  - no per-card Selector/SelectorList wrappers and no CSS-to-XPath
+    translation per call, as with `card.css(...)`
+  - every card on the page is extracted in one pass over the card nodes
+  - page-level fields (breadcrumb, next page link, ...) are evaluated once per
+    page instead of once per card
+
+Selectors use Scrapy's CSS dialect, including ::text and ::attr(name).
+
+    spec = ListingSpec(
+        "article.product_pod",
+        fields={"name": Field("h3 a::attr(title)", required=True), ...},
+        page_fields={"next_page": Field("li.next a::attr(href)")},
+    )
+    listing = spec.extract(response)   # listing.page, listing.items
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
+
+_translator = HTMLTranslator()
+
+
+def compile_css(css: str) -> etree.XPath:
+    # Plain strings instead of lxml "smart" strings, which keep a reference
+    # to their parent element (and so the whole tree) alive
+    return etree.XPath(_translator.css_to_xpath(css), smart_strings=False)
+
+
+class Field:
+    """
+    One extracted value.
+
+    Selectors are tried in order; the first one matching a non-blank value
+    wins. With many=True the converter gets every match of the first
+    matching selector as a list (e.g. to join text nodes or count elements).
+    A converter raising ValueError, or no selector matching, gives `default`.
+    """
+
+    __slots__ = ("selectors", "convert", "default", "many", "required", "_xpaths")
+
+    def __init__(
+        self,
+        *selectors: str,
+        convert: Optional[Callable] = None,
+        default=None,
+        many: bool = False,
+        required: bool = False,
+    ):
+        if not selectors:
+            raise ValueError("Field needs at least one selector")
+        self.selectors = selectors
+        self.convert = convert
+        self.default = default
+        self.many = many
+        self.required = required
+        self._xpaths = tuple(compile_css(css) for css in selectors)
+
+    def extract(self, node):
+        value = self._first(node)
+        if value is None:
+            return self.default
+        if self.convert is not None:
+            try:
+                return self.convert(value)
+            except ValueError:
+                return self.default
+        return value
+
+    def _first(self, node):
+        for xpath in self._xpaths:
+            matches = xpath(node)
+            if not matches:
+                continue
+            if self.many:
+                return matches
+            value = matches[0]
+            if isinstance(value, str):
+                value = value.strip()
+                if not value:
+                    continue
+            return value
+        return None
+
+
+@dataclass(slots=True)
+class Listing:
+    page: dict     # page-level field values
+    items: list    # one dict per card with all required fields present
+    skipped: int   # cards dropped for a missing required field
+
+
+class ListingSpec:
+    """Cards matching `item`, each extracted with `fields`; `page_fields` once per page."""
+
+    def __init__(self, item: str, fields: dict, page_fields: Optional[dict] = None):
+        self.item = item
+        self.fields = fields
+        self.page_fields = page_fields or {}
+        self._item_xpath = compile_css(item)
+        self._fields = tuple(fields.items())
+        self._required = tuple(name for name, field in self._fields if field.required)
+
+    def extract(self, response) -> Listing:
+        root = response.selector.root
+        page = {name: field.extract(root) for name, field in self.page_fields.items()}
+        fields, required = self._fields, self._required
+        items, skipped = [], 0
+        for card in self._item_xpath(root):
+            values = {name: field.extract(card) for name, field in fields}
+            if any(values[name] is None for name in required):
+                skipped += 1
+                continue
+            items.append(values)
+        return Listing(page, items, skipped)
+
+    def count(self, response) -> int:
+        """Number of cards on the page, without extracting them."""
+        return len(self._item_xpath(response.selector.root))
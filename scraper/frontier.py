@@ -0,0 +1,205 @@
+"""
+Redis-backed crawl frontier, shared by every worker in one distributed crawl.
+
+  - RedisDupeFilter: request fingerprints in one Redis set, so a page that
+    any worker has scheduled is skipped by all the others
+  - RedisScheduler:  pending requests in one Redis sorted set (by priority,
+    then FIFO), so any worker can pull the next page another one discovered
+
+Workers join the same crawl by sharing FRONTIER_CRAWL_ID; without one, each
+crawl gets a frontier of its own. Whoever starts a shared crawl sets
+FRONTIER_EXPECTED_WORKERS, and the keys are deleted once that many workers
+have finished normally, so a shard that starts late still sees what the
+others crawled. Otherwise (a failed worker, or no expected count) they
+expire FRONTIER_TTL seconds after the last write. Enable with:
+
+    SCHEDULER = "scraper.frontier.RedisScheduler"
+    DUPEFILTER_CLASS = "scraper.frontier.RedisDupeFilter"
+"""
+import logging
+import os
+import pickle
+import time
+import uuid
+
+import redis
+from twisted.internet import task
+from scrapy.core.scheduler import BaseScheduler
+from scrapy.dupefilters import BaseDupeFilter
+from scrapy.utils.misc import create_instance, load_object
+from scrapy.utils.request import request_from_dict
+
+logger = logging.getLogger(__name__)
+
+
+def frontier_client(settings):
+    url = settings.get("FRONTIER_REDIS_URL") or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    return redis.Redis.from_url(url)
+
+
+def frontier_key(crawl_id: str, suffix: str) -> str:
+    return f"frontier:{crawl_id}:{suffix}"
+
+
+class RedisDupeFilter(BaseDupeFilter):
+    def __init__(self, client, fingerprinter, ttl: int, stats=None, debug=False):
+        self.client = client
+        self.fingerprinter = fingerprinter
+        self.ttl = ttl
+        self.stats = stats
+        self.debug = debug
+        self.key = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            frontier_client(settings),
+            crawler.request_fingerprinter,
+            settings.getint("FRONTIER_TTL"),
+            stats=crawler.stats,
+            debug=settings.getbool("DUPEFILTER_DEBUG"),
+        )
+
+    def open(self):
+        # The key needs the spider name, which the scheduler passes in via bind()
+        pass
+
+    def bind(self, key: str):
+        self.key = key
+
+    def request_seen(self, request) -> bool:
+        fingerprint = self.fingerprinter.fingerprint(request)
+        added = self.client.sadd(self.key, fingerprint)
+        self.client.expire(self.key, self.ttl)
+        return added == 0
+
+    def log(self, request, spider):
+        if self.debug:
+            logger.debug(f"Filtered duplicate request: {request}", extra={"spider": spider})
+        if self.stats is not None:
+            self.stats.inc_value("dupefilter/filtered", spider=spider)
+
+
+class RedisScheduler(BaseScheduler):
+    """
+    Scheduler whose queue lives in Redis.
+
+    An empty queue doesn't end the crawl straight away: other workers may
+    still be parsing pages that will add requests, so has_pending_requests()
+    stays true until the queue has been empty for FRONTIER_IDLE_WAIT seconds.
+
+    Requests other workers push don't wake this worker's engine, which
+    otherwise only re-polls an empty scheduler on its 5 s heartbeat, so the
+    queue is checked every FRONTIER_POLL_INTERVAL seconds and the engine is
+    nudged when work shows up.
+    """
+
+    def __init__(self, client, dupefilter, settings, stats=None, crawler=None):
+        self.client = client
+        self.df = dupefilter
+        self.settings = settings
+        self.stats = stats
+        self.crawler = crawler
+        self.ttl = settings.getint("FRONTIER_TTL")
+        self.idle_wait = settings.getfloat("FRONTIER_IDLE_WAIT")
+        self.poll_interval = settings.getfloat("FRONTIER_POLL_INTERVAL")
+        self._poll = None
+        self.spider = None
+        self.queue_key = None
+        self.sequence_key = None
+        self.seen_key = None
+        self.finished_key = None
+        self.expected_workers = 0
+        self._last_activity = time.monotonic()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        dupefilter_cls = load_object(crawler.settings["DUPEFILTER_CLASS"])
+        return cls(
+            frontier_client(crawler.settings),
+            create_instance(dupefilter_cls, crawler.settings, crawler),
+            crawler.settings,
+            stats=crawler.stats,
+            crawler=crawler,
+        )
+
+    def open(self, spider):
+        self.spider = spider
+        crawl_id = self.settings.get("FRONTIER_CRAWL_ID")
+        if crawl_id:
+            self.expected_workers = self.settings.getint("FRONTIER_EXPECTED_WORKERS")
+        else:
+            # A crawl that shares no id must not inherit a previous run's seen set
+            crawl_id = f"{spider.name}:{uuid.uuid4().hex}"
+            self.expected_workers = 1
+        self.queue_key = frontier_key(crawl_id, "queue")
+        self.sequence_key = frontier_key(crawl_id, "sequence")
+        self.seen_key = frontier_key(crawl_id, "seen")
+        self.finished_key = frontier_key(crawl_id, "finished")
+        if isinstance(self.df, RedisDupeFilter):
+            self.df.bind(self.seen_key)
+        self._last_activity = time.monotonic()
+        if self.poll_interval > 0:
+            self._poll = task.LoopingCall(self._wake_engine)
+            self._poll.start(self.poll_interval, now=False)
+        return self.df.open()
+
+    def close(self, reason):
+        if self._poll and self._poll.running:
+            self._poll.stop()
+        if reason == "finished" and self.expected_workers > 0:
+            pipe = self.client.pipeline()
+            pipe.incr(self.finished_key)
+            pipe.expire(self.finished_key, self.ttl)
+            finished, _ = pipe.execute()
+            if finished >= self.expected_workers:
+                # Every worker of the crawl is done: nothing is left to share
+                self.client.delete(self.queue_key, self.sequence_key, self.seen_key, self.finished_key)
+        return self.df.close(reason)
+
+    def _wake_engine(self):
+        # Engine internals: the slot's CallLaterOnce that runs _next_request
+        slot = getattr(self.crawler.engine, "_slot", None) if self.crawler else None
+        if slot is not None and self.client.zcard(self.queue_key):
+            slot.nextcall.schedule()
+
+    def enqueue_request(self, request) -> bool:
+        if not request.dont_filter and self.df.request_seen(request):
+            self.df.log(request, self.spider)
+            return False
+
+        # Lower score pops first: priority descending, then insertion order
+        sequence = self.client.incr(self.sequence_key)
+        member = pickle.dumps(
+            (sequence, request.to_dict(spider=self.spider)), protocol=pickle.HIGHEST_PROTOCOL
+        )
+        pipe = self.client.pipeline()
+        pipe.zadd(self.queue_key, {member: -request.priority * 1e12 + sequence})
+        pipe.expire(self.queue_key, self.ttl)
+        pipe.expire(self.sequence_key, self.ttl)
+        pipe.execute()
+        self._last_activity = time.monotonic()
+        if self.stats is not None:
+            self.stats.inc_value("scheduler/enqueued/redis", spider=self.spider)
+            self.stats.inc_value("scheduler/enqueued", spider=self.spider)
+        return True
+
+    def next_request(self):
+        popped = self.client.zpopmin(self.queue_key)
+        if not popped:
+            return None
+        _, data = pickle.loads(popped[0][0])
+        self._last_activity = time.monotonic()
+        if self.stats is not None:
+            self.stats.inc_value("scheduler/dequeued/redis", spider=self.spider)
+            self.stats.inc_value("scheduler/dequeued", spider=self.spider)
+        return request_from_dict(data, spider=self.spider)
+
+    def has_pending_requests(self) -> bool:
+        if self.client.zcard(self.queue_key):
+            return True
+        return time.monotonic() - self._last_activity < self.idle_wait
+
+    def __len__(self):
+        return self.client.zcard(self.queue_key)
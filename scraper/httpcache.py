@@ -0,0 +1,242 @@
+"""
+HTTP cache for recurring crawls: revalidate every page, skip unchanged ones.
+
+  - RevalidatingPolicy:     never trusts a cached page without asking. Each
+                            request carries If-None-Match / If-Modified-Since
+                            from the cached copy, and a page counts as
+                            unchanged on a 304 or when the fresh body is
+                            byte-identical to the cached one.
+  - SqliteCacheStorage:     one SQLite file per spider with zlib-compressed
+                            bodies, instead of a directory tree per page.
+  - UnchangedPageMiddleware: spider middleware that remembers what each page's
+                            callback produced. When the page comes back
+                            unchanged the callback isn't run; the recorded
+                            follow-up requests are replayed, and each recorded
+                            product is emitted as an UnchangedItem, which the
+                            Postgres pipeline turns into a "seen again" bump
+                            on its latest price_history row.
+
+Rendered (Playwright) requests are not cached: the browser fetches its own
+sub-resources, so there is nothing to revalidate against.
+"""
+import logging
+import pickle
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from scrapy.utils.request import request_from_dict
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+from scraper.items import ProductItem, UnchangedItem
+
+logger = logging.getLogger(__name__)
+
+# Item fields kept per page so an unchanged page can be replayed as UnchangedItems
+UNCHANGED_FIELDS = ("retailer_name", "retailer_domain", "sku", "url")
+
+
+def cache_db_path(settings, spider) -> Path:
+    return Path(data_path(settings["HTTPCACHE_DIR"], createdir=True), f"{spider.name}.sqlite")
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    # Autocommit + WAL: every write is its own cheap transaction, and shards
+    # of one spider on the same host can share the file
+    db = sqlite3.connect(str(path), isolation_level=None, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS responses (
+            fingerprint TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            headers BLOB NOT NULL,
+            body BLOB NOT NULL,
+            stored_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS page_outputs (
+            fingerprint TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            stored_at REAL NOT NULL
+        );
+    """)
+    return db
+
+
+class RevalidatingPolicy(RFC2616Policy):
+    def should_cache_request(self, request):
+        return not request.meta.get("playwright") and super().should_cache_request(request)
+
+    def should_cache_response(self, response, request):
+        # Validators aren't required: a page without them is still compared by body
+        cc = self._parse_cachecontrol(response)
+        return b"no-store" not in cc and 200 <= response.status < 400 and response.status != 304
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+    def is_cached_response_valid(self, cachedresponse, response, request):
+        if response.status == 304 or (
+            response.status == cachedresponse.status and response.body == cachedresponse.body
+        ):
+            request.meta["page_unchanged"] = True
+            return True
+        # Base behaviour: fall back to the cached copy on a 5xx, but the
+        # page hasn't been confirmed unchanged, so the callback still runs
+        return super().is_cached_response_valid(cachedresponse, response, request)
+
+
+class SqliteCacheStorage:
+    def __init__(self, settings):
+        self.settings = settings
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.compression_level = settings.getint("HTTPCACHE_COMPRESSION_LEVEL", 6)
+        self.db = None
+
+    def open_spider(self, spider):
+        path = cache_db_path(self.settings, spider)
+        self.db = connect(path)
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        logger.debug(f"Using SQLite cache storage in {path}", extra={"spider": spider})
+
+    def close_spider(self, spider):
+        self.db.close()
+
+    def retrieve_response(self, spider, request):
+        row = self.db.execute(
+            "SELECT url, status, headers, body, stored_at FROM responses WHERE fingerprint = ?",
+            (self._fingerprinter.fingerprint(request).hex(),),
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, raw_headers, body, stored_at = row
+        if 0 < self.expiration_secs < time.time() - stored_at:
+            return None
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        body = zlib.decompress(body)
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self._fingerprinter.fingerprint(request).hex(),
+                response.url,
+                response.status,
+                headers_dict_to_raw(response.headers),
+                zlib.compress(response.body, self.compression_level),
+                time.time(),
+            ),
+        )
+
+
+class UnchangedPageMiddleware:
+    """
+    Record each fresh page's outputs; replay them for pages the cache
+    policy found unchanged instead of running the callback.
+
+    Relies on callbacks being generators: a callback's body doesn't run
+    until its output is iterated, and for unchanged pages it never is.
+    Pages with nothing recorded yet (or non-generator callbacks) are parsed
+    as usual.
+    """
+
+    def __init__(self, settings, stats):
+        self.settings = settings
+        self.stats = stats
+        self.db = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("HTTPCACHE_ENABLED") or not settings.getbool("HTTPCACHE_SKIP_UNCHANGED"):
+            raise NotConfigured
+        mw = cls(settings, crawler.stats)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_opened(self, spider):
+        self.db = connect(cache_db_path(self.settings, spider))
+        self._fingerprinter = spider.crawler.request_fingerprinter
+
+    def spider_closed(self, spider):
+        self.db.close()
+
+    def _recorded(self, response):
+        row = self.db.execute(
+            "SELECT data FROM page_outputs WHERE fingerprint = ?",
+            (self._fingerprinter.fingerprint(response.request).hex(),),
+        ).fetchone()
+        return pickle.loads(zlib.decompress(row[0])) if row else None
+
+    def _record(self, response, items, requests):
+        data = zlib.compress(pickle.dumps((items, requests), protocol=pickle.HIGHEST_PROTOCOL))
+        self.db.execute(
+            "INSERT OR REPLACE INTO page_outputs VALUES (?, ?, ?)",
+            (self._fingerprinter.fingerprint(response.request).hex(), data, time.time()),
+        )
+
+    def _replay(self, recorded, spider):
+        items, requests = recorded
+        self.stats.inc_value("httpcache/unchanged_pages", spider=spider)
+        self.stats.inc_value("httpcache/unchanged_items", len(items), spider=spider)
+        for fields in items:
+            yield UnchangedItem(**fields)
+        for data in requests:
+            yield request_from_dict(data, spider=spider)
+
+    def _observe(self, output, items, requests, spider):
+        if isinstance(output, Request):
+            requests.append(output.to_dict(spider=spider))
+        elif isinstance(output, ProductItem):
+            items.append({field: getattr(output, field) for field in UNCHANGED_FIELDS})
+
+    def _unchanged(self, response):
+        # A rendered page was never revalidated, whatever its meta says
+        return response.meta.get("page_unchanged") and not response.meta.get("playwright")
+
+    def _should_record(self, response):
+        return response.request is not None and "cached" not in response.flags
+
+    def process_spider_output(self, response, result, spider):
+        if self._unchanged(response):
+            recorded = self._recorded(response)
+            if recorded is not None:
+                yield from self._replay(recorded, spider)
+                return
+        if not self._should_record(response):
+            yield from result
+            return
+        items, requests = [], []
+        for output in result:
+            self._observe(output, items, requests, spider)
+            yield output
+        self._record(response, items, requests)
+
+    async def process_spider_output_async(self, response, result, spider):
+        if self._unchanged(response):
+            recorded = self._recorded(response)
+            if recorded is not None:
+                for output in self._replay(recorded, spider):
+                    yield output
+                return
+        if not self._should_record(response):
+            async for output in result:
+                yield output
+            return
+        items, requests = [], []
+        async for output in result:
+            self._observe(output, items, requests, spider)
+            yield output
+        self._record(response, items, requests)
@@ -1,50 +1,49 @@
 import re
-import scrapy
-from pydantic import BaseModel, HttpUrl, Field, field_validator
-from typing import Optional
+from dataclasses import dataclass
+from pydantic import AfterValidator, ConfigDict, Field, HttpUrl, TypeAdapter
+from typing import Annotated, Optional
 
 
-class ProductValidator(BaseModel):
-    name: str = Field(min_length=1)
-    url: HttpUrl
-    sku: str = Field(min_length=1)
-    price: Optional[float] = None
-    currency: str = "USD"
+@dataclass(slots=True)
+class ProductItem:
+    """
+    A scraped product, and its validation schema.
+
+    A slotted dataclass rather than a dict-backed scrapy.Item: no per-item
+    dict, attribute access instead of key lookups, and Scrapy's ItemAdapter
+    (feed exports etc.) supports it as is. The Annotated constraints are
+    read by `product_validator`; plain construction doesn't check them.
+    """
+    # Re-check instances on validation rather than trusting them as-is
+    __pydantic_config__ = ConfigDict(revalidate_instances="always")
+
+    name: Annotated[str, Field(min_length=1)]
+    url: Annotated[HttpUrl, AfterValidator(str)]   # normalised, kept as a string
+    sku: Annotated[str, Field(min_length=1)]
     in_stock: bool
+    retailer_name: str
+    retailer_domain: str
+    price: Optional[Annotated[float, Field(ge=0)]] = None
+    currency: str = "USD"
     category: Optional[str] = None
     description: Optional[str] = None
     image_url: Optional[str] = None
-    rating: Optional[float] = None
+    rating: Optional[Annotated[float, Field(ge=0, le=5)]] = None
     review_count: Optional[int] = None
+
+
+# Built once: the schema is compiled at import time, not per item. Validating
+# a ProductItem returns a new, normalised ProductItem (no intermediate dict).
+product_validator = TypeAdapter(ProductItem)
+
+
+@dataclass(slots=True)
+class UnchangedItem:
+    """
+    A product seen again on a page the HTTP cache found unchanged
+    (scraper/httpcache.py): only its identity, no re-parsed fields.
+    """
+    url: str
+    sku: str
     retailer_name: str
     retailer_domain: str
-
-    @field_validator("price")
-    @classmethod
-    def price_must_be_positive(cls, v):
-        if v is not None and v < 0:
-            raise ValueError("Price cannot be negative")
-        return v
-
-    @field_validator("rating")
-    @classmethod
-    def rating_range(cls, v):
-        if v is not None and not (0.0 <= v <= 5.0):
-            raise ValueError("Rating must be between 0 and 5")
-        return v
-
-
-class ProductItem(scrapy.Item):
-    name = scrapy.Field()
-    url = scrapy.Field()
-    sku = scrapy.Field()
-    price = scrapy.Field()
-    currency = scrapy.Field()
-    in_stock = scrapy.Field()
-    category = scrapy.Field()
-    description = scrapy.Field()
-    image_url = scrapy.Field()
-    rating = scrapy.Field()
-    review_count = scrapy.Field()
-    retailer_name = scrapy.Field()
-    retailer_domain = scrapy.Field()
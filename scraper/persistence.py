@@ -0,0 +1,473 @@
+import csv
+import io
+from datetime import datetime, timezone
+from collections import Counter, OrderedDict
+
+from sqlalchemy import Boolean, Float, Integer, String, case, cast, column, func, insert, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.models import Retailer, Product, PriceHistory
+
+
+# Product fields that keep their stored value when a re-scrape comes back empty
+COALESCED_FIELDS = ("category", "description", "image_url", "rating", "review_count")
+
+
+def product_values(item, retailer_id: int) -> dict:
+    """Map a scraped item onto a `products` row."""
+    return {
+        "retailer_id": retailer_id,
+        "name": item.name,
+        "url": item.url,
+        "sku": item.sku,
+        # Empty strings are treated like missing values, as in the row path
+        "category": item.category or None,
+        "description": item.description or None,
+        "image_url": item.image_url or None,
+        "rating": item.rating,
+        "review_count": item.review_count,
+    }
+
+
+def snapshot_values(item, product_id: int) -> dict:
+    """Map a scraped item onto a `price_history` row."""
+    return {
+        "product_id": product_id,
+        "price": item.price,
+        "currency": item.currency,
+        "in_stock": item.in_stock,
+    }
+
+
+def copy_rows(db, table: str, rows: list):
+    """
+    Stream rows into `table` with COPY ... FROM STDIN (CSV) on the session's
+    connection, so the copy joins the session's open transaction.
+    """
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # csv writes None as an unquoted empty field, which COPY reads as NULL
+        writer.writerow([
+            ("t" if value else "f") if isinstance(value, bool) else value
+            for value in (row[column] for column in columns)
+        ])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used key and counts hits/misses."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ProductWriter:
+    """
+    Writes scraped items into PostgreSQL through a caller-owned session.
+
+    Two write paths are available:
+      - write_item:  per-item upsert (SELECTs only on identity cache misses)
+      - write_batch: one INSERT ... ON CONFLICT for products and one
+                     multi-row INSERT for price_history per batch
+
+    Price snapshots go through `snapshot_backend`: "insert" (multi-row
+    INSERT) or "copy" (psycopg2 COPY from an in-memory CSV buffer).
+    With `snapshot_mode="delta"` a snapshot whose (price, currency,
+    in_stock) matches the product's last known state is not appended;
+    the latest row's observation_count/last_seen_at are bumped instead.
+    Last known states are cached in memory, so deciding costs no query.
+    Every appended snapshot also updates its product's latest_price /
+    latest_currency / latest_in_stock (and previous_price/last_changed_at
+    when the price moved) with one UPDATE per call, in the same transaction.
+
+    Retailer and product IDs are kept in LRU identity caches so recurring
+    crawls skip the lookup queries. IDs created inside a transaction are
+    only promoted into the caches by commit(), never after a rollback().
+    """
+
+    SNAPSHOT_BACKENDS = ("insert", "copy")
+    SNAPSHOT_MODES = ("append", "delta")
+
+    def __init__(self, db, cache_size: int = 100_000, snapshot_backend: str = "insert",
+                 snapshot_mode: str = "append"):
+        if snapshot_backend not in self.SNAPSHOT_BACKENDS:
+            raise ValueError(
+                f"Unknown price history backend {snapshot_backend!r}, "
+                f"expected one of {self.SNAPSHOT_BACKENDS}"
+            )
+        if snapshot_mode not in self.SNAPSHOT_MODES:
+            raise ValueError(
+                f"Unknown price history mode {snapshot_mode!r}, "
+                f"expected one of {self.SNAPSHOT_MODES}"
+            )
+        self.db = db
+        self.snapshot_backend = snapshot_backend
+        self.snapshot_mode = snapshot_mode
+        self.retailer_ids = LRUCache(cache_size)   # domain -> retailer_id
+        self.product_ids = LRUCache(cache_size)    # (retailer_id, sku) -> product_id
+        self.last_states = LRUCache(cache_size)    # product_id -> (price, currency, in_stock)
+        self.snapshot_counts = Counter()           # "appended" / "unchanged"
+        self._pending_retailers = {}
+        self._pending_products = {}
+        self._pending_states = {}
+        self._pending_counts = Counter()
+
+    def warm(self, domain: str) -> int:
+        """Preload one retailer's ID and all of its product IDs in a single query."""
+        rows = self.db.execute(
+            select(Retailer.id, Product.id, Product.sku)
+            .outerjoin(Product, Product.retailer_id == Retailer.id)
+            .where(Retailer.domain == domain)
+        ).all()
+        for retailer_id, product_id, sku in rows:
+            self.retailer_ids[domain] = retailer_id
+            if product_id is not None:
+                self.product_ids[(retailer_id, sku)] = product_id
+
+        if self.snapshot_mode == "delta":
+            latest = self.db.execute(
+                select(PriceHistory.product_id, PriceHistory.price,
+                       PriceHistory.currency, PriceHistory.in_stock)
+                .join(Product, Product.id == PriceHistory.product_id)
+                .join(Retailer, Retailer.id == Product.retailer_id)
+                .where(Retailer.domain == domain)
+                .order_by(PriceHistory.product_id, PriceHistory.id.desc())
+                .distinct(PriceHistory.product_id)
+            )
+            for product_id, price, currency, in_stock in latest:
+                self.last_states[product_id] = (price, currency, in_stock)
+        return len(rows)
+
+    def commit(self):
+        self.db.commit()
+        for domain, retailer_id in self._pending_retailers.items():
+            self.retailer_ids[domain] = retailer_id
+        for key, product_id in self._pending_products.items():
+            self.product_ids[key] = product_id
+        for product_id, state in self._pending_states.items():
+            self.last_states[product_id] = state
+        self.snapshot_counts.update(self._pending_counts)
+        self._clear_pending()
+
+    def rollback(self):
+        self.db.rollback()
+        self._clear_pending()
+
+    def _clear_pending(self):
+        self._pending_retailers.clear()
+        self._pending_products.clear()
+        self._pending_states.clear()
+        self._pending_counts.clear()
+
+    def get_retailer_id(self, item) -> int:
+        """Get or create the Retailer row for an item's domain."""
+        domain = item.retailer_domain
+        retailer_id = self._pending_retailers.get(domain) or self.retailer_ids.get(domain)
+        if retailer_id is not None:
+            return retailer_id
+
+        retailer = (
+            self.db.query(Retailer)
+            .filter_by(domain=item.retailer_domain)
+            .first()
+        )
+        if not retailer:
+            retailer = Retailer(
+                name=item.retailer_name,
+                domain=item.retailer_domain
+            )
+            self.db.add(retailer)
+            self.db.flush()  # Get the ID without full commit
+        self._pending_retailers[domain] = retailer.id
+        return retailer.id
+
+    def write_item(self, item):
+        """Upsert a single product and append its price snapshot."""
+        retailer_id = self.get_retailer_id(item)
+        key = (retailer_id, item.sku)
+
+        product_id = self._pending_products.get(key) or self.product_ids.get(key)
+        if product_id is not None:
+            # Known product: update in place without loading the row first
+            values = product_values(item, retailer_id)
+            self.db.execute(
+                update(Product)
+                .where(Product.id == product_id)
+                .values(
+                    name=values["name"],
+                    url=values["url"],
+                    **{
+                        field: func.coalesce(values[field], getattr(Product, field))
+                        for field in COALESCED_FIELDS
+                    },
+                    updated_at=func.now(),
+                )
+            )
+            self.write_snapshots([snapshot_values(item, product_id)])
+            return
+
+        product = (
+            self.db.query(Product)
+            .filter_by(retailer_id=retailer_id, sku=item.sku)
+            .first()
+        )
+
+        if not product:
+            product = Product(
+                retailer_id=retailer_id,
+                name=item.name,
+                url=item.url,
+                sku=item.sku,
+                category=item.category,
+                description=item.description,
+                image_url=item.image_url,
+                rating=item.rating,
+                review_count=item.review_count,
+            )
+            self.db.add(product)
+            self.db.flush()
+        else:
+            # Update mutable enriched fields on re-scrape
+            product.name = item.name
+            product.url = item.url
+            product.category = item.category or product.category
+            product.description = item.description or product.description
+            product.image_url = item.image_url or product.image_url
+            product.rating = item.rating if item.rating is not None else product.rating
+            product.review_count = item.review_count if item.review_count is not None else product.review_count
+
+        self._pending_products[key] = product.id
+        self.write_snapshots([snapshot_values(item, product.id)])
+
+    def write_batch(self, items):
+        """
+        Bulk-upsert products and bulk-insert their price snapshots.
+
+        Items sharing a (retailer_id, sku) key are merged before the upsert,
+        because Postgres refuses to update the same row twice in one
+        ON CONFLICT statement. Every item still gets its own snapshot.
+        """
+        retailer_ids = {}
+        rows = {}
+        keys = []
+        for item in items:
+            domain = item.retailer_domain
+            if domain not in retailer_ids:
+                retailer_ids[domain] = self.get_retailer_id(item)
+
+            values = product_values(item, retailer_ids[domain])
+            key = (values["retailer_id"], values["sku"])
+            previous = rows.get(key)
+            if previous:
+                for field in COALESCED_FIELDS:
+                    if values[field] is None:
+                        values[field] = previous[field]
+            rows[key] = values
+            keys.append(key)
+
+        stmt = pg_insert(Product).values(list(rows.values()))
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["retailer_id", "sku"],
+            set_={
+                "name": excluded.name,
+                "url": excluded.url,
+                **{
+                    field: func.coalesce(getattr(excluded, field), getattr(Product, field))
+                    for field in COALESCED_FIELDS
+                },
+                "updated_at": func.now(),
+            },
+        ).returning(Product.id, Product.retailer_id, Product.sku)
+
+        product_ids = {
+            (row.retailer_id, row.sku): row.id for row in self.db.execute(stmt)
+        }
+        self._pending_products.update(product_ids)
+
+        snapshots = [
+            snapshot_values(item, product_ids[key]) for item, key in zip(items, keys)
+        ]
+        self.write_snapshots(snapshots)
+
+    def touch_items(self, items):
+        """
+        Record items seen unchanged (UnchangedItem) on their products' latest
+        price_history rows, without touching the products themselves.
+        Products that were never stored are skipped.
+        """
+        counts = Counter()
+        missing = {}
+        for item in items:
+            retailer_id = self.get_retailer_id(item)
+            key = (retailer_id, item.sku)
+            product_id = self._pending_products.get(key) or self.product_ids.get(key)
+            if product_id is None:
+                missing.setdefault(key, 0)
+                missing[key] += 1
+            else:
+                counts[product_id] += 1
+
+        if missing:
+            rows = self.db.execute(
+                select(Product.id, Product.retailer_id, Product.sku)
+                .where(Product.retailer_id.in_({retailer_id for retailer_id, _ in missing}))
+                .where(Product.sku.in_({sku for _, sku in missing}))
+            )
+            for product_id, retailer_id, sku in rows:
+                key = (retailer_id, sku)
+                if key in missing:
+                    self._pending_products[key] = product_id
+                    counts[product_id] += missing[key]
+
+        if counts:
+            self._touch_latest(counts)
+            self._pending_counts["seen_unchanged"] += sum(counts.values())
+
+    def write_snapshots(self, rows: list):
+        """Append price_history rows using the configured backend and mode."""
+        if self.snapshot_mode == "delta":
+            rows, unchanged = self._split_unchanged(rows)
+            # Bump rows already in the table before inserting new ones, so
+            # "latest row" still means the state that was observed again
+            if unchanged:
+                self._touch_latest(unchanged)
+                self._pending_counts["unchanged"] += sum(unchanged.values())
+
+        if not rows:
+            return
+        if self.snapshot_backend == "copy":
+            copy_rows(self.db, PriceHistory.__tablename__, rows)
+        else:
+            # executemany: SQLAlchemy batches this into multi-row VALUES
+            # statements ("insertmanyvalues") with a cached compiled form
+            self.db.execute(insert(PriceHistory), rows)
+        self._update_latest(rows)
+        self._pending_counts["appended"] += len(rows)
+
+    def _update_latest(self, rows: list):
+        """Carry each product's newest appended snapshot onto its products row."""
+        newest = {}   # product_id -> [row, price before a change within rows, changed within rows]
+        for row in rows:
+            entry = newest.get(row["product_id"])
+            if entry is None:
+                newest[row["product_id"]] = [row, None, False]
+                continue
+            if row["price"] != entry[0]["price"]:
+                entry[1:] = [entry[0]["price"], True]
+            entry[0] = row
+
+        snapshot = values(
+            column("product_id", Integer), column("price", Float),
+            column("currency", String), column("in_stock", Boolean),
+            column("prior_price", Float), column("moved", Boolean), name="snapshot",
+        ).data([
+            (product_id, row["price"], row["currency"], row["in_stock"], prior_price, moved)
+            for product_id, (row, prior_price, moved) in newest.items()
+        ])
+        # An all-NULL VALUES column would otherwise be typed as text
+        price = cast(snapshot.c.price, Float)
+        moved = cast(snapshot.c.moved, Boolean)
+        changed = Product.latest_price.is_distinct_from(price)
+        self.db.execute(
+            update(Product)
+            .where(Product.id == snapshot.c.product_id)
+            .values(
+                latest_price=price,
+                latest_currency=snapshot.c.currency,
+                latest_in_stock=cast(snapshot.c.in_stock, Boolean),
+                # SET expressions see the row as it was before this UPDATE
+                previous_price=case(
+                    (moved, cast(snapshot.c.prior_price, Float)),
+                    (changed, Product.latest_price),
+                    else_=Product.previous_price,
+                ),
+                last_changed_at=case(
+                    (moved | changed, func.now()), else_=Product.last_changed_at
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def _split_unchanged(self, rows: list):
+        """
+        Drop rows that repeat the product's last known state.
+
+        Repeats of a state appended earlier in the same call are folded into
+        that row's observation_count; repeats of a state already in the table
+        are returned as per-product counts for _touch_latest().
+        """
+        changed = []
+        appended = {}   # product_id -> row appended by this call
+        unchanged = Counter()
+        for row in rows:
+            product_id = row["product_id"]
+            state = (row["price"], row["currency"], row["in_stock"])
+            previous = self._pending_states.get(product_id) or self.last_states.get(product_id)
+            if previous != state:
+                row = {**row, "observation_count": 1, "last_seen_at": None}
+                changed.append(row)
+                appended[product_id] = row
+                self._pending_states[product_id] = state
+            elif product_id in appended:
+                appended[product_id]["observation_count"] += 1
+                appended[product_id]["last_seen_at"] = datetime.now(timezone.utc)
+                self._pending_counts["unchanged"] += 1
+            else:
+                unchanged[product_id] += 1
+        return changed, unchanged
+
+    def _touch_latest(self, counts: Counter):
+        """Record repeat observations on each product's latest price_history row."""
+        seen = values(
+            column("product_id", Integer), column("observations", Integer), name="seen"
+        ).data(list(counts.items()))
+        latest = PriceHistory.__table__.alias("latest")
+        latest_id = (
+            select(func.max(latest.c.id))
+            .where(latest.c.product_id == seen.c.product_id)
+            .scalar_subquery()
+        )
+        self.db.execute(
+            update(PriceHistory)
+            .where(PriceHistory.product_id == seen.c.product_id)
+            .where(PriceHistory.id == latest_id)
+            .values(
+                observation_count=PriceHistory.observation_count + seen.c.observations,
+                last_seen_at=func.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
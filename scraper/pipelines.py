@@ -1,13 +1,22 @@
 import logging
+import queue
 import sys
 import os
-from scrapy.exceptions import DropItem
+import threading
+import time
+from collections import deque
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.utils.log import failure_to_exc_info
+from twisted.internet import defer, reactor, task
+from twisted.python.failure import Failure
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+from core.cache import bump_generation
 from core.database import SessionLocal
-from core.models import Retailer, Product, PriceHistory
-from scraper.items import ProductValidator
+from scraper.items import UnchangedItem, product_validator
+from scraper.persistence import ProductWriter
+from scraper.spool import SpoolWriter
 from pydantic import ValidationError
 
 logger = logging.getLogger(__name__)
@@ -15,23 +24,147 @@ logger = logging.getLogger(__name__)
 
 class ValidationPipeline:
     """
-    Stage 1: Validate incoming items against the Pydantic schema.
-    Drops malformed items with full error logging for observability.
+    Stage 1: Validate incoming items against the ProductItem schema.
+    Passes a validated, normalised copy of the item on and drops
+    malformed items with full error logging for observability.
     """
 
     def process_item(self, item, spider):
+        if isinstance(item, UnchangedItem):
+            return item  # Identity only; validated when it was first parsed
         try:
-            ProductValidator(**dict(item))
-            return item
+            return product_validator.validate_python(item)
         except ValidationError as e:
             errors = e.errors()
             spider.logger.warning(
-                f"[VALIDATION FAIL] SKU={item.get('sku')} URL={item.get('url')} "
+                f"[VALIDATION FAIL] SKU={item.sku} URL={item.url} "
                 f"Errors={errors}"
             )
             raise DropItem(f"Validation failed: {errors}")
 
 
+class DBWriterThread:
+    """
+    One thread doing all of a pipeline's database work, fed by a bounded
+    queue, so blocking psycopg2 calls never run on the reactor thread.
+
+    Jobs run in submission order. Each submit() returns a Deferred fired on
+    the reactor thread with the job's result (or failure). Jobs submitted
+    while the queue is full wait in an overflow list until the thread frees
+    a slot; `saturated` tells the pipeline to hold items back meanwhile.
+    """
+
+    _STOP = object()
+
+    def __init__(self, maxsize: int):
+        self.jobs = queue.Queue(max(1, maxsize))
+        self.overflow = deque()   # (fn, args, deferred) waiting for a queue slot
+        self.ready_waiters = []   # Deferreds fired once the thread catches up
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    @property
+    def saturated(self) -> bool:
+        return bool(self.overflow) or self.jobs.full()
+
+    def submit(self, fn, *args) -> defer.Deferred:
+        d = defer.Deferred()
+        if self.overflow or self.jobs.full():
+            self.overflow.append((fn, args, d))
+        else:
+            self.jobs.put_nowait((fn, args, d))
+        return d
+
+    def when_ready(self) -> defer.Deferred:
+        """Deferred fired once the queue has room and nothing is waiting for it."""
+        d = defer.Deferred()
+        self.ready_waiters.append(d)
+        return d
+
+    def stop(self) -> defer.Deferred:
+        """Run everything submitted so far, then end the thread."""
+        return self.submit(self._STOP)
+
+    def _run(self):
+        while True:
+            fn, args, d = self.jobs.get()
+            if fn is self._STOP:
+                reactor.callFromThread(d.callback, None)
+                return
+            try:
+                result = fn(*args)
+            except Exception:
+                reactor.callFromThread(self._done, d, Failure())
+            else:
+                reactor.callFromThread(self._done, d, result)
+
+    def _done(self, d, result):
+        # Reactor thread: move overflow into the freed slot, wake held items
+        while self.overflow and not self.jobs.full():
+            self.jobs.put_nowait(self.overflow.popleft())
+        if not self.saturated:
+            waiters, self.ready_waiters = self.ready_waiters, []
+            for waiter in waiters:
+                waiter.callback(None)
+        if isinstance(result, Failure):
+            d.errback(result)
+        else:
+            d.callback(result)
+
+
+class SpoolPipeline:
+    """
+    Stage 2, when ITEM_SPOOL_DIR is set: append items to the local item
+    spool (scraper/spool.py) instead of writing them to PostgreSQL.
+
+    The crawl then never waits on (or loses items to) the database; the
+    `load_item_spool` task loads sealed segments at its own pace. Segments
+    rotate at ITEM_SPOOL_SEGMENT_BYTES or every ITEM_SPOOL_SEGMENT_SECONDS,
+    so loading can start while the crawl is still running.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, segment_seconds=60.0, stats=None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.stats = stats
+        self._rotate_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get("ITEM_SPOOL_DIR")
+        if not directory:
+            raise NotConfigured
+        return cls(
+            directory,
+            segment_bytes=crawler.settings.getint("ITEM_SPOOL_SEGMENT_BYTES", 64 * 1024 * 1024),
+            segment_seconds=crawler.settings.getfloat("ITEM_SPOOL_SEGMENT_SECONDS", 60.0),
+            stats=crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        self.spool = SpoolWriter(self.directory, spider.name, self.segment_bytes, self.segment_seconds)
+        self._rotate_loop = task.LoopingCall(self.spool.rotate_if_due)
+        self._rotate_loop.start(min(1.0, self.segment_seconds), now=False)
+        spider.logger.info(f"[SpoolPipeline] Spooling items to {self.spool.directory}.")
+
+    def close_spider(self, spider):
+        if self._rotate_loop and self._rotate_loop.running:
+            self._rotate_loop.stop()
+        self.spool.close()
+        if self.stats is not None:
+            self.stats.set_value("spool/segments", self.spool.sealed)
+
+    def process_item(self, item, spider):
+        size = self.spool.write(item)
+        if self.stats is not None:
+            self.stats.inc_value("spool/items")
+            self.stats.inc_value("spool/bytes", size)
+        return item
+
+
 class PostgresPipeline:
     """
     Stage 2: Upsert enriched product data and append time-series price history
@@ -40,79 +173,243 @@ class PostgresPipeline:
     Strategy:
       - Retailer: get or create
       - Product: get or create by (retailer_id, sku); update mutable fields
-      - PriceHistory: always insert a new snapshot (idempotent append)
+        and the denormalised latest_* columns
+      - PriceHistory: insert a snapshot, or in "delta" mode only when the
+        price/currency/stock state changed (else bump the latest row)
+
+    With POSTGRES_BATCH_SIZE > 1 items are buffered and written in bulk
+    (see ProductWriter.write_batch) whenever the buffer is full, the oldest
+    buffered item is POSTGRES_BATCH_INTERVAL seconds old, or the spider
+    closes. A batch that fails is retried row by row so one bad item
+    doesn't take the rest of the batch down with it.
+
+    Retailer/product IDs are cached in-process (IDENTITY_CACHE_SIZE entries)
+    and warm-loaded at open_spider for the spider's `retailer_domain`.
+    PRICE_HISTORY_BACKEND selects how snapshots are written ("insert"/"copy")
+    and PRICE_HISTORY_MODE whether every snapshot is kept ("append") or only
+    changes of price/currency/stock ("delta").
+
+    UnchangedItems (products on pages the HTTP cache found unchanged) skip
+    the product upsert; they only bump observation_count/last_seen_at on
+    the product's latest price_history row, whatever the mode.
+
+    With POSTGRES_WRITER_THREAD on, buffering stays on the reactor thread
+    but every database call (and the API cache bump at close) runs on a
+    DBWriterThread. Once POSTGRES_WRITER_QUEUE_SIZE writes are queued,
+    process_item returns a Deferred that waits for the writer to catch up:
+    the held items keep their responses in the scraper slot, so the engine
+    stops scheduling downloads until the database keeps pace (backpressure).
     """
 
+    def __init__(self, batch_size=1, batch_interval=5.0, cache_size=100_000,
+                 snapshot_backend="insert", snapshot_mode="append", stats=None,
+                 writer_thread=False, writer_queue_size=4):
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.cache_size = cache_size
+        self.snapshot_backend = snapshot_backend
+        self.snapshot_mode = snapshot_mode
+        self.stats = stats
+        self.writer_thread = writer_thread
+        self.writer_queue_size = writer_queue_size
+        self.db_writer = None
+        self.buffer = []
+        self.unchanged = []
+        self._flush_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if crawler.settings.get("ITEM_SPOOL_DIR"):
+            raise NotConfigured("items go to the spool (SpoolPipeline) instead")
+        return cls(
+            batch_size=crawler.settings.getint("POSTGRES_BATCH_SIZE", 1),
+            batch_interval=crawler.settings.getfloat("POSTGRES_BATCH_INTERVAL", 5.0),
+            cache_size=crawler.settings.getint("IDENTITY_CACHE_SIZE", 100_000),
+            snapshot_backend=crawler.settings.get("PRICE_HISTORY_BACKEND", "insert"),
+            snapshot_mode=crawler.settings.get("PRICE_HISTORY_MODE", "append"),
+            stats=crawler.stats,
+            writer_thread=crawler.settings.getbool("POSTGRES_WRITER_THREAD"),
+            writer_queue_size=crawler.settings.getint("POSTGRES_WRITER_QUEUE_SIZE", 4),
+        )
+
     def open_spider(self, spider):
         self.db = SessionLocal()
-        spider.logger.info("[PostgresPipeline] Database session opened.")
+        self.writer = ProductWriter(
+            self.db,
+            cache_size=self.cache_size,
+            snapshot_backend=self.snapshot_backend,
+            snapshot_mode=self.snapshot_mode,
+        )
+        if self.writer_thread:
+            self.db_writer = DBWriterThread(self.writer_queue_size)
+            self.db_writer.start()
+        self._submit(spider, self._warm, spider)
+        self._buffer_started = None
+        if self.batch_size > 1 and self.batch_interval > 0:
+            self._flush_loop = task.LoopingCall(self._flush_if_stale, spider)
+            self._flush_loop.start(min(1.0, self.batch_interval), now=False)
+        spider.logger.info(
+            f"[PostgresPipeline] Database session opened (batch size {self.batch_size}"
+            f"{', writer thread' if self.db_writer else ''})."
+        )
+
+    def _warm(self, spider):
+        # Runs on the writer thread too, where nothing waits on the Deferred:
+        # a failure is logged here and the cache fills on demand instead
+        domain = getattr(spider, "retailer_domain", None)
+        if not domain:
+            return
+        try:
+            loaded = self.writer.warm(domain)
+            self.db.rollback()  # End the read-only warm-up transaction
+        except Exception as e:
+            self.writer.rollback()
+            spider.logger.error(f"[DB ERROR] Failed to warm the identity cache for {domain}: {e}")
+            return
+        self._set_stat("identity_cache/warm_loaded", loaded)
 
     def close_spider(self, spider):
+        if self._flush_loop and self._flush_loop.running:
+            self._flush_loop.stop()
+        self._flush(spider)
+        if self.db_writer:
+            # Closing the session and bumping the cache generation block too,
+            # so they run as the writer's last job
+            closed = self._run(self._close, spider)
+            return self.db_writer.stop().addCallback(lambda _: closed)
+        self._close(spider)
+
+    def _close(self, spider):
+        self._set_stat("identity_cache/hits", self.writer.product_ids.hits + self.writer.retailer_ids.hits)
+        self._set_stat("identity_cache/misses", self.writer.product_ids.misses + self.writer.retailer_ids.misses)
+        for outcome, count in self.writer.snapshot_counts.items():
+            self._set_stat(f"price_history/{outcome}", count)
         self.db.close()
         spider.logger.info("[PostgresPipeline] Database session closed.")
+        # The crawl's writes are committed: drop cached API responses
+        bump_generation()
+
+    def _run(self, fn, *args):
+        """Call fn now, or queue it on the writer thread (returning its Deferred)."""
+        if self.db_writer is None:
+            return fn(*args)
+        return self.db_writer.submit(fn, *args)
+
+    def _submit(self, spider, fn, *args):
+        """_run for writes nothing waits on: a failure is logged and counted, never left unhandled."""
+        result = self._run(fn, *args)
+        if isinstance(result, defer.Deferred):
+            result.addErrback(self._log_write_failure, fn.__name__, spider)
+
+    def _log_write_failure(self, failure, job, spider):
+        self._inc_stat("postgres/writer/errors")
+        spider.logger.error(
+            f"[DB ERROR] Writer job {job} failed: {failure.getErrorMessage()}",
+            exc_info=failure_to_exc_info(failure),
+        )
+
+    def _backpressure(self, item):
+        """The item, or a Deferred of it that waits while the writer is saturated."""
+        if self.db_writer is None or not self.db_writer.saturated:
+            return item
+        self._inc_stat("postgres/writer/backpressure")
+        return self.db_writer.when_ready().addCallback(lambda _: item)
 
     def process_item(self, item, spider):
-        try:
-            # --- 1. Get or create Retailer ---
-            retailer = (
-                self.db.query(Retailer)
-                .filter_by(domain=item["retailer_domain"])
-                .first()
-            )
-            if not retailer:
-                retailer = Retailer(
-                    name=item["retailer_name"],
-                    domain=item["retailer_domain"]
-                )
-                self.db.add(retailer)
-                self.db.flush()  # Get the ID without full commit
-
-            # --- 2. Upsert Product ---
-            product = (
-                self.db.query(Product)
-                .filter_by(retailer_id=retailer.id, sku=item["sku"])
-                .first()
-            )
+        if isinstance(item, UnchangedItem):
+            self._process_unchanged(item, spider)
+            return self._backpressure(item)
 
-            if not product:
-                product = Product(
-                    retailer_id=retailer.id,
-                    name=item["name"],
-                    url=str(item["url"]),
-                    sku=item["sku"],
-                    category=item.get("category"),
-                    description=item.get("description"),
-                    image_url=item.get("image_url"),
-                    rating=item.get("rating"),
-                    review_count=item.get("review_count"),
-                )
-                self.db.add(product)
-                self.db.flush()
-            else:
-                # Update mutable enriched fields on re-scrape
-                product.name = item["name"]
-                product.url = str(item["url"])
-                product.category = item.get("category") or product.category
-                product.description = item.get("description") or product.description
-                product.image_url = item.get("image_url") or product.image_url
-                product.rating = item.get("rating") if item.get("rating") is not None else product.rating
-                product.review_count = item.get("review_count") if item.get("review_count") is not None else product.review_count
-
-            # --- 3. Append PriceHistory snapshot ---
-            history = PriceHistory(
-                product_id=product.id,
-                price=item.get("price"),
-                currency=item.get("currency", "USD"),
-                in_stock=item.get("in_stock", True),
-            )
-            self.db.add(history)
-            self.db.commit()
+        if self.batch_size == 1:
+            # The item waits for its own write, so a failure can still drop it
+            return self._run(self._save_item, item, spider)
 
+        if not self.buffer:
+            self._buffer_started = time.monotonic()
+        self.buffer.append(item)
+        if len(self.buffer) >= self.batch_size:
+            self._flush(spider)
+        return self._backpressure(item)
+
+    def _save_item(self, item, spider):
+        try:
+            self.writer.write_item(item)
+            self.writer.commit()
         except Exception as e:
-            self.db.rollback()
+            self.writer.rollback()
             spider.logger.error(
-                f"[DB ERROR] Failed to save SKU={item.get('sku')}: {e}"
+                f"[DB ERROR] Failed to save SKU={item.sku}: {e}"
             )
             raise DropItem(f"Database error: {e}")
-
+        self._inc_stat("postgres/items_saved")
         return item
+
+    def _process_unchanged(self, item, spider):
+        if not self.buffer and not self.unchanged:
+            self._buffer_started = time.monotonic()
+        self.unchanged.append(item)
+        if self.batch_size == 1 or len(self.unchanged) >= self.batch_size:
+            self._flush_unchanged(spider)
+
+    def _flush_unchanged(self, spider):
+        batch, self.unchanged = self.unchanged, []
+        if batch:
+            self._submit(spider, self._write_unchanged, batch, spider)
+
+    def _write_unchanged(self, batch, spider):
+        try:
+            self.writer.touch_items(batch)
+            self.writer.commit()
+            self._inc_stat("postgres/items_seen_unchanged", len(batch))
+        except Exception as e:
+            self.writer.rollback()
+            self._inc_stat("postgres/items_failed", len(batch))
+            spider.logger.error(f"[DB ERROR] Failed to record {len(batch)} unchanged items: {e}")
+
+    def _flush_if_stale(self, spider):
+        if (self.buffer or self.unchanged) and time.monotonic() - self._buffer_started >= self.batch_interval:
+            self._flush(spider)
+
+    def _flush(self, spider):
+        """Hand the buffered items to the writer (see _write_batch)."""
+        self._flush_unchanged(spider)
+        batch, self.buffer = self.buffer, []
+        if batch:
+            self._submit(spider, self._write_batch, batch, spider)
+
+    def _write_batch(self, batch, spider):
+        """Write the items in one transaction, falling back to per-row."""
+        try:
+            self.writer.write_batch(batch)
+            self.writer.commit()
+            self._inc_stat("postgres/batches")
+            self._inc_stat("postgres/items_saved", len(batch))
+            return
+        except Exception as e:
+            self.writer.rollback()
+            self._inc_stat("postgres/batch_fallbacks")
+            spider.logger.warning(
+                f"[DB BATCH] Bulk write of {len(batch)} items failed, retrying row by row: {e}"
+            )
+
+        for item in batch:
+            try:
+                self.writer.write_item(item)
+                self.writer.commit()
+                self._inc_stat("postgres/items_saved")
+            except Exception as e:
+                self.writer.rollback()
+                self._inc_stat("postgres/items_failed")
+                spider.logger.error(
+                    f"[DB ERROR] Failed to save SKU={item.sku}: {e}"
+                )
+
+    # Called from the writer thread too; the keys each thread touches don't
+    # overlap, and single dict updates are atomic under the GIL
+    def _inc_stat(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
+
+    def _set_stat(self, key, value):
+        if self.stats is not None:
+            self.stats.set_value(key, value)
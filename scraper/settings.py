@@ -1,3 +1,5 @@
+import os
+
 BOT_NAME = 'enterprise_scraper'
 
 SPIDER_MODULES = ['scraper.spiders']
@@ -15,15 +17,30 @@ DOWNLOAD_DELAY = 1
 # Disable cookies (enabled by default)
 COOKIES_ENABLED = False
 
-# Enable and configure HTTP caching (disabled by default)
+# HTTP cache (scraper/httpcache.py): every cached page is revalidated with
+# If-None-Match / If-Modified-Since. Pages that come back 304 or byte-identical
+# are not re-parsed; their products are recorded as "seen unchanged"
+# (HTTPCACHE_SKIP_UNCHANGED). Bodies are stored zlib-compressed in one SQLite
+# file per spider.
 HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 0
 HTTPCACHE_DIR = "httpcache"
+HTTPCACHE_POLICY = "scraper.httpcache.RevalidatingPolicy"
+HTTPCACHE_STORAGE = "scraper.httpcache.SqliteCacheStorage"
+HTTPCACHE_COMPRESSION_LEVEL = 6
+HTTPCACHE_SKIP_UNCHANGED = True
+
+SPIDER_MIDDLEWARES = {
+    # Close to the spider, so it sees callback output before anything filters it
+    'scraper.httpcache.UnchangedPageMiddleware': 950,
+}
 
 # Playwright Integration
+# scrapy-playwright's handler plus page pooling, resource blocking and render
+# stats (scraper/browser.py)
 DOWNLOAD_HANDLERS = {
-    "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
-    "https": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
+    "http": "scraper.browser.PooledPlaywrightDownloadHandler",
+    "https": "scraper.browser.PooledPlaywrightDownloadHandler",
 }
 
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
@@ -31,20 +48,128 @@ TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 # Enable Middlewares
 DOWNLOADER_MIDDLEWARES = {
     'scraper.middlewares.RandomUserAgentMiddleware': 400,
+    'scraper.middlewares.StaticFirstMiddleware': 450,
+    'scraper.middlewares.AdaptiveThrottleMiddleware': 600,
     # 'scraper.middlewares.ProxyRotatorMiddleware': 410,
 }
 
+# StaticFirstMiddleware: Playwright requests are first tried as plain HTTP and
+# only rendered when the spider's has_content() check fails. After
+# STATIC_FIRST_LEARN_AFTER such failures in a row, a URL pattern is rendered
+# straight away. The learned patterns persist in STATIC_FIRST_STATE_FILE, if set.
+STATIC_FIRST_ENABLED = True
+STATIC_FIRST_LEARN_AFTER = 2
+STATIC_FIRST_STATE_FILE = None
+
+# AdaptiveThrottleMiddleware: per-domain concurrency and delay tuned from
+# latency, 429/503s, errors and Retry-After (AIMD), within these bounds.
+# DOWNLOAD_DELAY is only the starting delay. Decisions are logged to the
+# adaptive_throttle/* crawl stats.
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_START_CONCURRENCY = 2
+ADAPTIVE_THROTTLE_MIN_CONCURRENCY = 1
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 16
+ADAPTIVE_THROTTLE_MIN_DELAY = 0.0
+ADAPTIVE_THROTTLE_MAX_DELAY = 60.0
+ADAPTIVE_THROTTLE_BACKOFF_DELAY = 1.0        # seconds; minimum delay after a backoff
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 2.0       # seconds; slower responses count as congestion
+ADAPTIVE_THROTTLE_BACKOFF_STATUSES = [429, 503]
+ADAPTIVE_THROTTLE_HISTORY = 500              # decisions kept in the stats time series
+
 # Enable Pipelines
 ITEM_PIPELINES = {
     'scraper.pipelines.ValidationPipeline': 300,
-    'scraper.pipelines.PostgresPipeline': 800,
+    'scraper.pipelines.SpoolPipeline': 790,      # only with ITEM_SPOOL_DIR set
+    'scraper.pipelines.PostgresPipeline': 800,   # only without it
 }
 
+# Item spool (scraper/spool.py): with a directory set, validated items are
+# appended to local segment files instead of written to Postgres, and the
+# `load_item_spool` task bulk-loads sealed segments, checkpointing as it goes.
+ITEM_SPOOL_DIR = os.getenv("ITEM_SPOOL_DIR") or None
+ITEM_SPOOL_SEGMENT_BYTES = 64 * 1024 * 1024
+ITEM_SPOOL_SEGMENT_SECONDS = 60
+ITEM_SPOOL_KEEP_LOADED = False       # move loaded segments to loaded/ instead of deleting them
+ITEM_SPOOL_ORPHAN_SECONDS = 600      # age at which a crashed crawl's open segment is recovered
+ITEM_SPOOL_BATCH_SIZE = 500          # items per load transaction/checkpoint
+
+# Extensions (StatsFileExtension only activates when STATS_FILE is set,
+# which the worker's subprocess execution mode does per crawl)
+EXTENSIONS = {
+    'scraper.extensions.StatsFileExtension': 500,
+    'scraper.extensions.ReactorStallMonitor': 510,
+}
+
+# ReactorStallMonitor: reactor/stall_* stats for timers firing more than
+# REACTOR_STALL_THRESHOLD seconds late (i.e. the reactor thread was blocked)
+REACTOR_STALL_MONITOR_ENABLED = True
+REACTOR_STALL_INTERVAL = 0.1
+REACTOR_STALL_THRESHOLD = 0.05
+
+# PostgresPipeline batching: buffer items and bulk-upsert them once the batch
+# is full or the oldest buffered item is older than the interval (seconds).
+# The default of 1 commits every item individually; deployments opt in to
+# batching by setting $POSTGRES_BATCH_SIZE (e.g. 500).
+POSTGRES_BATCH_SIZE = int(os.getenv("POSTGRES_BATCH_SIZE", "1"))
+POSTGRES_BATCH_INTERVAL = 5.0
+
+# Run the pipeline's database calls on a dedicated writer thread instead of
+# the reactor thread. Once POSTGRES_WRITER_QUEUE_SIZE writes (batches, or
+# items with a batch size of 1) are queued, items wait for the writer and
+# the engine stops scheduling downloads until it catches up.
+POSTGRES_WRITER_THREAD = True
+POSTGRES_WRITER_QUEUE_SIZE = 4
+
+# Max retailer/product IDs kept in the pipeline's in-process LRU identity cache
+IDENTITY_CACHE_SIZE = 100_000
+
+# How price_history snapshots are written: "insert" (multi-row INSERT) or
+# "copy" (psycopg2 COPY FROM STDIN, fastest for large batches).
+# Compare with: python -m benchmarks.bench_price_history_ingest
+PRICE_HISTORY_BACKEND = "insert"
+
+# "append" writes a price_history row for every scraped item; "delta" only
+# appends when price/currency/in_stock change and otherwise bumps the latest
+# row's observation_count and last_seen_at.
+PRICE_HISTORY_MODE = "append"
+
+# Shared Redis frontier for crawls split across workers (scraper/frontier.py).
+# Off by default; the worker switches it on per crawl when
+# FULL_SCRAPE_FRONTIER_WORKERS > 0, or enable it here with:
+#   SCHEDULER = "scraper.frontier.RedisScheduler"
+#   DUPEFILTER_CLASS = "scraper.frontier.RedisDupeFilter"
+FRONTIER_REDIS_URL = None      # defaults to $REDIS_URL
+FRONTIER_CRAWL_ID = None       # workers sharing an id share one frontier; unset = a new frontier per crawl
+FRONTIER_EXPECTED_WORKERS = 0  # workers of a shared crawl; its keys go once all finish (0 = left to the TTL)
+FRONTIER_TTL = 86400           # seconds the keys of an unfinished crawl outlive their last write
+FRONTIER_IDLE_WAIT = 10        # seconds an empty queue is waited on before a worker finishes
+FRONTIER_POLL_INTERVAL = 0.5   # seconds between checks for requests pushed by other workers
+
 # Playwright settings
 PLAYWRIGHT_BROWSER_TYPE = "chromium"
 PLAYWRIGHT_LAUNCH_OPTIONS = {
     "headless": True,
 }
+PLAYWRIGHT_MAX_CONTEXTS = 2
+PLAYWRIGHT_MAX_PAGES_PER_CONTEXT = 8
+# Idle pages kept open per context for reuse (0 = close every page after use)
+PLAYWRIGHT_PAGE_POOL_SIZE = 8
+
+# Sub-resources the browser doesn't fetch, by spider name ("default" covers
+# spiders without an entry). Spiders read the rendered DOM only, so images,
+# fonts and CSS are wasted bandwidth; image URLs still come from the markup.
+PLAYWRIGHT_BLOCKED_RESOURCE_TYPES = {
+    "default": ["image", "media", "font"],
+    "ecommerce": ["image", "media", "font", "stylesheet", "texttrack", "eventsource", "manifest"],
+}
+# Requests whose URL contains any of these are aborted too (analytics, ads)
+PLAYWRIGHT_BLOCKED_URL_PATTERNS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+]
 
 # Set settings whose default value is deprecated to a future-proof value
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
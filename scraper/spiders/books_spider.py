@@ -1,5 +1,6 @@
 import re
 import scrapy
+from scraper.extraction import Field, ListingSpec
 from scraper.items import ProductItem
 
 # Word-to-number map for CSS star rating class names
@@ -8,6 +9,41 @@ STAR_RATING = {
 }
 
 
+def parse_price(text: str) -> float:
+    # "£12.34" → 12.34
+    return float(re.sub(r"[^\d.]", "", text))
+
+
+def parse_star_rating(css_class: str):
+    # "star-rating Three" → 3.0
+    return STAR_RATING.get(css_class.replace("star-rating", "").strip())
+
+
+def parse_breadcrumb(crumbs: list) -> str:
+    # Home › Mystery › ... — the last link is the genre
+    return crumbs[-1].strip().lower() if len(crumbs) >= 2 else "books"
+
+
+BOOK_LISTING = ListingSpec(
+    "article.product_pod",
+    fields={
+        "name": Field("h3 a::attr(title)", required=True),
+        "link": Field("h3 a::attr(href)", required=True),   # relative URL to the detail page
+        "price": Field(".price_color::text", convert=parse_price),
+        "rating": Field("p.star-rating::attr(class)", convert=parse_star_rating),
+        "in_stock": Field(
+            ".availability::text", many=True, default=False,
+            convert=lambda texts: "in stock" in " ".join(texts).lower(),
+        ),
+        "image_url": Field("img.thumbnail::attr(src)"),
+    },
+    page_fields={
+        "category": Field("ul.breadcrumb li a::text", many=True, convert=parse_breadcrumb, default="books"),
+        "next_page": Field("li.next a::attr(href)"),
+    },
+)
+
+
 class BooksSpider(scrapy.Spider):
     """
     High-volume spider targeting books.toscrape.com.
@@ -19,10 +55,21 @@ class BooksSpider(scrapy.Spider):
       - star rating, category / genre
       - cover image URL
       - per-genre breadcrumb category
+
+    Seeds are the enumerated listing pages (page-1 … page-{page_count}), so
+    a crawl can be split across workers with `-a shard_index=I -a
+    shard_count=N`; each worker seeds every Nth page. "next" links are still
+    followed, so pages past page_count are found too. Seeds go through the
+    dupe filter like any other request, so a page reached both as a seed and
+    through a "next" link is fetched once (across workers too, when they
+    share a frontier, see scraper/frontier.py).
     """
     name = "books"
     allowed_domains = ["books.toscrape.com"]
-    start_urls = ["https://books.toscrape.com/catalogue/page-1.html"]
+    catalogue_url = "https://books.toscrape.com/catalogue"
+    page_count = 50
+    retailer_name = "Books to Scrape"
+    retailer_domain = "books.toscrape.com"
 
     custom_settings = {
         # No Playwright needed — this site is static HTML
@@ -32,77 +79,53 @@ class BooksSpider(scrapy.Spider):
         "DOWNLOAD_DELAY": 0.25,
     }
 
+    def __init__(self, shard_index=0, shard_count=1, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_index = int(shard_index)
+        self.shard_count = int(shard_count)
+
+    def start_requests(self):
+        for page in range(1, self.page_count + 1):
+            if (page - 1) % self.shard_count == self.shard_index:
+                yield scrapy.Request(f"{self.catalogue_url}/page-{page}.html", callback=self.parse)
+
     def parse(self, response):
         """Parse a paginated book listing page."""
-        books = response.css("article.product_pod")
+        listing = BOOK_LISTING.extract(response)
         self.logger.info(
-            f"[BOOKS] {response.url} — {len(books)} books found"
+            f"[BOOKS] {response.url} — {len(listing.items)} books found"
         )
 
-        for book in books:
-            item = self._extract_book(book, response)
-            if item:
-                yield item
+        category = listing.page["category"]
+        for fields in listing.items:
+            yield self._build_book(fields, category, response)
 
         # Follow pagination (50 pages × 20 books = 1,000 total)
-        next_page = response.css("li.next a::attr(href)").get()
+        next_page = listing.page["next_page"]
         if next_page:
             yield response.follow(next_page, callback=self.parse)
 
-    def _extract_book(self, book, response):
-        """Extract all available fields from a book card."""
-        # Title
-        name = book.css("h3 a::attr(title)").get()
-        if not name:
-            return None
-
-        # Relative URL to book detail page
-        link = book.css("h3 a::attr(href)").get()
-        if not link:
-            return None
-
-        url = response.urljoin(link)
+    def _build_book(self, fields: dict, category: str, response):
+        """Build the item for one book card's extracted fields."""
+        url = response.urljoin(fields["link"])
         sku = url.rstrip("/").split("/")[-2]  # slug is second-to-last segment
 
-        # Price — "£12.34" → 12.34 USD equivalent for demo
-        raw_price = book.css(".price_color::text").get("").strip()
-        price = None
-        if raw_price:
-            try:
-                price = float(re.sub(r"[^\d.]", "", raw_price))
-            except ValueError:
-                pass
-
-        # Star rating via CSS class name
-        rating_class = book.css("p.star-rating::attr(class)").get("")
-        rating_word = rating_class.replace("star-rating", "").strip()
-        rating = STAR_RATING.get(rating_word)
-
-        # In-stock status
-        availability_text = book.css(".availability::text").getall()
-        in_stock = "in stock" in " ".join(availability_text).lower()
-
-        # Cover image
-        image_url = book.css("img.thumbnail::attr(src)").get()
+        image_url = fields["image_url"]
         if image_url:
             image_url = response.urljoin(image_url)
 
-        # Category from breadcrumb (e.g. "Mystery", "Science Fiction")
-        breadcrumb = response.css("ul.breadcrumb li a::text").getall()
-        category = breadcrumb[-1].strip().lower() if len(breadcrumb) >= 2 else "books"
-
-        item = ProductItem()
-        item["name"] = name.strip()
-        item["url"] = url
-        item["sku"] = sku
-        item["price"] = price
-        item["currency"] = "GBP"
-        item["in_stock"] = in_stock
-        item["category"] = category
-        item["description"] = None   # Not on listing page; would need detail request
-        item["image_url"] = image_url
-        item["rating"] = rating
-        item["review_count"] = None
-        item["retailer_name"] = "Books to Scrape"
-        item["retailer_domain"] = "books.toscrape.com"
-        return item
+        return ProductItem(
+            name=fields["name"],
+            url=url,
+            sku=sku,
+            price=fields["price"],
+            currency="GBP",
+            in_stock=fields["in_stock"],
+            category=category,
+            description=None,  # Not on listing page; would need detail request
+            image_url=image_url,
+            rating=fields["rating"],
+            review_count=None,
+            retailer_name=self.retailer_name,
+            retailer_domain=self.retailer_domain,
+        )
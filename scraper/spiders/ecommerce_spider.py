@@ -1,4 +1,7 @@
 import scrapy
+from scrapy_playwright.page import PageMethod
+
+from scraper.extraction import Field, ListingSpec
 from scraper.items import ProductItem
 
 
@@ -13,6 +16,54 @@ CATEGORIES = [
 BASE_URL = "https://webscraper.io/test-sites/e-commerce/allinone"
 
 
+def parse_price(text: str) -> float:
+    # "$1,178.99" → 1178.99
+    return float(text.replace("$", "").replace(",", "").strip())
+
+
+def parse_review_count(text: str) -> int:
+    # "7 reviews" → 7
+    return int("".join(filter(str.isdigit, text)))
+
+
+# Selectors are listed most specific first; the rest cover older layouts
+PRODUCT_LISTING = ListingSpec(
+    ".thumbnail",
+    fields={
+        "name": Field("a.title::attr(title)", "a.title::text", required=True),
+        "link": Field("a.title::attr(href)", required=True),
+        "price": Field(
+            "h4.pull-right.price::text", ".price::text", "h4.price::text", convert=parse_price,
+        ),
+        "description": Field("p.description::text", ".description::text"),
+        "image_url": Field("img.img-responsive::attr(src)"),
+        # Count filled stars
+        "rating": Field(
+            "span.ws-icon.ws-icon-star", many=True, convert=lambda stars: float(len(stars)),
+        ),
+        "review_count": Field("div.ratings p::text", ".ratings::text", convert=parse_review_count),
+    },
+    page_fields={
+        "next_page": Field("a[rel='next']::attr(href)"),
+    },
+)
+
+
+def listing_page_meta(category: str) -> dict:
+    """
+    Playwright meta for a listing page. The page isn't handed to the spider,
+    so the download handler returns it to its pool once rendered; a timed-out
+    wait is logged and the page parsed as-is (scraper/browser.py).
+    """
+    return {
+        "playwright": True,
+        "playwright_page_methods": [
+            PageMethod("wait_for_selector", ".thumbnail", timeout=12000),
+        ],
+        "category": category,
+    }
+
+
 class EcommerceSpider(scrapy.Spider):
     """
     Enterprise-grade Scrapy spider with Playwright rendering.
@@ -24,140 +75,88 @@ class EcommerceSpider(scrapy.Spider):
       - description, image URL
       - star rating and review count
       - retailer metadata
+
+    Pass `-a categories=laptops,tablets` to crawl only some categories, or
+    `-a shard_index=I -a shard_count=N` to seed every Nth category (used to
+    split the full scrape across workers).
     """
     name = "ecommerce"
     allowed_domains = ["webscraper.io"]
+    retailer_name = "WebScraper Test Site"
+    retailer_domain = "webscraper.io"
+
+    def __init__(self, categories=None, shard_index=0, shard_count=1, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.categories = CATEGORIES
+        if categories:
+            wanted = {c.strip() for c in categories.split(",")}
+            self.categories = [(path, c) for path, c in CATEGORIES if c in wanted]
+        shard_index, shard_count = int(shard_index), int(shard_count)
+        self.categories = [
+            entry for i, entry in enumerate(self.categories) if i % shard_count == shard_index
+        ]
 
     def start_requests(self):
-        for path, category in CATEGORIES:
+        for path, category in self.categories:
             yield scrapy.Request(
                 url=f"{BASE_URL}/{path}",
                 callback=self.parse,
                 errback=self.errback,
-                meta={
-                    "playwright": True,
-                    "playwright_include_page": True,
-                    "category": category,
-                }
+                meta=listing_page_meta(category),
             )
 
-    async def parse(self, response):
+    def has_content(self, response) -> bool:
+        """Whether a listing page has its product cards (StaticFirstMiddleware)."""
+        return PRODUCT_LISTING.count(response) > 0
+
+    def parse(self, response):
         """Parse a product listing page and follow pagination."""
-        page = response.meta.get("playwright_page")
         category = response.meta.get("category", "unknown")
 
-        if page:
-            try:
-                await page.wait_for_selector(".thumbnail", timeout=12000)
-            except Exception:
-                self.logger.warning(f"Timeout waiting for products on {response.url}")
-            finally:
-                await page.close()
-
-        products = response.css(".thumbnail")
+        listing = PRODUCT_LISTING.extract(response)
         self.logger.info(
-            f"[{category.upper()}] {response.url} — {len(products)} products found"
+            f"[{category.upper()}] {response.url} — {len(listing.items)} products found"
         )
+        if listing.skipped:
+            self.logger.debug(f"Skipped {listing.skipped} product cards — missing name or link")
 
-        for product in products:
-            item = self._extract_product(product, response, category)
-            if item:
-                yield item
+        for fields in listing.items:
+            yield self._build_product(fields, response, category)
 
         # Follow pagination
-        next_page = response.css("a[rel='next']::attr(href)").get()
+        next_page = listing.page["next_page"]
         if next_page:
             yield scrapy.Request(
                 url=response.urljoin(next_page),
                 callback=self.parse,
                 errback=self.errback,
-                meta={
-                    "playwright": True,
-                    "playwright_include_page": True,
-                    "category": category,
-                }
+                meta=listing_page_meta(category),
             )
 
-    def _extract_product(self, product, response, category: str):
-        """
-        Extract all fields from a single product card.
-        Returns a populated ProductItem or None if critical fields are missing.
-        """
-        # --- Required fields ---
-        name = (
-            product.css("a.title::attr(title)").get()
-            or product.css("a.title::text").get()
-            or ""
-        ).strip()
-
-        link = product.css("a.title::attr(href)").get()
-
-        if not name or not link:
-            self.logger.debug("Skipping product card — missing name or link")
-            return None
-
-        url = response.urljoin(link)
+    def _build_product(self, fields: dict, response, category: str):
+        """Build the ProductItem for one product card's extracted fields."""
+        url = response.urljoin(fields["link"])
         sku = url.rstrip("/").split("/")[-1]
 
-        # --- Price extraction (multiple fallback selectors) ---
-        raw_price = (
-            product.css("h4.pull-right.price::text").get()
-            or product.css(".price::text").get()
-            or product.css("h4.price::text").get()
-            or ""
-        ).strip()
-
-        price = None
-        if raw_price:
-            try:
-                price = float(raw_price.replace("$", "").replace(",", "").strip())
-            except ValueError:
-                self.logger.debug(f"Could not parse price: {raw_price!r}")
-
-        # --- Description ---
-        description = (
-            product.css("p.description::text").get()
-            or product.css(".description::text").get()
-            or ""
-        ).strip() or None
-
-        # --- Image URL ---
-        image_url = product.css("img.img-responsive::attr(src)").get()
+        image_url = fields["image_url"]
         if image_url:
             image_url = response.urljoin(image_url)
 
-        # --- Star Rating (count filled stars) ---
-        rating_stars = product.css("span.ws-icon.ws-icon-star")
-        rating = float(len(rating_stars)) if rating_stars else None
-
-        # --- Review count ---
-        review_text = (
-            product.css("div.ratings p::text").get()
-            or product.css(".ratings::text").get()
-            or ""
-        ).strip()
-        review_count = None
-        if review_text:
-            try:
-                review_count = int("".join(filter(str.isdigit, review_text)))
-            except ValueError:
-                pass
-
-        item = ProductItem()
-        item["name"] = name
-        item["url"] = url
-        item["sku"] = sku
-        item["price"] = price
-        item["currency"] = "USD"
-        item["in_stock"] = True
-        item["category"] = category
-        item["description"] = description
-        item["image_url"] = image_url
-        item["rating"] = rating
-        item["review_count"] = review_count
-        item["retailer_name"] = "WebScraper Test Site"
-        item["retailer_domain"] = "webscraper.io"
-        return item
+        return ProductItem(
+            name=fields["name"],
+            url=url,
+            sku=sku,
+            price=fields["price"],
+            currency="USD",
+            in_stock=True,
+            category=category,
+            description=fields["description"],
+            image_url=image_url,
+            rating=fields["rating"],
+            review_count=fields["review_count"],
+            retailer_name=self.retailer_name,
+            retailer_domain=self.retailer_domain,
+        )
 
     async def errback(self, failure):
         """Clean up Playwright page and log request failures."""
@@ -0,0 +1,369 @@
+"""
+Durable local item spool: crawl into files, load them into Postgres separately.
+
+  - SpoolWriter:  appends validated items to a segment file as length-prefixed
+                  JSON records (`>II` header: payload length, CRC32). A
+                  segment is sealed (fsynced, renamed from .seg.open to .seg)
+                  once it reaches ITEM_SPOOL_SEGMENT_BYTES, is
+                  ITEM_SPOOL_SEGMENT_SECONDS old, or the crawl ends.
+  - load_spool:   bulk-loads sealed segments through ProductWriter. Each
+                  batch commits together with its segment's checkpoint
+                  (spool_segments row), so a crash or a database outage
+                  resumes exactly where the last commit left off. Records
+                  the database refuses on their own are set aside in
+                  rejected/<segment>.jsonl instead of blocking the segment.
+
+SpoolPipeline (scraper/pipelines.py) writes the spool when ITEM_SPOOL_DIR is
+set; the `load_item_spool` Celery task loads it, or by hand:
+`python -m scraper.spool`.
+
+Every record is flushed to the OS as it is written, so a crashed crawl loses
+nothing; its leftover .seg.open file is truncated to the last complete record
+and sealed by the loader once it is ITEM_SPOOL_ORPHAN_SECONDS old.
+"""
+import dataclasses
+import json
+import logging
+import os
+import struct
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from core.database import SessionLocal, engine
+from core.models import SpoolSegment
+from scraper.items import ProductItem, UnchangedItem
+from scraper.persistence import ProductWriter
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct(">II")
+OPEN_SUFFIX = ".seg.open"
+SEALED_SUFFIX = ".seg"
+REJECTED_DIR = "rejected"
+LOADED_DIR = "loaded"
+
+# pg_try_advisory_lock key: one loader at a time per database
+LOADER_LOCK_KEY = 0x5E6D_0001
+
+KINDS = {"product": ProductItem, "unchanged": UnchangedItem}
+FIELDS = {kind: tuple(f.name for f in dataclasses.fields(cls)) for kind, cls in KINDS.items()}
+
+
+def encode(item) -> bytes:
+    kind = "unchanged" if isinstance(item, UnchangedItem) else "product"
+    record = [kind, {name: getattr(item, name) for name in FIELDS[kind]}]
+    payload = json.dumps(record, separators=(",", ":")).encode()
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode(payload: bytes):
+    kind, fields = json.loads(payload)
+    return KINDS[kind](**fields)
+
+
+class CorruptSegment(ValueError):
+    pass
+
+
+def read_records(path: Path, offset: int = 0, strict: bool = True):
+    """
+    Yield (payload, end offset) for each record from `offset` on.
+
+    A sealed segment must end on a record boundary (strict); an open one
+    may end in a partly written record, which is where reading stops.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(HEADER.size)
+            if not header:
+                return
+            payload = b""
+            if len(header) == HEADER.size:
+                length, crc = HEADER.unpack(header)
+                payload = f.read(length)
+            if len(header) < HEADER.size or len(payload) < length or zlib.crc32(payload) != crc:
+                if strict:
+                    raise CorruptSegment(f"Corrupt spool record in {path.name} at byte {offset}")
+                return
+            offset += HEADER.size + length
+            yield payload, offset
+
+
+class SpoolWriter:
+    """Append items to rotating segment files under `directory`, named after `prefix`."""
+
+    def __init__(self, directory, prefix: str, max_bytes: int, max_seconds: float):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.token = uuid.uuid4().hex[:8]   # tells apart writers of the same spider
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.file = None
+        self.path = None
+        self.size = 0
+        self.opened_at = None
+        self.sequence = 0
+        self.sealed = 0
+
+    def write(self, item) -> int:
+        if self.file is None:
+            self._open()
+        record = encode(item)
+        self.file.write(record)
+        self.file.flush()
+        self.size += len(record)
+        if self.size >= self.max_bytes:
+            self.seal()
+        return len(record)
+
+    def rotate_if_due(self):
+        if self.file is not None and time.monotonic() - self.opened_at >= self.max_seconds:
+            self.seal()
+
+    def seal(self):
+        if self.file is None:
+            return
+        os.fsync(self.file.fileno())
+        self.file.close()
+        sealed = self.path.with_name(self.path.name[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+        os.replace(self.path, sealed)
+        _fsync_dir(self.directory)
+        self.file = None
+        self.sealed += 1
+
+    close = seal
+
+    def _open(self):
+        self.sequence += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        self.path = self.directory / f"{self.prefix}-{stamp}-{self.token}-{self.sequence:05d}{OPEN_SUFFIX}"
+        self.file = open(self.path, "ab")
+        self.size = 0
+        self.opened_at = time.monotonic()
+
+
+def _fsync_dir(directory: Path):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def recover_orphans(directory: Path, older_than: float) -> list:
+    """Seal .seg.open files left behind by crashed crawls, dropping any torn last record."""
+    recovered = []
+    cutoff = time.time() - older_than
+    for path in directory.glob(f"*{OPEN_SUFFIX}"):
+        if path.stat().st_mtime > cutoff:
+            continue
+        end = 0
+        for _, end in read_records(path, strict=False):
+            pass
+        if end == 0:
+            path.unlink()
+            continue
+        with open(path, "r+b") as f:
+            f.truncate(end)
+            os.fsync(f.fileno())
+        os.replace(path, path.with_name(path.name[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX))
+        recovered.append(path.name)
+        logger.warning(f"[SPOOL] Recovered orphaned segment {path.name} ({end} bytes)")
+    return recovered
+
+
+# --- loader ---
+
+def is_transient(error: Exception) -> bool:
+    """Whether a database error means "try again later" rather than "bad record"."""
+    return isinstance(error, (OperationalError, InterfaceError)) or getattr(
+        error, "connection_invalidated", False
+    )
+
+
+class SegmentLoader:
+    """Load sealed segments with one ProductWriter, checkpointing every batch."""
+
+    def __init__(self, db, writer, directory: Path, batch_size: int):
+        self.db = db
+        self.writer = writer
+        self.directory = directory
+        self.batch_size = batch_size
+        self.warmed = set()   # retailer domains preloaded into the writer
+
+    def load(self, path: Path) -> dict:
+        checkpoint = self.db.get(SpoolSegment, path.name)
+        if checkpoint is None:
+            checkpoint = SpoolSegment(name=path.name, offset=0, records=0, rejected=0)
+            self.db.add(checkpoint)
+            self.db.commit()
+        if checkpoint.finished_at is not None:
+            return {"records": 0, "rejected": 0}   # loaded; only the file was left
+
+        loaded = rejected = 0
+        batch = []
+        corrupt = None
+        try:
+            for payload, end in read_records(path, checkpoint.offset):
+                batch.append((payload, end))
+                if len(batch) >= self.batch_size:
+                    done, refused = self._load_batch(checkpoint, batch, path)
+                    loaded, rejected, batch = loaded + done, rejected + refused, []
+        except CorruptSegment as e:
+            corrupt = e   # load what came before it, then give up on the rest
+        if batch:
+            done, refused = self._load_batch(checkpoint, batch, path)
+            loaded, rejected = loaded + done, rejected + refused
+        if corrupt:
+            raise corrupt
+
+        checkpoint.finished_at = datetime.now(timezone.utc)
+        self.db.commit()
+        return {"records": loaded, "rejected": rejected}
+
+    def _load_batch(self, checkpoint, batch: list, path: Path):
+        try:
+            self._write([decode(payload) for payload, _ in batch])
+            checkpoint.offset = batch[-1][1]
+            checkpoint.records += len(batch)
+            self.writer.commit()
+            return len(batch), 0
+        except Exception as e:
+            self.writer.rollback()
+            if is_transient(e):
+                raise
+            logger.warning(
+                f"[SPOOL] Bulk load of {len(batch)} records from {path.name} failed, "
+                f"retrying row by row: {str(e).splitlines()[0]}"
+            )
+
+        loaded = rejected = 0
+        for payload, end in batch:
+            try:
+                self._write([decode(payload)])
+                checkpoint.offset = end
+                checkpoint.records += 1
+                self.writer.commit()
+                loaded += 1
+            except Exception as e:
+                self.writer.rollback()
+                if is_transient(e):
+                    raise
+                self._reject(path, payload, end, e)
+                checkpoint.offset = end
+                checkpoint.rejected += 1
+                self.db.commit()
+                rejected += 1
+        return loaded, rejected
+
+    def _write(self, items: list):
+        # Preload each retailer's IDs and, in "delta" mode, the latest stored
+        # state of its products, so a load run dedupes against the database
+        # rather than appending every product's first record
+        for domain in {item.retailer_domain for item in items} - self.warmed:
+            self.writer.warm(domain)
+            self.warmed.add(domain)
+        unchanged = [item for item in items if isinstance(item, UnchangedItem)]
+        products = [item for item in items if not isinstance(item, UnchangedItem)]
+        if unchanged:
+            self.writer.touch_items(unchanged)
+        if products:
+            if len(products) == 1:
+                self.writer.write_item(products[0])
+            else:
+                self.writer.write_batch(products)
+
+    def _reject(self, path: Path, payload: bytes, end: int, error: Exception):
+        """
+        Append the record to rejected/<segment>.jsonl, keyed by its end offset.
+        This happens before the checkpoint commit, so a crash can't lose it;
+        a rerun after a failed commit finds the offset already there.
+        """
+        rejected_dir = self.directory / REJECTED_DIR
+        rejected_dir.mkdir(exist_ok=True)
+        reject_file = rejected_dir / f"{path.stem}.jsonl"
+        reason = str(error).splitlines()[0]
+        logger.error(f"[SPOOL] Rejected a record from {path.name}: {reason}")
+        if reject_file.exists():
+            with open(reject_file) as f:
+                if any(json.loads(line).get("offset") == end for line in f):
+                    return
+        line = json.dumps({"offset": end, "record": json.loads(payload), "error": reason})
+        with open(reject_file, "a") as f:
+            f.write(line + "\n")
+
+
+def load_spool(directory, batch_size: int = 500, snapshot_backend: str = "insert",
+               snapshot_mode: str = "append", keep_loaded: bool = False,
+               orphan_seconds: float = 600) -> dict:
+    """
+    Load every sealed segment in `directory`, oldest first per spider.
+    Loaded segments are deleted, or moved to loaded/ with keep_loaded.
+    Transient database errors propagate; the next run resumes from the
+    checkpoints.
+    """
+    directory = Path(directory)
+    summary = {"segments": 0, "records": 0, "rejected": 0, "recovered": [], "corrupt": []}
+    if not directory.is_dir():
+        return summary
+
+    with engine.connect() as lock:
+        if not lock.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOADER_LOCK_KEY}).scalar():
+            return {**summary, "skipped": "another loader is running"}
+        lock.commit()   # the session-level lock outlives the transaction
+        db = SessionLocal()
+        try:
+            summary["recovered"] = recover_orphans(directory, orphan_seconds)
+            writer = ProductWriter(db, snapshot_backend=snapshot_backend, snapshot_mode=snapshot_mode)
+            loader = SegmentLoader(db, writer, directory, batch_size)
+            for path in sorted(directory.glob(f"*{SEALED_SUFFIX}")):
+                try:
+                    result = loader.load(path)
+                except CorruptSegment as e:
+                    # Everything before the damage is loaded; keep the file for inspection
+                    logger.error(f"[SPOOL] {e}; moving {path.name} to {REJECTED_DIR}/")
+                    (directory / REJECTED_DIR).mkdir(exist_ok=True)
+                    os.replace(path, directory / REJECTED_DIR / path.name)
+                    summary["corrupt"].append(path.name)
+                    continue
+                _retire(path, directory, keep_loaded)
+                summary["segments"] += 1
+                summary["records"] += result["records"]
+                summary["rejected"] += result["rejected"]
+                logger.info(f"[SPOOL] Loaded {path.name}: {result}")
+        finally:
+            db.close()
+            lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOADER_LOCK_KEY})
+            lock.commit()
+    return summary
+
+
+def _retire(path: Path, directory: Path, keep_loaded: bool):
+    if keep_loaded:
+        (directory / LOADED_DIR).mkdir(exist_ok=True)
+        os.replace(path, directory / LOADED_DIR / path.name)
+    else:
+        path.unlink()
+
+
+if __name__ == "__main__":
+    from scrapy.utils.project import get_project_settings
+
+    logging.basicConfig(level=logging.INFO)
+    settings = get_project_settings()
+    print(load_spool(
+        settings.get("ITEM_SPOOL_DIR") or "spool",
+        batch_size=settings.getint("ITEM_SPOOL_BATCH_SIZE", 500),
+        snapshot_backend=settings.get("PRICE_HISTORY_BACKEND", "insert"),
+        snapshot_mode=settings.get("PRICE_HISTORY_MODE", "append"),
+        keep_loaded=settings.getbool("ITEM_SPOOL_KEEP_LOADED"),
+        orphan_seconds=settings.getfloat("ITEM_SPOOL_ORPHAN_SECONDS", 600),
+    ))
@@ -0,0 +1,92 @@
+"""
+Page pool in scraper/browser.py, on stand-in pages: scrapy-playwright's own
+page semaphore is real, only the browser is not.
+"""
+import asyncio
+import inspect
+
+from scrapy import Request, Spider
+from scrapy.utils.test import get_crawler
+from scrapy_playwright.handler import DEFAULT_CONTEXT_NAME, BrowserContextWrapper
+
+from scraper.browser import PooledPlaywrightDownloadHandler
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.handlers = {}
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url):
+        pass
+
+    async def close(self):
+        self.closed = True
+        self.context.pages.remove(self)
+        for handler in self.handlers.get("close", []):
+            # Playwright passes the page only to handlers that take it
+            handler(*[self][:len(inspect.signature(handler).parameters)])
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.most_pages = 0
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        self.most_pages = max(self.most_pages, len(self.pages))
+        return page
+
+
+def handler_with_context(max_pages, pool_size):
+    crawler = get_crawler(settings_dict={
+        "PLAYWRIGHT_MAX_PAGES_PER_CONTEXT": max_pages,
+        "PLAYWRIGHT_PAGE_POOL_SIZE": pool_size,
+    })
+    handler = PooledPlaywrightDownloadHandler(crawler)
+    context = FakeContext()
+    handler.context_wrappers[DEFAULT_CONTEXT_NAME] = BrowserContextWrapper(
+        context=context, semaphore=asyncio.Semaphore(max_pages), persistent=False,
+    )
+    return handler, context
+
+
+async def render(handler, url):
+    request = Request(url)
+    page = await handler._create_page(request, Spider("books"))
+    await asyncio.sleep(0)
+    await handler._release_page(request, page)
+
+
+def test_more_requests_than_pages_do_not_wait_on_pooled_pages():
+    async def main():
+        handler, context = handler_with_context(max_pages=1, pool_size=1)
+        urls = [f"https://example.com/page-{i}.html" for i in range(5)]
+        await asyncio.wait_for(asyncio.gather(*(render(handler, url) for url in urls)), timeout=5)
+        return handler, context
+
+    handler, context = asyncio.run(main())
+    assert context.most_pages == 1
+    assert len(handler.idle_pages[DEFAULT_CONTEXT_NAME]) == 1
+    assert handler.stats.get_value("playwright/page_pool/closed_for_waiter") == 4
+
+
+def test_pages_are_reused_without_contention():
+    async def main():
+        handler, context = handler_with_context(max_pages=2, pool_size=2)
+        for i in range(3):
+            await render(handler, f"https://example.com/page-{i}.html")
+        return handler
+
+    handler = asyncio.run(main())
+    assert handler.stats.get_value("playwright/page_pool/created") == 1
+    assert handler.stats.get_value("playwright/page_pool/reused") == 2
@@ -0,0 +1,125 @@
+"""
+Shared Redis frontier (scraper/frontier.py), against fakeredis and the
+books fixture site from benchmarks/fixtures.py.
+"""
+import pytest
+import redis
+from fakeredis import FakeRedis
+from scrapy import Request, Spider
+from scrapy.settings import Settings
+from scrapy.utils.request import RequestFingerprinter
+
+from benchmarks.bench_frontier import FixtureBooksSpider, crawl, fake_redis_url
+from benchmarks.fixtures import FixtureServer, books_site
+from scraper import settings as project_settings
+from scraper.frontier import RedisDupeFilter, RedisScheduler
+from worker.crawl import run_spider
+
+PAGES = 10
+SEEDS = 8      # the last two pages are only reachable through "next" links
+PER_PAGE = 20
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    return fake_redis_url()
+
+
+@pytest.fixture(scope="module")
+def site():
+    with FixtureServer(books_site(PAGES), latency=0.01) as server:
+        yield server
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_shared_frontier_fetches_every_page_once(workers, site, redis_url):
+    result = crawl(workers, site, SEEDS, redis_url, concurrency=2)
+
+    assert result["duplicate_fetches"] == 0
+    assert result["pages_fetched"] == PAGES
+    assert result["items"] == PAGES * PER_PAGE
+    # Every worker finished, so the crawl's keys are gone
+    assert redis.Redis.from_url(redis_url).keys("frontier:bench:*") == []
+
+
+def test_plain_crawl_fetches_every_page_once(site):
+    site.hits.clear()
+    result = run_spider(
+        FixtureBooksSpider.name,
+        settings={
+            "SPIDER_MODULES": ["benchmarks.bench_frontier"],
+            "ITEM_PIPELINES": {},
+            "HTTPCACHE_ENABLED": False,
+            "DOWNLOAD_DELAY": 0,
+            "LOG_LEVEL": "WARNING",
+        },
+        mode="inprocess",
+        spider_args={"catalogue_url": f"{site.base_url}/catalogue", "page_count": SEEDS},
+    )
+
+    assert result["ok"], result["error"]
+    assert sum(count - 1 for count in site.hits.values()) == 0
+    assert len(site.hits) == PAGES
+    assert result["stats"]["item_scraped_count"] == PAGES * PER_PAGE
+
+
+# --- key lifecycle ---
+
+def scheduler(client, crawl_id=None, expected_workers=0):
+    settings = Settings()
+    settings.setmodule(project_settings)
+    settings.set("FRONTIER_CRAWL_ID", crawl_id)
+    settings.set("FRONTIER_EXPECTED_WORKERS", expected_workers)
+    settings.set("FRONTIER_POLL_INTERVAL", 0)
+    dupefilter = RedisDupeFilter(client, RequestFingerprinter(), settings.getint("FRONTIER_TTL"))
+    return RedisScheduler(client, dupefilter, settings)
+
+
+def keys(client):
+    return sorted(key.decode() for key in client.keys("frontier:*"))
+
+
+def test_keys_outlive_workers_until_all_expected_finish():
+    client = FakeRedis()
+    spider = Spider("books")
+    first = scheduler(client, "books:run", expected_workers=2)
+    first.open(spider)
+    assert first.enqueue_request(Request("https://example.com/page-1.html"))
+    first.next_request()
+    first.close("finished")
+    assert "frontier:books:run:seen" in keys(client)
+
+    # A shard that starts after the first finished still sees its pages
+    late = scheduler(client, "books:run", expected_workers=2)
+    late.open(spider)
+    assert not late.enqueue_request(Request("https://example.com/page-1.html"))
+    late.close("finished")
+    assert keys(client) == []
+
+
+def test_failed_worker_leaves_keys_to_the_ttl():
+    client = FakeRedis()
+    spider = Spider("books")
+    for reason in ("shutdown", "finished"):
+        worker = scheduler(client, "books:run", expected_workers=2)
+        worker.open(spider)
+        worker.enqueue_request(Request("https://example.com/page-1.html"))
+        worker.close(reason)
+
+    assert "frontier:books:run:seen" in keys(client)
+    assert all(client.ttl(key) > 0 for key in keys(client))
+
+
+def test_crawl_without_an_id_gets_a_frontier_of_its_own():
+    client = FakeRedis()
+    spider = Spider("books")
+    previous = scheduler(client)
+    previous.open(spider)
+    previous.enqueue_request(Request("https://example.com/page-1.html"))
+
+    current = scheduler(client)
+    current.open(spider)
+    assert current.enqueue_request(Request("https://example.com/page-1.html"))
+    previous.close("finished")
+    current.close("finished")
+    assert keys(client) == []
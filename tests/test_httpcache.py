@@ -0,0 +1,94 @@
+"""
+Revalidating HTTP cache and unchanged-page replay (scraper/httpcache.py),
+crawling the books fixture site, which answers If-None-Match with a 304.
+"""
+import pytest
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.settings import Settings
+from scrapy.utils.test import get_crawler
+
+from benchmarks.bench_frontier import FixtureBooksSpider
+from benchmarks.fixtures import FixtureServer, books_listing_page, books_site
+from scraper.httpcache import UnchangedPageMiddleware
+from scraper.middlewares import StaticFirstMiddleware
+from worker.crawl import run_spider
+
+PAGES = 4
+PER_PAGE = 20
+
+
+@pytest.fixture
+def site():
+    with FixtureServer(books_site(PAGES)) as server:
+        yield server
+
+
+def crawl(site, cache_dir) -> dict:
+    site.hits.clear()
+    result = run_spider(
+        FixtureBooksSpider.name,
+        settings={
+            "SPIDER_MODULES": ["benchmarks.bench_frontier"],
+            "ITEM_PIPELINES": {},
+            "HTTPCACHE_DIR": str(cache_dir),
+            "DOWNLOAD_DELAY": 0,
+            "LOG_LEVEL": "WARNING",
+        },
+        mode="inprocess",
+        spider_args={"catalogue_url": f"{site.base_url}/catalogue", "page_count": 1},
+    )
+    assert result["ok"], result["error"]
+    return result["stats"]
+
+
+def test_unchanged_pages_are_replayed_and_changed_ones_parsed(site, tmp_path):
+    first = crawl(site, tmp_path)
+    assert first["item_scraped_count"] == PAGES * PER_PAGE
+    assert "httpcache/unchanged_pages" not in first
+
+    # Nothing changed: every page is a 304, and its recorded "next" request
+    # is replayed, so the whole site is still walked once
+    second = crawl(site, tmp_path)
+    assert second["httpcache/unchanged_pages"] == PAGES
+    assert second["httpcache/unchanged_items"] == PAGES * PER_PAGE
+    assert second["item_scraped_count"] == PAGES * PER_PAGE
+    assert set(site.hits.values()) == {1} and len(site.hits) == PAGES
+
+    site.pages["/catalogue/page-2.html"] = books_listing_page(2, PAGES).replace("£", "£1")
+    third = crawl(site, tmp_path)
+    assert third["httpcache/unchanged_pages"] == PAGES - 1
+    assert third["httpcache/unchanged_items"] == (PAGES - 1) * PER_PAGE
+    assert third["item_scraped_count"] == PAGES * PER_PAGE
+
+
+class ListingSpider:
+    name = "listing"
+
+    def has_content(self, response):
+        return b"product_pod" in response.body
+
+
+def test_render_fallback_does_not_replay_the_static_probe():
+    crawler = get_crawler()
+    static_first = StaticFirstMiddleware(crawler.stats, 2)
+    spider = ListingSpider()
+    request = Request("https://books.example/page-1.html", meta={"playwright": True})
+    static_first.process_request(request, spider)
+
+    # What the cache policy does with the probe on a 304
+    request.headers["If-None-Match"] = '"abc"'
+    request.meta["page_unchanged"] = True
+    request.meta["cached_response"] = object()
+    shell = HtmlResponse(request.url, body=b"<html>app shell</html>", request=request, flags=["cached"])
+    render = static_first.process_response(request, shell, spider)
+
+    assert render.meta.get("playwright")
+    assert "page_unchanged" not in render.meta and "cached_response" not in render.meta
+    assert b"If-None-Match" not in render.headers
+
+    # Even if a rendered response carried the flag, it isn't treated as unchanged
+    unchanged_pages = UnchangedPageMiddleware(Settings(), crawler.stats)
+    rendered = HtmlResponse(request.url, body=b"<html>product_pod</html>",
+                            request=render.replace(meta={**render.meta, "page_unchanged": True}))
+    assert not unchanged_pages._unchanged(rendered)
@@ -0,0 +1,54 @@
+"""
+AdaptiveThrottleMiddleware (scraper/middlewares.py) on a stand-in downloader
+holding real download slots.
+"""
+from types import SimpleNamespace
+
+from scrapy import Request
+from scrapy.core.downloader import Slot
+from scrapy.http import Response
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.test import get_crawler
+
+from scraper.middlewares import AdaptiveThrottleMiddleware
+
+SLOT = "books.example"
+
+
+def middleware(**settings):
+    crawler = get_crawler(settings_dict={**get_project_settings().copy_to_dict(), **settings})
+    crawler.engine = SimpleNamespace(downloader=SimpleNamespace(slots={}))
+    return AdaptiveThrottleMiddleware(crawler), crawler.engine.downloader.slots
+
+
+def respond(mw, status=200, latency=0.1):
+    request = Request(f"https://{SLOT}/", meta={"download_slot": SLOT, "download_latency": latency})
+    return mw.process_response(request, Response(request.url, status=status), None)
+
+
+def test_backoff_statuses_from_a_string_setting():
+    mw, slots = middleware(ADAPTIVE_THROTTLE_BACKOFF_STATUSES="429,503", ADAPTIVE_THROTTLE_START_CONCURRENCY=8)
+    slots[SLOT] = Slot(16, 0.0, False)
+    respond(mw, status=503)
+    assert slots[SLOT].concurrency == 4
+
+
+def test_slow_responses_lower_concurrency_once_per_target_latency():
+    mw, slots = middleware(ADAPTIVE_THROTTLE_START_CONCURRENCY=8, ADAPTIVE_THROTTLE_TARGET_LATENCY=60)
+    slots[SLOT] = Slot(16, 0.0, False)
+    for _ in range(5):
+        respond(mw, latency=120)
+    assert slots[SLOT].concurrency == 7
+
+
+def test_recreated_slot_gets_the_tuned_values_back():
+    mw, slots = middleware(ADAPTIVE_THROTTLE_START_CONCURRENCY=8)
+    slots[SLOT] = Slot(16, 0.0, False)
+    respond(mw, status=429)
+    tuned = slots[SLOT].concurrency, slots[SLOT].delay
+    assert tuned != (16, 0.0)
+
+    # The downloader garbage-collects the idle slot, then needs it again
+    slots[SLOT] = Slot(16, 0.0, False)
+    respond(mw)
+    assert (slots[SLOT].concurrency, slots[SLOT].delay) == tuned
@@ -0,0 +1,129 @@
+"""
+PostgresPipeline (scraper/pipelines.py) against the test database.
+"""
+import importlib
+import threading
+
+import pytest
+from scrapy import Spider
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.test import get_crawler
+from sqlalchemy import func, select
+
+from core.models import PriceHistory, Product
+from scraper.items import ProductItem
+from scraper.pipelines import PostgresPipeline
+
+
+def item(n: int) -> ProductItem:
+    return ProductItem(
+        name=f"Book {n}",
+        url=f"https://books.example/book-{n}",
+        sku=f"book-{n}",
+        in_stock=True,
+        retailer_name="Books Example",
+        retailer_domain="books.example",
+        price=10.0 + n,
+    )
+
+
+def stored(db) -> tuple[int, int]:
+    db.rollback()  # see what other sessions committed
+    return (
+        db.scalar(select(func.count()).select_from(Product)),
+        db.scalar(select(func.count()).select_from(PriceHistory)),
+    )
+
+
+@pytest.fixture
+def stats():
+    return get_crawler().stats
+
+
+@pytest.fixture
+def cache_bumps(monkeypatch):
+    """Threads bump_generation was called on (no Redis needed)."""
+    calls = []
+    monkeypatch.setattr("scraper.pipelines.bump_generation", lambda: calls.append(threading.current_thread().name))
+    return calls
+
+
+# --- writer thread ---
+
+def test_writer_thread_writes_everything_and_bumps_the_cache_last(db, stats, cache_bumps, on_reactor):
+    pipeline = PostgresPipeline(batch_size=2, batch_interval=0, writer_thread=True, stats=stats)
+    spider = Spider("books")
+    on_reactor(pipeline.open_spider, spider)
+    for n in range(5):
+        on_reactor(pipeline.process_item, item(n), spider)
+    on_reactor(pipeline.close_spider, spider)
+
+    assert stored(db) == (5, 5)
+    assert stats.get_value("postgres/items_saved") == 5
+    # Off the reactor thread, after the writes
+    assert cache_bumps == ["db-writer"]
+
+
+def test_writer_thread_failure_is_logged_and_counted(db, stats, cache_bumps, on_reactor, caplog):
+    pipeline = PostgresPipeline(batch_size=2, batch_interval=0, writer_thread=True, stats=stats)
+    spider = Spider("books")
+    on_reactor(pipeline.open_spider, spider)
+
+    def broken_write(batch, spider):
+        raise RuntimeError("disk full")
+
+    pipeline._write_batch = broken_write
+    for n in range(2):
+        on_reactor(pipeline.process_item, item(n), spider)
+    on_reactor(pipeline.close_spider, spider)
+
+    assert stats.get_value("postgres/writer/errors") == 1
+    assert "Writer job broken_write failed: disk full" in caplog.text
+    assert stored(db) == (0, 0)
+
+
+# --- batching ---
+
+@pytest.fixture
+def reload_settings(monkeypatch):
+    """Re-read scraper/settings.py under the given environment."""
+    import scraper.settings
+
+    def reload(**env):
+        monkeypatch.delenv("POSTGRES_BATCH_SIZE", raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        importlib.reload(scraper.settings)
+        return get_crawler(settings_dict=get_project_settings().copy_to_dict())
+
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(scraper.settings)
+
+
+def test_batching_is_opt_in(reload_settings):
+    assert PostgresPipeline.from_crawler(reload_settings()).batch_size == 1
+    assert PostgresPipeline.from_crawler(reload_settings(POSTGRES_BATCH_SIZE="500")).batch_size == 500
+
+
+def test_default_pipeline_commits_each_item(db, stats, cache_bumps):
+    pipeline = PostgresPipeline(stats=stats)
+    spider = Spider("books")
+    pipeline.open_spider(spider)
+    pipeline.process_item(item(1), spider)
+    assert stored(db) == (1, 1)
+    pipeline.close_spider(spider)
+
+
+def test_batches_are_written_when_full_and_at_close(db, stats, cache_bumps):
+    pipeline = PostgresPipeline(batch_size=3, batch_interval=0, stats=stats)
+    spider = Spider("books")
+    pipeline.open_spider(spider)
+    for n in range(4):
+        pipeline.process_item(item(n), spider)
+    assert stored(db) == (3, 3)
+
+    pipeline.close_spider(spider)
+    assert stored(db) == (4, 4)
+    assert stats.get_value("postgres/batches") == 2
+    assert stats.get_value("postgres/items_saved") == 4
@@ -16,9 +16,24 @@ app.conf.beat_schedule = {
         'task': 'worker.tasks.trigger_ecommerce_scrape',
         'schedule': 86400.0, # Every 24 hours
     },
+    'maintain-price-history-daily': {
+        'task': 'worker.tasks.maintain_price_history',
+        'schedule': 86400.0, # Every 24 hours
+    },
 }
 
+# Load the item spool (scraper/spool.py) every minute when crawls write to it
+if os.getenv("ITEM_SPOOL_DIR"):
+    app.conf.beat_schedule['load-item-spool'] = {
+        'task': 'worker.tasks.load_item_spool',
+        'schedule': 60.0,
+    }
+
 app.conf.timezone = 'UTC'
 
+# Recycle worker children after this many tasks (0 = never). Worth setting with
+# SCRAPY_EXECUTION_MODE=inprocess, where crawls share one long-lived process.
+app.conf.worker_max_tasks_per_child = int(os.getenv("CELERY_MAX_TASKS_PER_CHILD", "0")) or None
+
 if __name__ == '__main__':
     app.start()
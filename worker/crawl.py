@@ -0,0 +1,165 @@
+"""
+Spider execution for Celery tasks.
+
+Two modes, picked with the SCRAPY_EXECUTION_MODE environment variable:
+
+  - subprocess (default): every crawl runs `python -m scrapy crawl` in a
+    fresh interpreter. Fully isolated, but each task pays interpreter
+    startup, Scrapy/Twisted imports and settings load again.
+  - inprocess: crawls run through a CrawlerRunner on a Twisted reactor
+    thread that lives as long as the worker process, so imports, settings
+    and the DB connection pool stay warm between tasks. Since the worker
+    process is long-lived, set CELERY_MAX_TASKS_PER_CHILD to recycle
+    children now and then.
+
+Both return the same result dict: {"spider", "ok", "finish_reason",
+"stats", "error"}.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+from scrapy.utils.project import get_project_settings
+
+os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "scraper.settings")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXECUTION_MODE = os.getenv("SCRAPY_EXECUTION_MODE", "subprocess").lower()
+ERROR_TAIL_BYTES = 2000
+
+_reactor_lock = threading.Lock()
+_reactor_thread = None
+_reactor_error = None
+_base_settings = None
+
+
+def _result(spider_name, stats, error=None) -> dict:
+    finish_reason = stats.get("finish_reason")
+    return {
+        "spider": spider_name,
+        "ok": error is None and finish_reason == "finished",
+        "finish_reason": finish_reason,
+        "stats": stats,
+        "error": error,
+    }
+
+
+def _cmdline_value(value) -> str:
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, (list, tuple)):
+        return ",".join(value)
+    return str(value)
+
+
+def run_spider_subprocess(spider_name: str, settings: dict | None = None,
+                          spider_args: dict | None = None) -> dict:
+    """
+    Run one crawl in a child interpreter. Output goes to a temporary file
+    rather than a pipe, so memory use doesn't grow with log volume; only its
+    tail is read back if the crawl fails.
+    """
+    overrides = []
+    for key, value in (settings or {}).items():
+        overrides += ["-s", f"{key}={_cmdline_value(value)}"]
+    for key, value in (spider_args or {}).items():
+        overrides += ["-a", f"{key}={value}"]
+
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryFile() as output:
+        stats_path = os.path.join(tmp, "stats.json")
+        process = subprocess.run(
+            [sys.executable, "-m", "scrapy", "crawl", spider_name,
+             "-s", f"STATS_FILE={stats_path}", *overrides],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "SCRAPY_SETTINGS_MODULE": "scraper.settings"},
+            stdout=output,
+            stderr=subprocess.STDOUT,
+        )
+        stats = {}
+        if os.path.exists(stats_path):
+            with open(stats_path) as f:
+                stats = json.load(f)
+
+        error = None
+        if process.returncode != 0 or stats.get("finish_reason") != "finished":
+            output.seek(max(0, output.seek(0, os.SEEK_END) - ERROR_TAIL_BYTES))
+            error = output.read().decode(errors="replace")
+        return _result(spider_name, stats, error)
+
+
+def _ensure_reactor():
+    """Start the Twisted reactor on a daemon thread, once per process."""
+    global _reactor_thread, _base_settings
+    with _reactor_lock:
+        if _reactor_thread is None:
+            _base_settings = get_project_settings()
+            started = threading.Event()
+            _reactor_thread = threading.Thread(
+                target=_run_reactor, args=(started,), name="scrapy-reactor", daemon=True
+            )
+            _reactor_thread.start()
+            started.wait()
+    if _reactor_error is not None:
+        raise RuntimeError(f"Scrapy reactor failed to start: {_reactor_error!r}")
+
+
+def _run_reactor(started):
+    global _reactor_error
+    # Installed on this thread so the asyncio loop scrapy-playwright uses
+    # belongs to the thread that runs it
+    from scrapy.utils.log import configure_logging
+    from scrapy.utils.reactor import install_reactor
+
+    try:
+        install_reactor(_base_settings["TWISTED_REACTOR"])
+    except Exception as e:
+        _reactor_error = e
+        started.set()
+        return
+    from twisted.internet import reactor
+
+    configure_logging(_base_settings, install_root_handler=False)
+    reactor.callWhenRunning(started.set)
+    reactor.run(installSignalHandlers=False)
+
+
+def _start_crawl(spider_name, settings, spider_args):
+    # Runs on the reactor thread
+    from scrapy.crawler import CrawlerRunner
+
+    crawl_settings = _base_settings.copy()
+    crawl_settings.update(settings or {}, priority="cmdline")
+    runner = CrawlerRunner(crawl_settings)
+    crawler = runner.create_crawler(spider_name)
+    return runner.crawl(crawler, **(spider_args or {})).addCallback(lambda _: crawler)
+
+
+def run_spider_inprocess(spider_name: str, settings: dict | None = None,
+                         spider_args: dict | None = None) -> dict:
+    """Run one crawl on this process's reactor thread and block until it finishes."""
+    _ensure_reactor()
+    from twisted.internet import reactor, threads
+
+    from scraper.extensions import serialisable_stats
+
+    try:
+        crawler = threads.blockingCallFromThread(
+            reactor, _start_crawl, spider_name, settings, spider_args
+        )
+    except Exception as e:
+        return _result(spider_name, {}, error=repr(e))
+    return _result(spider_name, serialisable_stats(crawler.stats.get_stats()))
+
+
+def run_spider(spider_name: str, settings: dict | None = None, mode: str | None = None,
+               spider_args: dict | None = None) -> dict:
+    """Run one crawl. `spider_args` are passed to the spider like `scrapy crawl -a`."""
+    mode = (mode or EXECUTION_MODE).lower()
+    if mode == "inprocess":
+        return run_spider_inprocess(spider_name, settings, spider_args)
+    if mode == "subprocess":
+        return run_spider_subprocess(spider_name, settings, spider_args)
+    raise ValueError(f"Unknown SCRAPY_EXECUTION_MODE '{mode}'")
@@ -1,20 +1,20 @@
 import os
-import subprocess
-import sys
-from worker.celery_app import app
 
-os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'scraper.settings')
+from celery import chord, group
+from scrapy.utils.project import get_project_settings
 
+from worker.celery_app import app
+from worker.crawl import run_spider
+from scraper.spiders.ecommerce_spider import CATEGORIES
+from core.cache import bump_generation
+from core.partitions import run_maintenance
+from scraper.spool import is_transient, load_spool
 
-def _run_spider(spider_name: str) -> subprocess.CompletedProcess:
-    """Run a single Scrapy spider by name via the CLI subprocess pattern."""
-    return subprocess.run(
-        [sys.executable, "-m", "scrapy", "crawl", spider_name],
-        cwd="/app",
-        env={**os.environ, "SCRAPY_SETTINGS_MODULE": "scraper.settings"},
-        capture_output=True,
-        text=True,
-    )
+SPLIT_CATEGORIES = os.getenv("FULL_SCRAPE_SPLIT_CATEGORIES", "false").lower() == "true"
+SHARD_RETRIES = int(os.getenv("FULL_SCRAPE_SHARD_RETRIES", "2"))
+SHARD_RETRY_DELAY = int(os.getenv("FULL_SCRAPE_SHARD_RETRY_DELAY", "60"))  # seconds
+FRONTIER_WORKERS = int(os.getenv("FULL_SCRAPE_FRONTIER_WORKERS", "0"))
+SPOOL_RETRY_DELAY = int(os.getenv("ITEM_SPOOL_RETRY_DELAY", "60"))  # seconds
 
 
 @app.task(bind=True)
@@ -23,10 +23,10 @@ def trigger_ecommerce_scrape(self):
     Celery task: runs the e-commerce (webscraper.io) spider.
     Target: ~147 products across laptops, tablets, phones.
     """
-    result = _run_spider("ecommerce")
-    if result.returncode != 0:
-        raise RuntimeError(f"ecommerce spider failed:\n{result.stderr[-2000:]}")
-    return "ecommerce scrape completed successfully"
+    result = run_spider("ecommerce")
+    if not result["ok"]:
+        raise RuntimeError(f"ecommerce spider failed:\n{result['error']}")
+    return {"message": "ecommerce scrape completed successfully", "stats": result["stats"]}
 
 
 @app.task(bind=True)
@@ -35,26 +35,164 @@ def trigger_books_scrape(self):
     Celery task: runs the books (books.toscrape.com) spider.
     Target: 1,000 books across 50 genres.
     """
-    result = _run_spider("books")
-    if result.returncode != 0:
-        raise RuntimeError(f"books spider failed:\n{result.stderr[-2000:]}")
-    return "books scrape completed successfully"
+    result = run_spider("books")
+    if not result["ok"]:
+        raise RuntimeError(f"books spider failed:\n{result['error']}")
+    return {"message": "books scrape completed successfully", "stats": result["stats"]}
+
+
+def full_scrape_shards(run_id: str) -> list:
+    """
+    (spider_name, spider_args, settings) for every crawl the full scrape fans
+    out to.
+
+    With FULL_SCRAPE_FRONTIER_WORKERS = N, each spider runs as N workers that
+    split its seed URLs and share one Redis frontier (scraper/frontier.py)
+    for everything discovered after that. Otherwise, with
+    FULL_SCRAPE_SPLIT_CATEGORIES, ecommerce gets one crawl per category.
+    """
+    if FRONTIER_WORKERS > 0:
+        return [
+            (
+                spider_name,
+                {"shard_index": index, "shard_count": FRONTIER_WORKERS},
+                {
+                    "SCHEDULER": "scraper.frontier.RedisScheduler",
+                    "DUPEFILTER_CLASS": "scraper.frontier.RedisDupeFilter",
+                    "FRONTIER_CRAWL_ID": f"{spider_name}:{run_id}",
+                    "FRONTIER_EXPECTED_WORKERS": FRONTIER_WORKERS,
+                },
+            )
+            for spider_name in ("ecommerce", "books")
+            for index in range(FRONTIER_WORKERS)
+        ]
+
+    if SPLIT_CATEGORIES:
+        shards = [("ecommerce", {"categories": category}, None) for _, category in CATEGORIES]
+    else:
+        shards = [("ecommerce", {}, None)]
+    return shards + [("books", {}, None)]
+
+
+@app.task(bind=True, max_retries=SHARD_RETRIES)
+def crawl_shard(self, spider_name, spider_args=None, settings=None):
+    """
+    Celery task: one crawl of a full scrape. A failed crawl is retried on its
+    own; once retries run out it returns a "failed" result instead of
+    raising, so the chord callback still runs for the sibling shards.
+    """
+    if self.request.retries and settings and settings.get("FRONTIER_CRAWL_ID"):
+        # The failed attempt's seen set covers pages it popped but never
+        # finished; a retry starts a frontier of its own
+        settings = {
+            **settings,
+            "FRONTIER_CRAWL_ID": f"{settings['FRONTIER_CRAWL_ID']}:retry{self.request.retries}",
+            "FRONTIER_EXPECTED_WORKERS": 1,
+        }
+    result = run_spider(spider_name, settings=settings, spider_args=spider_args)
+    if not result["ok"]:
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=SHARD_RETRY_DELAY)
+        # Log but continue — don't abort sibling spiders
+        print(f"[WARNING] {spider_name} {spider_args or ''} failed: {(result['error'] or '')[-500:]}")
+    return {
+        "spider": spider_name,
+        "args": spider_args or {},
+        "status": "success" if result["ok"] else "failed",
+        "stats": result["stats"],
+    }
+
+
+def _merge_stats(shard_stats: list) -> dict:
+    """Sum numeric counters across shards of one spider; other values come from the last shard."""
+    if len(shard_stats) == 1:
+        return shard_stats[0]
+    merged = {}
+    for stats in shard_stats:
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] = merged.get(key, 0) + value
+            else:
+                merged[key] = value
+    return merged
+
+
+@app.task
+def aggregate_full_scrape(shard_results):
+    """Chord callback: fold per-shard results into the full scrape summary."""
+    results = {}
+    stats = {}
+    for shard in shard_results:
+        spider_name = shard["spider"]
+        failed = shard["status"] != "success" or results.get(spider_name) == "failed"
+        results[spider_name] = "failed" if failed else "success"
+        stats.setdefault(spider_name, []).append(shard["stats"])
+
+    return {
+        "message": "Full scrape pipeline completed",
+        "results": results,
+        "stats": {spider_name: _merge_stats(shards) for spider_name, shards in stats.items()},
+        "shards": [
+            {"spider": shard["spider"], "args": shard["args"], "status": shard["status"]}
+            for shard in shard_results
+        ],
+    }
 
 
 @app.task(bind=True)
 def trigger_full_scrape(self):
     """
-    Celery task: runs ALL spiders sequentially for maximum data volume.
+    Celery task: runs ALL spiders in parallel for maximum data volume.
     Total target: 1,147+ unique products, growing price_history on every run.
+
+    Fans out one crawl_shard task per spider (or per ecommerce category) as
+    a chord and replaces itself with it, so this task's id resolves to the
+    aggregated summary once every shard has finished.
     """
-    results = {}
+    header = group(
+        crawl_shard.s(spider_name, spider_args, settings)
+        for spider_name, spider_args, settings in full_scrape_shards(self.request.id)
+    )
+    raise self.replace(chord(header, aggregate_full_scrape.s()))
 
-    for spider_name in ["ecommerce", "books"]:
-        result = _run_spider(spider_name)
-        status = "success" if result.returncode == 0 else "failed"
-        results[spider_name] = status
-        if result.returncode != 0:
-            # Log but continue — don't abort sibling spider
-            print(f"[WARNING] {spider_name} spider failed: {result.stderr[-500:]}")
 
-    return {"message": "Full scrape pipeline completed", "results": results}
+@app.task(bind=True)
+def maintain_price_history(self):
+    """
+    Celery task: keeps price_history partitions ahead of the clock and
+    compacts partitions past the retention window into daily rollups.
+    """
+    result = run_maintenance()
+    if result["compacted"]:
+        bump_generation()
+    return result
+
+
+@app.task(bind=True, max_retries=5)
+def load_item_spool(self):
+    """
+    Celery task: bulk-loads sealed item spool segments into Postgres
+    (scraper/spool.py). Progress is checkpointed per batch, so a run that
+    fails with the database unavailable is retried and resumes where it
+    stopped; runs overlapping each other skip rather than double-load.
+    """
+    settings = get_project_settings()
+    directory = settings.get("ITEM_SPOOL_DIR")
+    if not directory:
+        return {"message": "item spool disabled (ITEM_SPOOL_DIR not set)"}
+    try:
+        result = load_spool(
+            directory,
+            batch_size=settings.getint("ITEM_SPOOL_BATCH_SIZE", 500),
+            snapshot_backend=settings.get("PRICE_HISTORY_BACKEND", "insert"),
+            snapshot_mode=settings.get("PRICE_HISTORY_MODE", "append"),
+            keep_loaded=settings.getbool("ITEM_SPOOL_KEEP_LOADED"),
+            orphan_seconds=settings.getfloat("ITEM_SPOOL_ORPHAN_SECONDS", 600),
+        )
+    except Exception as e:
+        if is_transient(e):
+            raise self.retry(exc=e, countdown=SPOOL_RETRY_DELAY)
+        raise
+    if result["records"] or result["rejected"]:
+        bump_generation()
+    return result